@@ -0,0 +1,56 @@
+"""
+Benchmark of the import time of the dialect, which every Superset process
+pays at entry point discovery. Uses python -X importtime and prints the
+total and the slowest packages.
+
+Usage (with the package installed, e.g. pip install -e .):
+
+    python benchmarks/import_time.py [module] [top]
+"""
+
+import subprocess
+import sys
+
+
+def measure(module):
+    """
+    Imports module in a fresh interpreter.
+
+    :return: A list of (cumulative microseconds, module name) tuples.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        timings.append((int(cumulative), name.rstrip()))
+    return timings
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "superset_wfs_dialect.dialect"
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    timings = measure(module)
+    # top level imports are not indented
+    total = sum(cumulative for cumulative, name in timings if not name.startswith("  "))
+    print(f"import {module}: {total / 1000:.1f} ms")
+
+    packages = {}
+    for cumulative, name in timings:
+        if name.startswith("  ") and not name.startswith("   "):
+            continue
+        package = name.strip().split(".")[0]
+        packages[package] = max(packages.get(package, 0), cumulative)
+    for package, cumulative in sorted(packages.items(), key=lambda p: -p[1])[:top]:
+        print(f"  {package}: {cumulative / 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark of the SQLAlchemy compile time of a Superset chart query with and
+without the compiled statement cache of the WFS dialect.
+
+Usage (with the package installed, e.g. pip install -e .):
+
+    python benchmarks/statement_cache.py [iterations]
+"""
+
+import sys
+import timeit
+
+from sqlalchemy import column, func, literal_column, select, table
+
+from superset_wfs_dialect.dialect import WfsDialect
+
+
+class UncachedWfsDialect(WfsDialect):
+    supports_statement_cache = False
+
+
+def build_chart_query(value):
+    """
+    Builds a statement like the ones Superset generates for a bar chart.
+    """
+    layer = table(
+        "topp:states",
+        column("STATE_NAME"),
+        column("SUB_REGION"),
+        column("PERSONS"),
+        column("LAND_KM"),
+    )
+    return (
+        select(
+            layer.c.SUB_REGION.label("SUB_REGION"),
+            func.sum(layer.c.PERSONS).label("SUM(PERSONS)"),
+            func.max(layer.c.LAND_KM).label("MAX(LAND_KM)"),
+        )
+        .where(layer.c.PERSONS > value)
+        .where(layer.c.STATE_NAME.in_(["Texas", "Ohio", "Utah"]))
+        .group_by(layer.c.SUB_REGION)
+        .order_by(literal_column('"SUM(PERSONS)"').desc())
+        .limit(10000)
+    )
+
+
+def compile_chart_queries(dialect, iterations):
+    # the engine only keeps a compiled cache if the dialect supports it
+    compiled_cache = {} if dialect.supports_statement_cache else None
+    for i in range(iterations):
+        build_chart_query(i)._compile_w_cache(
+            dialect, compiled_cache=compiled_cache, column_keys=[]
+        )
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    for name, dialect in (
+        ("without statement cache", UncachedWfsDialect()),
+        ("with statement cache", WfsDialect()),
+    ):
+        seconds = min(
+            timeit.repeat(
+                lambda: compile_chart_queries(dialect, iterations), number=1, repeat=3
+            )
+        )
+        print(f"{name}: {seconds / iterations * 1e6:.1f} µs per chart query")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,9 @@ setup(
     url="https://github.com/terrestris/superset_wfs_dialect",
     packages=find_packages(),
     install_requires=requirements,
+    extras_require={
+        "asyncio": ["aiohttp>=3.9"],
+    },
     entry_points={
         "sqlalchemy.dialects": [
             "wfs = superset_wfs_dialect.dialect:WfsDialect",
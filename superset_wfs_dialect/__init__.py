@@ -1,4 +1,4 @@
-from superset_wfs_dialect.base import connect
+from superset_wfs_dialect.dbapi import connect
 from superset_wfs_dialect.exceptions import (
     DatabaseError,
     DataError,
@@ -0,0 +1,292 @@
+### Optional asyncio based engine for the GetFeature and DescribeFeatureType
+### requests of a connection. All requests run as coroutines on one event loop
+### in a background thread, so a single worker can keep hundreds of requests
+### in flight without a thread per request. Requires aiohttp, which is
+### installed with the "asyncio" extra of this package.
+
+import asyncio
+import atexit
+import logging
+import threading
+from typing import Any, Awaitable, Dict, Hashable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from owslib.feature.schema import _get_describefeaturetype_url
+from owslib.util import ServiceException
+
+from .custom_open_url import SERVICE_EXCEPTION_CONTENT_TYPES, check_service_exception
+from .custom_schema import get_chunks, get_missing_schemas, parse_chunk_schemas
+from .fetch_policy import FetchPolicy, is_page_request
+from .single_flight import in_flight_requests
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - depends on the installed extras
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+# aiohttp sessions by (scheme, netloc). The sessions belong to the event loop
+# and are only used from its thread.
+_sessions: Dict[Tuple[str, str], Any] = {}
+
+
+def check_available() -> None:
+    """
+    Raises an ImportError if the asyncio engine cannot be used.
+    """
+    if aiohttp is None:
+        raise ImportError(
+            "The asyncio fetch engine requires aiohttp, "
+            "install it with: pip install superset-wfs-dialect[asyncio]"
+        )
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the process wide event loop and starts its thread on first use.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="wfs-asyncio", daemon=True
+            ).start()
+            _loop = loop
+        return _loop
+
+
+def run(coroutine: Awaitable):
+    """
+    Runs a coroutine on the event loop and waits for its result.
+
+    :param coroutine: The coroutine to run.
+    :return: The result of the coroutine.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_loop()).result()
+
+
+def _get_session(url: str):
+    """
+    Returns the session for the host of url. The number of parallel requests
+    is limited by the clients, so the connection pool is unbounded.
+    """
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    session = _sessions.get(key)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=0),
+            cookie_jar=aiohttp.DummyCookieJar(),
+        )
+        _sessions[key] = session
+    return session
+
+
+def close_sessions() -> None:
+    """
+    Closes the sessions and their connections.
+    """
+    if _loop is None or not _sessions:
+        return
+
+    async def close():
+        sessions = list(_sessions.values())
+        _sessions.clear()
+        for session in sessions:
+            await session.close()
+
+    run(close())
+
+
+atexit.register(close_sessions)
+
+
+class AsyncWfsClient:
+    """
+    Sends the requests of a connection with aiohttp. The requests use the
+    URL, headers, authentication and timeout of the WFS instance and the
+    retry and hedging policy of the connection.
+    """
+
+    def __init__(
+        self,
+        wfs,
+        max_connections: int,
+        fetch_policy: FetchPolicy,
+        identity: Optional[Hashable] = None,
+    ):
+        """
+        :param wfs: The WFS instance the requests are built with.
+        :param max_connections: The maximum number of parallel requests.
+        :param fetch_policy: The retry and hedging policy of the requests.
+        :param identity: The URL and credentials of the connection. Identical
+            GetFeature requests of clients with the same identity are
+            coalesced while they are in flight.
+        """
+        check_available()
+        self.wfs = wfs
+        self.max_connections = max(1, max_connections)
+        self.fetch_policy = fetch_policy
+        self.identity = identity if identity is not None else id(self)
+
+    def get_feature(self, params: dict, owner: Any = None) -> bytes:
+        """
+        Sends a GetFeature request.
+
+        :param params: The getfeature parameters of the request.
+        :param owner: The owner the request is queued for by the host limiter.
+        :return: The response body.
+        """
+        self._refresh_access_token()
+        return run(self._get_feature(params, owner))
+
+    def get_features(self, params_list: Sequence[dict], owner: Any = None) -> List[bytes]:
+        """
+        Sends several GetFeature requests concurrently, at most
+        max_connections at a time.
+
+        :param params_list: The getfeature parameters of the requests.
+        :param owner: The owner the requests are queued for by the host
+            limiter.
+        :return: The response bodies in the order of params_list.
+        :raises Exception: The error of the first failed request.
+        """
+        self._refresh_access_token()
+        return run(
+            self._gather(self._get_feature(params, owner) for params in params_list)
+        )
+
+    def get_schemas(self, typenames: List[str], chunk_size: int) -> Dict[str, Optional[dict]]:
+        """
+        Describes the feature types with concurrent DescribeFeatureType
+        requests of chunk_size typenames each. Typenames that are missing in
+        a combined response, or whose chunk failed, are requested one by one.
+
+        :param typenames: The names of the layers.
+        :param chunk_size: The maximum number of typenames per request.
+        :return: The schema by typename.
+        """
+        self._refresh_access_token()
+        chunks = get_chunks(typenames, chunk_size)
+        results = run(
+            self._gather(
+                (self._get_chunk_schemas(chunk) for chunk in chunks),
+                return_exceptions=True,
+            )
+        )
+
+        schemas = {}
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                logger.warning(
+                    "Combined DescribeFeatureType request failed for %s: %s",
+                    chunk,
+                    result,
+                )
+            else:
+                schemas.update(result)
+
+        return get_missing_schemas(
+            self.wfs.url,
+            typenames,
+            schemas,
+            self.wfs.version,
+            timeout=self.wfs.timeout,
+            headers=self.wfs.headers,
+            auth=self.wfs.auth,
+        )
+
+    def _refresh_access_token(self) -> None:
+        # the OAuth2 token is refreshed in the calling thread, once per batch
+        if hasattr(self.wfs, "inject_access_token"):
+            self.wfs.inject_access_token()
+
+    async def _gather(self, coroutines, return_exceptions=False) -> list:
+        semaphore = asyncio.Semaphore(self.max_connections)
+
+        async def limited(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        tasks = [asyncio.ensure_future(limited(c)) for c in coroutines]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        finally:
+            # stop the remaining requests if one of them failed
+            for task in tasks:
+                task.cancel()
+
+    async def _get_feature(self, params: dict, owner: Any = None) -> bytes:
+        params = dict(params)
+        params.pop("stream", None)
+        method = params.pop("method", "GET")
+        if isinstance(params.get("typename"), str):
+            params["typename"] = [params["typename"]]
+
+        if method.upper() == "GET":
+            url = self.wfs.getGETGetFeatureRequest(method="Get", **params)
+            data = None
+        else:
+            url, data = self.wfs.getPOSTGetFeatureRequest(method="Post", **params)
+
+        description = f"GetFeature {params.get('typename')} at index {params.get('startindex')}"
+        return await in_flight_requests.call_async(
+            (self.identity, url, data),
+            lambda: self.fetch_policy.call_async(
+                lambda: self._request(url, data),
+                description,
+                owner,
+                track_latency=is_page_request(params),
+            ),
+        )
+
+    async def _get_chunk_schemas(self, typenames: List[str]) -> Dict[str, Optional[dict]]:
+        describe_url = _get_describefeaturetype_url(
+            self.wfs.url, self.wfs.version, ",".join(typenames)
+        )
+        content = await self.fetch_policy.call_async(
+            lambda: self._request(describe_url),
+            f"DescribeFeatureType {typenames}",
+            track_latency=False,
+        )
+        return parse_chunk_schemas(content, typenames)
+
+    async def _request(self, url: str, data: Optional[str] = None) -> bytes:
+        """
+        Sends a request and checks the response like openURL.
+        """
+        headers = dict(self.wfs.headers or {})
+        kwargs = {}
+        auth = self.wfs.auth
+        if auth is not None and auth.username and auth.password:
+            kwargs["auth"] = aiohttp.BasicAuth(auth.username, auth.password)
+        if auth is not None and not auth.verify:
+            kwargs["ssl"] = False
+
+        if data is not None:
+            method = "POST"
+            headers["Content-Type"] = "text/xml; charset=utf-8"
+            kwargs["data"] = data.encode("utf-8") if isinstance(data, str) else data
+        else:
+            method = "GET"
+
+        session = _get_session(url)
+        async with session.request(
+            method,
+            url,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=self.wfs.timeout),
+            **kwargs,
+        ) as response:
+            content = await response.read()
+            if response.status == 400:
+                raise ServiceException(content.decode("utf-8", errors="replace"))
+            response.raise_for_status()
+            if response.content_type in SERVICE_EXCEPTION_CONTENT_TYPES:
+                check_service_exception(content)
+            return content
@@ -1,12 +1,28 @@
+import inspect
+import itertools
 import math
 import logging
+import re
+import time
 import sqlglot
 import sqlglot.expressions
 import xml.etree.ElementTree as ET
 import orjson
 from concurrent.futures import ThreadPoolExecutor, as_completed
-
-from typing import Any, Dict, List, Optional, Tuple, TypedDict, Union
+from io import BytesIO
+
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypedDict,
+    Union,
+)
 
 from owslib.fes2 import (
     And,
@@ -22,18 +38,72 @@ from owslib.fes2 import (
     PropertyIsNotEqualTo,
     PropertyIsNull,
 )
+from owslib.etree import etree
 from owslib.util import Authentication
-from .custom_open_url import openURL
+from .cache import TTLCache, freeze
+from .constants import GEOMETRY_COLUMN_NAME
+from .custom_open_url import openURL, set_pool_size
 
+from .single_flight import in_flight_requests
 from .sql_logger import SQLLogger
 from .custom_literal_operator import CustomLiteralOperator
+from .custom_schema import DEFAULT_SCHEMA_CHUNK_SIZE
 from .custom_wfs200 import WebFeatureService_2_0_0
+from .dbapi import FakeDbApi, dbapi  # noqa: F401
+from .feature_type_schemas import LazyFeatureTypeSchemas, get_feature_type_schema
+from .fetch_policy import (
+    DEFAULT_RETRIES,
+    DEFAULT_RETRY_BACKOFF,
+    FetchPolicy,
+    get_latency_tracker,
+    is_page_request,
+)
+from .geojson_stream import FeatureCollectionStream
+from .host_limiter import get_host_limiter
+from .page_stream import PageStream
+from .metadata_cache import (
+    DEFAULT_METADATA_CACHE_TTL,
+    ConnectionMetadata,
+    get_metadata_cache_key,
+    metadata_cache,
+)
+from .metadata_file_cache import (
+    MetadataFile,
+    read_metadata_file,
+    revalidate_in_background,
+    write_metadata_file,
+)
+from .result_cache import (
+    DEFAULT_RESULT_CACHE_TTL,
+    estimate_size,
+    get_result_cache_key,
+    result_cache,
+)
 from .wfs_oauth import WfsOauth
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-GEOMETRY_COLUMN_NAME = "geom"
+QUERY_PLAN_CACHE_MAXSIZE = 256
+
+# Request the first page right away and read the number of features from it
+FETCH_STRATEGY_FIRST_PAGE = "first_page"
+# Request the number of features with resultType=hits before the first page
+FETCH_STRATEGY_HITS = "hits"
+FETCH_STRATEGIES = [FETCH_STRATEGY_FIRST_PAGE, FETCH_STRATEGY_HITS]
+
+# Send the requests of a query from a thread pool
+FETCH_ENGINE_THREADS = "threads"
+# Send the requests of a query as coroutines with aiohttp, see async_engine
+FETCH_ENGINE_ASYNCIO = "asyncio"
+FETCH_ENGINES = [FETCH_ENGINE_THREADS, FETCH_ENGINE_ASYNCIO]
+
+# Page size if the server does not announce a CountDefault
+DEFAULT_PAGE_SIZE = 10000
+
+# Maximum number of groups of a GROUP BY COUNT(*) query that are counted with
+# one resultType=hits request each
+GROUP_COUNT_MAX_VALUES = 50
 
 SUPPORTED_EXPRESSIONS = [
     sqlglot.expressions.EQ,
@@ -107,6 +177,134 @@ class AggregationInfo(TypedDict):
     groupby: str
 
 
+class Extremum(TypedDict):
+    """
+    A MIN or MAX aggregation that is answered by the first feature of a
+    sorted GetFeature request.
+
+    Attributes:
+    column: str
+        The result column of the aggregation.
+    propertyname: str
+        The property to aggregate.
+    sortby: str
+        The order of the request, ascending for MIN and descending for MAX.
+    filter_xml: str
+        The WFS Filter XML of the WHERE clause, extended by the condition
+        that the property is not null.
+    """
+
+    column: str
+    propertyname: str
+    sortby: str
+    filter_xml: str
+
+
+class GroupCount(TypedDict):
+    """
+    A COUNT(*) grouped by one property, which can be answered by one
+    resultType=hits request per group.
+
+    Attributes:
+    groupby: str
+        The property to group by.
+    group_column: Optional[str]
+        The result column of the group value, None if it is not selected.
+    count_column: str
+        The result column of the count.
+    condition: Optional[sqlglot.expressions.Expression]
+        The WHERE clause, which is combined with the group value.
+    values: List[Any]
+        The group values of an IN or = condition of the WHERE clause.
+    """
+
+    groupby: str
+    group_column: Optional[str]
+    count_column: str
+    condition: Optional[sqlglot.expressions.Expression]
+    values: List[Any]
+
+
+class QueryPlan(TypedDict):
+    """
+    The WFS requests and post-processing steps derived from a SQL statement.
+
+    Attributes:
+    typename: str
+        The WFS typename (layer).
+    propertynames: List[str]
+        The requested property names.
+    requested_columns: Dict[str, str]
+        The requested columns as { 'name': 'alias' }.
+    projection: Optional[List[str]]
+        The columns to request from the WFS, None for all properties.
+    distinct: bool
+        Whether the query is a SELECT DISTINCT.
+    filter_xml: Optional[str]
+        The WFS Filter XML of the WHERE clause.
+    aggregation_info: List[AggregationInfo]
+        The aggregations to perform.
+    count_only: bool
+        Whether the query only counts the matching features, e.g.
+        SELECT COUNT(*) FROM layer WHERE ..., which is answered by a
+        resultType=hits request.
+    extrema: Optional[List[Extremum]]
+        The aggregations of a query that only selects MIN and MAX of
+        properties without grouping, None for other queries.
+    group_count: Optional[GroupCount]
+        The grouping of a query that only counts the features per value of
+        a property, None for other queries.
+    order: List[Tuple[str, bool]]
+        The columns to order by with a flag for descending order.
+    sortby: Optional[List[str]]
+        The order as WFS sortBy, e.g. ["name DESC"], if the server sorts the
+        features. None if the rows are sorted after fetching them.
+    limit: Optional[int]
+        The row limit.
+    schema: Optional[dict]
+        The feature type schema the plan was created with. A plan is only
+        reused as long as the connection holds this very schema.
+    """
+
+    typename: str
+    propertynames: List[str]
+    requested_columns: Dict[str, str]
+    projection: Optional[List[str]]
+    distinct: bool
+    filter_xml: Optional[str]
+    aggregation_info: List[AggregationInfo]
+    count_only: bool
+    extrema: Optional[List[Extremum]]
+    group_count: Optional[GroupCount]
+    order: List[Tuple[str, bool]]
+    sortby: Optional[List[str]]
+    limit: Optional[int]
+    schema: Optional[dict]
+
+
+# Query plans by WFS and normalized SQL statement
+query_plan_cache = TTLCache(maxsize=QUERY_PLAN_CACHE_MAXSIZE)
+
+# pyformat placeholders and escaped percent signs
+_PYFORMAT_PATTERN = re.compile(r"%\((\w+)\)s|%%")
+
+# Whitespace outside of quoted literals and identifiers
+_SQL_WHITESPACE_PATTERN = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|\s+""")
+
+
+def normalize_sql(operation: str) -> str:
+    """
+    Normalizes a SQL statement for the use as cache key. Collapses whitespace
+    outside of quoted literals and identifiers.
+
+    :param operation: The SQL statement.
+    :return: The normalized SQL statement.
+    """
+    return _SQL_WHITESPACE_PATTERN.sub(
+        lambda m: m.group(1) or " ", operation
+    ).strip()
+
+
 class Connection:
     def __init__(
         self,
@@ -115,7 +313,31 @@ class Connection:
         password=None,
         oauth2_client=None,
         max_workers=5,
+        lazy_schema_loading=False,
+        metadata_cache_ttl=DEFAULT_METADATA_CACHE_TTL,
+        metadata_cache_dir=None,
+        schema_chunk_size=DEFAULT_SCHEMA_CHUNK_SIZE,
+        fetch_strategy=FETCH_STRATEGY_FIRST_PAGE,
+        page_retries=DEFAULT_RETRIES,
+        page_retry_backoff=DEFAULT_RETRY_BACKOFF,
+        page_hedging=False,
+        fetch_engine=FETCH_ENGINE_THREADS,
+        host_max_requests=None,
+        result_cache_ttl=DEFAULT_RESULT_CACHE_TTL,
     ):
+        if fetch_strategy not in FETCH_STRATEGIES:
+            raise ValueError(
+                f"Unsupported fetch strategy {fetch_strategy}, use one of {FETCH_STRATEGIES}"
+            )
+        if fetch_engine not in FETCH_ENGINES:
+            raise ValueError(
+                f"Unsupported fetch engine {fetch_engine}, use one of {FETCH_ENGINES}"
+            )
+        if fetch_engine == FETCH_ENGINE_ASYNCIO:
+            # aiohttp is only imported if the asyncio engine is used
+            from . import async_engine
+
+            async_engine.check_available()
         self.base_url = base_url
         self.username = username
         self.password = password
@@ -123,31 +345,197 @@ class Connection:
         self.server_info = {}
         self.wfs_output_format = None
         self.max_workers = max_workers
+        self.schema_chunk_size = max(1, schema_chunk_size)
+        self.fetch_strategy = fetch_strategy
+        self.fetch_engine = fetch_engine
+        self.result_cache_ttl = result_cache_ttl
+        self._async_client = None
+        # bounds the load of all connections to the same WFS host
+        host_limiter = get_host_limiter(base_url, host_max_requests)
+        self.fetch_policy = FetchPolicy(
+            retries=page_retries,
+            retry_backoff=page_retry_backoff,
+            hedging=page_hedging,
+            latency_tracker=get_latency_tracker(base_url),
+            host_limiter=host_limiter,
+        )
         self.oauth2_client_info = oauth2_client
-
-        wfs_args = {"url": base_url, "version": "2.0.0"}
-
         self.use_oidc = oauth2_client is not None
-        if self.use_oidc:
-            self.wfs = WfsOauth(**wfs_args, oauth_info=oauth2_client)
+        self.metadata_cache_ttl = metadata_cache_ttl
+        self.metadata_cache_dir = metadata_cache_dir
+        self.lazy_schema_loading = lazy_schema_loading
+        self.metadata_cache_key = get_metadata_cache_key(
+            base_url, username, password, oauth2_client
+        )
+        # eager and lazy connections do not share their schema containers and
+        # cache files
+        self._metadata_key = self.metadata_cache_key + (lazy_schema_loading,)
+        # keep a connection open for every parallel request, the requests of
+        # all connections to the host share the pool
+        pool_size = max_workers
+        if host_limiter is not None:
+            pool_size = max(pool_size, host_limiter.max_requests)
+        set_pool_size(base_url, pool_size)
+
+        metadata = (
+            metadata_cache.get(self._metadata_key) if metadata_cache_ttl else None
+        )
+        if metadata is not None:
+            logger.debug("Using cached metadata for WFS %s", base_url)
+            self._apply_metadata(metadata)
+            return
+
+        metadata_file = (
+            read_metadata_file(metadata_cache_dir, self._metadata_key)
+            if metadata_cache_dir
+            else None
+        )
+        if metadata_file is not None:
+            logger.debug("Using metadata cache file for WFS %s", base_url)
+            self._apply_metadata_file(metadata_file)
+            # without an in-memory cache, the file is revalidated after the
+            # default TTL instead of on every connect
+            max_age = metadata_cache_ttl or DEFAULT_METADATA_CACHE_TTL
+            if time.time() - metadata_file["created"] >= max_age:
+                revalidate_in_background(
+                    self._metadata_key, self._revalidate_metadata_file
+                )
         else:
-            if username and password:
-                wfs_args["username"] = username
-                wfs_args["password"] = password
-            self.wfs = WebFeatureService_2_0_0(
-                **wfs_args,
-                # circumvent OWSLib auth issues
-                auth=Authentication(),
+            self._load_metadata(lazy_schema_loading)
+            if metadata_cache_dir:
+                self._write_metadata_file(metadata_cache_dir)
+
+        if metadata_cache_ttl:
+            metadata_cache.set(
+                self._metadata_key, self._get_metadata(), ttl=metadata_cache_ttl
             )
 
+    def _load_metadata(self, lazy_schema_loading=False):
+        """
+        Requests the capabilities and feature type schemas from the WFS.
+
+        :param lazy_schema_loading: Whether to defer DescribeFeatureType
+            requests until a schema is accessed.
+        """
+        self.wfs = self._create_wfs()
         self.server_side_max_features = self._get_server_side_max_features()
+        self.implements_sorting = self._get_implements_sorting()
         self.wfs_output_format = self._get_output_format()
 
-        # Initial DescribeFeatureType for all available layers
-        self._cache_feature_type_schemas()
+        if lazy_schema_loading:
+            # DescribeFeatureType is requested per layer on first access
+            self.feature_type_schemas = LazyFeatureTypeSchemas(self.wfs)
+        else:
+            # Initial DescribeFeatureType for all available layers
+            self._cache_feature_type_schemas()
+
+    def _create_wfs(self, xml=None):
+        """
+        Creates the WFS instance, which requests the capabilities document
+        unless it is given.
+
+        :param xml: Optional capabilities document to use instead of a request.
+        :return: The WFS instance.
+        """
+        wfs_args = {"url": self.base_url, "version": "2.0.0"}
+        if xml is not None:
+            wfs_args["xml"] = xml
+
+        if self.use_oidc:
+            return WfsOauth(**wfs_args, oauth_info=self.oauth2_client_info)
+
+        if self.username and self.password:
+            wfs_args["username"] = self.username
+            wfs_args["password"] = self.password
+        return WebFeatureService_2_0_0(
+            **wfs_args,
+            # circumvent OWSLib auth issues
+            auth=Authentication(),
+        )
 
-    def cursor(self):
-        return Cursor(self)
+    def _apply_metadata_file(self, metadata_file: MetadataFile):
+        self.wfs = self._create_wfs(xml=metadata_file["capabilities"])
+        self.server_side_max_features = metadata_file["server_side_max_features"]
+        self.implements_sorting = self._get_implements_sorting()
+        self.wfs_output_format = metadata_file["wfs_output_format"]
+        # schemas missing in the file are requested on first access
+        self.feature_type_schemas = LazyFeatureTypeSchemas(
+            self.wfs, metadata_file["feature_type_schemas"]
+        )
+
+    def _write_metadata_file(self, cache_dir):
+        schemas = self.feature_type_schemas
+        if isinstance(schemas, LazyFeatureTypeSchemas):
+            schemas = schemas.loaded_schemas()
+        write_metadata_file(
+            cache_dir,
+            self._metadata_key,
+            base_url=self.base_url,
+            capabilities=etree.tostring(self.wfs._capabilities, encoding="unicode"),
+            server_side_max_features=self.server_side_max_features,
+            wfs_output_format=self.wfs_output_format,
+            feature_type_schemas=dict(schemas),
+        )
+
+    def _revalidate_metadata_file(self):
+        """
+        Fetches the current metadata from the WFS and updates the cache file
+        and the in-memory cache with it.
+        """
+        connection = Connection(
+            base_url=self.base_url,
+            username=self.username,
+            password=self.password,
+            oauth2_client=self.oauth2_client_info,
+            max_workers=self.max_workers,
+            lazy_schema_loading=self.lazy_schema_loading,
+            metadata_cache_ttl=0,
+            schema_chunk_size=self.schema_chunk_size,
+            fetch_engine=self.fetch_engine,
+        )
+        connection._write_metadata_file(self.metadata_cache_dir)
+        if self.metadata_cache_ttl:
+            metadata_cache.set(
+                self._metadata_key,
+                connection._get_metadata(),
+                ttl=self.metadata_cache_ttl,
+            )
+        logger.debug("Revalidated metadata cache file for WFS %s", self.base_url)
+
+    def _get_metadata(self) -> ConnectionMetadata:
+        return {
+            "wfs": self.wfs,
+            "server_side_max_features": self.server_side_max_features,
+            "implements_sorting": self.implements_sorting,
+            "wfs_output_format": self.wfs_output_format,
+            "feature_type_schemas": self.feature_type_schemas,
+        }
+
+    def _apply_metadata(self, metadata: ConnectionMetadata):
+        self.wfs = metadata["wfs"]
+        self.server_side_max_features = metadata["server_side_max_features"]
+        self.implements_sorting = metadata["implements_sorting"]
+        self.wfs_output_format = metadata["wfs_output_format"]
+        self.feature_type_schemas = metadata["feature_type_schemas"]
+
+    @property
+    def async_client(self):
+        """
+        The client of the asyncio fetch engine, created on first use.
+        """
+        if self._async_client is None:
+            from . import async_engine
+
+            self._async_client = async_engine.AsyncWfsClient(
+                self.wfs,
+                self.max_workers,
+                self.fetch_policy,
+                identity=self.metadata_cache_key,
+            )
+        return self._async_client
+
+    def cursor(self, stream=False):
+        return Cursor(self, stream=stream)
 
     def close(self):
         pass
@@ -201,18 +589,63 @@ class Connection:
     def _cache_feature_type_schemas(self):
         """
         Get schema of every feature type and store in a dictionary.
+        The feature types are described in chunks of schema_chunk_size per
+        DescribeFeatureType request, and the chunks are requested in parallel,
+        limited to max_workers concurrent requests. A layer whose schema cannot
+        be fetched is logged and skipped.
         """
-        for feature_type in self.wfs.contents:
-            schema = self.wfs.get_schema(typename=feature_type)
-            self.feature_type_schemas[feature_type] = schema
+        typenames = list(self.wfs.contents)
+        if not typenames:
+            return
+
+        # layers of the same namespace can be described in one request
+        sorted_typenames = sorted(
+            typenames, key=lambda t: t.split(":")[0] if ":" in t else ""
+        )
+        chunks = [
+            sorted_typenames[i : i + self.schema_chunk_size]
+            for i in range(0, len(sorted_typenames), self.schema_chunk_size)
+        ]
+
+        if self.fetch_engine == FETCH_ENGINE_ASYNCIO:
+            schemas = self.async_client.get_schemas(
+                sorted_typenames, self.schema_chunk_size
+            )
+            for typename in typenames:
+                if typename in schemas:
+                    self.feature_type_schemas[typename] = schemas[typename]
+            return
+
+        schemas = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_chunk = {
+                executor.submit(
+                    self.wfs.get_schemas, chunk, chunk_size=self.schema_chunk_size
+                ): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(future_to_chunk):
+                try:
+                    schemas.update(future.result())
+                except Exception as e:
+                    logger.error(
+                        "Error fetching schemas for feature types %s: %s",
+                        future_to_chunk[future],
+                        e,
+                    )
+
+        # keep the order of the capabilities document
+        for typename in typenames:
+            if typename in schemas:
+                self.feature_type_schemas[typename] = schemas[typename]
 
     def _get_server_side_max_features(self) -> int:
         """
         Gets the server-side maximum number of features for a given typename
         from the WFS GetCapabilities document.
 
-        :param typename: The WFS typename (layer).
-        :return: The maximum number of features as an integer, or None if not found.
+        :return: The maximum number of features as an integer, or 0 if the
+            server does not announce it.
         """
         count_default_element = self.wfs._capabilities.find(
             ".//ows:Constraint[@name='CountDefault']/ows:DefaultValue",
@@ -228,11 +661,43 @@ class Connection:
         logger.info("Maximum number of features: %s", count_default)
         return count_default
 
+    def _get_implements_sorting(self) -> bool:
+        """
+        Checks whether the server announces the ImplementsSorting constraint
+        in the GetCapabilities document, i.e. whether it sorts the features
+        of a GetFeature request by its sortBy. Depending on the server, the
+        constraint is part of the filter capabilities or the operations
+        metadata.
+
+        :return: True if the server sorts features.
+        """
+        implements_sorting_element = self.wfs._capabilities.find(
+            ".//{*}Constraint[@name='ImplementsSorting']/{*}DefaultValue"
+        )
+        implements_sorting = (
+            implements_sorting_element is not None
+            and (implements_sorting_element.text or "").strip().upper() == "TRUE"
+        )
+        logger.info("Server implements sorting: %s", implements_sorting)
+        return implements_sorting
+
 
 class Cursor:
-    def __init__(self, connection: Connection):
+    def __init__(self, connection: Connection, stream: bool = False):
+        """
+        :param connection: The WFS connection.
+        :param stream: Whether to fetch the rows of non-aggregating queries
+            while they are consumed, see _execute_streaming.
+        """
         self.connection = connection
+        self.stream = stream
+        # https://peps.python.org/pep-0249/#arraysize
+        self.arraysize = 1
         self.data: List[Any] = []
+        # Rows of a streaming execution
+        self._rows: Optional[Iterator[dict]] = None
+        self._stream_rows: Optional[Generator[dict, None, None]] = None
+        self._page_stream: Optional[PageStream] = None
         # https://peps.python.org/pep-0249/#description
         self.description: Optional[
             List[Tuple[str, str, None, None, None, None, bool]]
@@ -242,6 +707,8 @@ class Cursor:
         self.requested_columns: Dict = {}
         self.typename: Optional[str] = None
         self.propertynames: List[str] = ["*"]
+        # The columns to request from the WFS, None for all properties
+        self.projection: Optional[List[str]] = None
         self.sql_logger = SQLLogger()
         self.rowcount: Optional[int] = None
 
@@ -255,24 +722,39 @@ class Cursor:
         :return: None
         """
         operation = operation.strip()
+        self._close_stream()
 
         self.sql_logger.log_sql(operation, parameters)
 
+        if parameters is not None:
+            operation = self._render_parameters(operation, parameters)
+
         if operation.lower() == "select 1":
             self._handle_dummy_query()
             return
 
-        ast = self._parse_sql(operation)
-        self.typename = self._extract_typename(ast)
-        self.propertynames = self._extract_propertynames(ast)
-        self.requested_columns = self._extract_requested_columns(ast)
-        limit = self._extract_limit(ast)
-        filterXml = self._extract_filter(ast)
-        if not isinstance(ast, sqlglot.expressions.Select):
-            raise ValueError("Only SELECT statements are supported for aggregation")
-        aggregation_info = self._get_aggregationinfo(ast)
+        plan = self._get_query_plan(operation)
+        self.typename = plan["typename"]
+        self.propertynames = list(plan["propertynames"])
+        self.requested_columns = dict(plan["requested_columns"])
+        self.projection = plan["projection"]
+        filterXml = plan["filter_xml"]
+
+        if plan["count_only"] and self._execute_count(plan):
+            return
+
+        if plan["extrema"]:
+            self._execute_extrema(plan)
+            return
 
-        if ast.args.get("distinct"):
+        if plan["group_count"] and self._execute_group_count(plan):
+            return
+
+        if self.stream and self._is_streamable(plan):
+            self._execute_streaming(plan)
+            return
+
+        if plan["distinct"]:
             if len(self.propertynames) == 1:
                 col = self.propertynames[0]
                 alias = self.requested_columns.get(col, col)
@@ -294,17 +776,663 @@ class Cursor:
 
         logger.info("Requesting WFS layer %s", self.typename)
 
-        all_features = self._fetch_all_features(self.typename, filterXml)
+        # without aggregation and with ordering done by the server only the
+        # first rows are needed
+        max_features = plan["limit"] if self._is_streamable(plan) else None
+        all_features = self._fetch_all_features(
+            self.typename, filterXml, max_features, plan["sortby"]
+        )
         all_rows = [self._feature_to_row(feature) for feature in all_features]
-        aggregated_data = self._aggregate_rows(all_rows, aggregation_info)
-        self._apply_limit(aggregated_data, limit)
-        self._apply_order(ast, aggregated_data, aggregation_info)
+        aggregated_data = self._aggregate_rows(all_rows, plan["aggregation_info"])
+        if plan["sortby"] is None:
+            self._sort_rows(aggregated_data, plan["order"])
+        self._apply_limit(aggregated_data, plan["limit"])
 
         self.data = aggregated_data
         self.rowcount = len(self.data)
         self.description = self._generate_description()
         self._index = 0
 
+    def _is_streamable(self, plan: QueryPlan) -> bool:
+        """
+        Checks whether the rows of a query can be returned while they are
+        fetched. Aggregations, DISTINCT and ordering that is not done by the
+        server need all rows.
+
+        :param plan: The query plan.
+        :return: True if the query can be streamed.
+        """
+        if plan["distinct"] or plan["aggregation_info"]:
+            return False
+        return not plan["order"] or plan["sortby"] is not None
+
+    def _execute_count(self, plan: QueryPlan) -> bool:
+        """
+        Answers an ungrouped COUNT(*) query with a single resultType=hits
+        request instead of fetching the features.
+
+        :param plan: The query plan.
+        :return: False if the server does not report the number of features,
+            so the features have to be counted after fetching them.
+        """
+        logger.info("Counting features of WFS layer %s", self.typename)
+        try:
+            count = self._get_feature_count(self.typename, plan["filter_xml"])
+        except ValueError as e:
+            logger.warning("Falling back to counting the features: %s", e)
+            return False
+
+        column = next(iter(self.requested_columns.values()))
+        self.data = [{column: count}]
+        self._apply_limit(self.data, plan["limit"])
+        self.rowcount = len(self.data)
+        self.description = self._generate_description()
+        self._index = 0
+        return True
+
+    def _execute_extrema(self, plan: QueryPlan) -> None:
+        """
+        Answers an ungrouped MIN/MAX query with one GetFeature request per
+        aggregation, which is sorted by the property and returns only the
+        first feature. The requests are sent in parallel.
+
+        :param plan: The query plan.
+        :return: None
+        """
+        logger.info("Requesting extrema of WFS layer %s", self.typename)
+        params_list = []
+        for extremum in plan["extrema"]:
+            params = self._get_getfeature_params(
+                self.typename, extremum["filter_xml"], [extremum["sortby"]]
+            )
+            params["propertyname"] = [extremum["propertyname"]]
+            params_list.append(params)
+
+        if self.connection.fetch_engine == FETCH_ENGINE_ASYNCIO:
+            responses = self.connection.async_client.get_features(
+                [dict(params, maxfeatures=1, startindex=0) for params in params_list],
+                owner=self,
+            )
+            feature_collections = [orjson.loads(response) for response in responses]
+        else:
+            max_workers = min(self.connection.max_workers, len(params_list))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                feature_collections = list(
+                    executor.map(
+                        lambda params: self._get_FeatureCollection(
+                            params, limit=1, startindex=0
+                        ),
+                        params_list,
+                    )
+                )
+
+        row = {}
+        for extremum, feature_collection in zip(plan["extrema"], feature_collections):
+            features = feature_collection.get("features") if feature_collection else None
+            # no feature has a value, so the aggregation is NULL
+            properties = (features[0].get("properties") or {}) if features else {}
+            row[extremum["column"]] = properties.get(extremum["propertyname"])
+
+        self.data = [row]
+        self._apply_limit(self.data, plan["limit"])
+        self.rowcount = len(self.data)
+        self.description = self._generate_description()
+        self._index = 0
+
+    def _execute_group_count(self, plan: QueryPlan) -> bool:
+        """
+        Answers a GROUP BY COUNT(*) query whose WHERE clause restricts the
+        group property to a few values with one resultType=hits request per
+        value, sent in parallel. The counts are only used if they add up to
+        the total number of features.
+
+        :param plan: The query plan.
+        :return: False if the features have to be fetched and counted.
+        """
+        group_count = plan["group_count"]
+        groupby = group_count["groupby"]
+        values = group_count["values"]
+        if len(values) > GROUP_COUNT_MAX_VALUES:
+            logger.debug("Too many groups for hits requests: %s", len(values))
+            return False
+
+        logger.info("Counting %s groups of WFS layer %s", len(values), self.typename)
+        filter_xmls = [plan["filter_xml"]] + [
+            self._get_group_filter_xml(group_count, value) for value in values
+        ]
+        try:
+            total, *counts = self._get_feature_counts(self.typename, filter_xmls)
+        except ValueError as e:
+            logger.warning("Falling back to counting the features: %s", e)
+            return False
+        if sum(counts) != total:
+            logger.debug("Groups do not add up to %s features", total)
+            return False
+
+        data = []
+        for value, count in zip(values, counts):
+            # GROUP BY only returns groups with features
+            if not count:
+                continue
+            row = {groupby: value, group_count["count_column"]: count}
+            if group_count["group_column"]:
+                row[group_count["group_column"]] = value
+            data.append(row)
+
+        self._sort_rows(data, plan["order"])
+        self._apply_limit(data, plan["limit"])
+        self.data = data
+        self.rowcount = len(self.data)
+        self.description = self._generate_description()
+        self._index = 0
+        return True
+
+    def _get_group_filter_xml(self, group_count: GroupCount, value: Any) -> str:
+        """
+        Builds the filter of the features of one group.
+
+        :param group_count: The grouping of the query.
+        :param value: The group value.
+        :return: The WFS Filter XML of the WHERE clause and the group value.
+        """
+        column = sqlglot.expressions.column(group_count["groupby"])
+        if value is None:
+            condition = sqlglot.expressions.Is(
+                this=column, expression=sqlglot.expressions.Null()
+            )
+        else:
+            condition = sqlglot.expressions.EQ(
+                this=column, expression=sqlglot.expressions.convert(value)
+            )
+        if group_count["condition"] is not None:
+            condition = sqlglot.expressions.and_(group_count["condition"], condition)
+        return self._get_filter_xml(condition)
+
+    def _execute_streaming(self, plan: QueryPlan) -> None:
+        """
+        Executes a query without loading all rows. Returns as soon as the
+        first page is available, the remaining pages are fetched in the
+        background while the rows are consumed via fetchone/fetchmany. The
+        number of rows is unknown, so rowcount is -1.
+
+        :param plan: The query plan.
+        :return: None
+        """
+        logger.info("Streaming WFS layer %s", self.typename)
+
+        if self.connection.fetch_engine == FETCH_ENGINE_ASYNCIO:
+            # the asyncio engine receives the pages completely
+            request_params, limit, first_page, startindexes = self._plan_pages(
+                self.typename, plan["filter_xml"], plan["limit"], plan["sortby"]
+            )
+            pages: Iterable[Iterable[Feature]] = [first_page]
+            page_stream = None
+            if startindexes:
+                pages, page_stream = self._stream_pages(
+                    request_params, limit, first_page, startindexes
+                )
+            self._page_stream = page_stream
+        else:
+            pages = self._iter_decoded_pages(plan)
+            page_stream = None
+
+        rows = self._iter_stream_rows(pages, plan["limit"], page_stream)
+        self._stream_rows = rows
+        # the description is derived from the first row
+        first_rows = list(itertools.islice(rows, 1))
+        self._rows = itertools.chain(first_rows, rows)
+
+        self.data = []
+        self.rowcount = -1
+        self.description = self._generate_description(first_rows)
+        self._index = 0
+
+    def _iter_decoded_pages(self, plan: QueryPlan) -> Iterator[FeatureCollectionStream]:
+        """
+        Yields the pages of a streaming query as decoders of their responses,
+        so that the features are decoded while they are consumed and a page
+        is never held in memory as a whole. Unless the fetch strategy
+        requests the number of features first, it is read from the first
+        page once its features are consumed, and the remaining pages are
+        requested after that. A page is closed when the next page is taken.
+
+        :param plan: The query plan.
+        :return: An iterator of pages.
+        """
+        max_features = plan["limit"]
+        if max_features == 0:
+            return
+        if self.connection.fetch_strategy == FETCH_STRATEGY_HITS:
+            request_params, limit, _, startindexes = self._plan_pages(
+                self.typename, plan["filter_xml"], max_features, plan["sortby"]
+            )
+        else:
+            request_params = self._get_getfeature_params(
+                self.typename, plan["filter_xml"], plan["sortby"]
+            )
+            limit = self._get_page_size()
+            if max_features is not None:
+                limit = min(limit, max_features)
+            first_page = self._open_FeatureCollectionStream(request_params, limit, 0)
+            try:
+                yield first_page
+            finally:
+                first_page.close()
+            limit, startindexes = self._plan_remaining_pages(
+                self.typename,
+                plan["filter_xml"],
+                max_features,
+                limit,
+                first_page.feature_count,
+                self._get_number_matched(first_page.members),
+            )
+        if not startindexes:
+            return
+
+        page_stream = PageStream(
+            lambda start_idx: self._open_FeatureCollectionStream(
+                request_params, limit, start_idx
+            ),
+            startindexes,
+            self.connection.max_workers,
+            discard=FeatureCollectionStream.close,
+        )
+        self._page_stream = page_stream
+        try:
+            for page in page_stream:
+                try:
+                    yield page
+                finally:
+                    page.close()
+        finally:
+            page_stream.close()
+
+    def _stream_pages(
+        self,
+        request_params: dict,
+        limit: int,
+        first_page: List[Feature],
+        startindexes: List[int],
+    ) -> Tuple[Iterable[List[Feature]], PageStream]:
+        """
+        Fetches the remaining pages of a query in the background, see
+        _plan_pages.
+
+        :param request_params: The GetFeature request parameters.
+        :param limit: The page size.
+        :param first_page: The features of the first page, if requested.
+        :param startindexes: The startindexes of the remaining pages.
+        :return: The pages in order and the stream fetching them, which has
+            to be closed if not all pages are consumed.
+        """
+
+        def fetch_page(start_idx):
+            feature_collection = self._get_FeatureCollection(
+                request_params, limit=limit, startindex=start_idx
+            )
+            return feature_collection.get("features", []) if feature_collection else []
+
+        page_stream = PageStream(fetch_page, startindexes, self.connection.max_workers)
+        return itertools.chain([first_page], page_stream), page_stream
+
+    def _iter_stream_rows(
+        self,
+        pages: Iterable[List[Feature]],
+        row_limit: Optional[int],
+        page_stream: Optional[PageStream],
+    ) -> Iterator[dict]:
+        """
+        Converts the features of the pages to rows. Stops fetching pages once
+        the row limit is reached.
+
+        :param pages: The pages of features.
+        :param row_limit: The row limit.
+        :param page_stream: The stream fetching the pages in the background.
+        :return: An iterator of rows.
+        """
+        rows = (self._feature_to_row(feature) for page in pages for feature in page)
+        try:
+            yield from itertools.islice(rows, row_limit)
+        finally:
+            if page_stream is not None:
+                page_stream.close()
+            if inspect.isgenerator(pages):
+                # closes the response that is being decoded
+                pages.close()
+
+    def _close_stream(self) -> None:
+        """
+        Stops the background requests of a streaming execution and discards
+        its remaining rows.
+        """
+        if self._stream_rows is not None:
+            self._stream_rows.close()
+            self._stream_rows = None
+        if self._page_stream is not None:
+            self._page_stream.close()
+            self._page_stream = None
+        self._rows = None
+
+    def _render_parameters(self, operation: str, parameters: Dict) -> str:
+        """
+        Renders pyformat parameters into the SQL operation as literals.
+        SQLAlchemy passes the values of a statement as bound parameters,
+        while the WFS filter is built from the literals of the SQL. Like any
+        pyformat driver, a literal percent sign is expected as %%, which
+        SQLAlchemy escapes whenever parameters are passed, even if they are
+        empty.
+
+        :param operation: The SQL operation with %(name)s placeholders.
+        :param parameters: The parameter values by name.
+        :return: The SQL operation with the rendered values.
+        """
+        if not isinstance(parameters, dict):
+            raise ValueError("Only named parameters are supported")
+
+        def render(match):
+            name = match.group(1)
+            if name is None:
+                return "%"
+            if name not in parameters:
+                raise ValueError(f"Missing value for parameter {name}")
+            return self._to_sql_literal(parameters[name])
+
+        return _PYFORMAT_PATTERN.sub(render, operation)
+
+    def _to_sql_literal(self, value) -> str:
+        """
+        Converts a parameter value into a SQL literal.
+
+        :param value: The parameter value.
+        :return: The SQL literal.
+        """
+        if value is None:
+            return "NULL"
+        if isinstance(value, bool):
+            return "TRUE" if value else "FALSE"
+        if isinstance(value, (int, float)):
+            return repr(value)
+        if isinstance(value, (list, tuple)):
+            return ", ".join(self._to_sql_literal(v) for v in value)
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        return "'" + str(value).replace("'", "''") + "'"
+
+    def _get_query_plan(self, operation: str) -> QueryPlan:
+        """
+        Returns the query plan of a SQL operation. Plans are cached by WFS and
+        normalized SQL, so repeated queries are neither parsed nor converted
+        to filter XML again. A cached plan is discarded if the schema of its
+        feature type has been replaced in the meantime.
+
+        :param operation: The SQL operation.
+        :return: The query plan.
+        """
+        key = (self.connection.base_url, normalize_sql(operation))
+        plan = query_plan_cache.get(key)
+        if plan is not None:
+            schema = self.connection.feature_type_schemas.get(plan["typename"])
+            if schema is plan["schema"]:
+                logger.debug("Using cached query plan")
+                return plan
+
+        plan = self._create_query_plan(operation)
+        query_plan_cache.set(key, plan)
+        return plan
+
+    def _create_query_plan(self, operation: str) -> QueryPlan:
+        """
+        Parses a SQL operation and derives the query plan from it.
+
+        :param operation: The SQL operation.
+        :return: The query plan.
+        """
+        ast = self._parse_sql(operation)
+        # the typename is needed to build the filter
+        self.typename = self._extract_typename(ast)
+        propertynames = self._extract_propertynames(ast)
+        requested_columns = self._extract_requested_columns(ast)
+        limit = self._extract_limit(ast)
+        filterXml = self._extract_filter(ast)
+        if not isinstance(ast, sqlglot.expressions.Select):
+            raise ValueError("Only SELECT statements are supported for aggregation")
+        aggregation_info = self._get_aggregationinfo(ast)
+        distinct = bool(ast.args.get("distinct"))
+        order = self._extract_order(ast, aggregation_info)
+
+        return {
+            "typename": self.typename,
+            "propertynames": propertynames,
+            "requested_columns": requested_columns,
+            "projection": self._extract_projection(ast, propertynames),
+            "distinct": distinct,
+            "filter_xml": filterXml,
+            "aggregation_info": aggregation_info,
+            "count_only": self._is_count_only(ast),
+            "extrema": self._extract_extrema(ast, requested_columns),
+            "group_count": self._extract_group_count(ast, requested_columns),
+            "order": order,
+            "sortby": (
+                None
+                if distinct or aggregation_info
+                else self._get_sortby(self.typename, order)
+            ),
+            "limit": limit,
+            "schema": self.connection.feature_type_schemas.get(self.typename),
+        }
+
+    def _is_count_only(self, ast: sqlglot.expressions.Select) -> bool:
+        """
+        Checks whether a query only selects the number of matching features,
+        i.e. COUNT(*) or COUNT(1) without grouping. COUNT(column) counts the
+        non-null values and needs the features.
+
+        :param ast: The SQL AST.
+        :return: True if the query can be answered by a hits request.
+        """
+        if ast.args.get("distinct") or ast.args.get("group") or ast.args.get("having"):
+            return False
+        if len(ast.expressions) != 1:
+            return False
+        count = ast.expressions[0].unalias()
+        if not isinstance(count, sqlglot.expressions.Count):
+            return False
+        return isinstance(
+            count.this, (sqlglot.expressions.Star, sqlglot.expressions.Literal)
+        )
+
+    def _extract_extrema(
+        self, ast: sqlglot.expressions.Select, requested_columns: Dict[str, str]
+    ) -> Optional[List[Extremum]]:
+        """
+        Plans a query that only selects MIN and MAX of properties without
+        grouping, e.g. the time range of a layer. MIN and MAX ignore null
+        values, so the features without a value are filtered out.
+
+        :param ast: The SQL AST.
+        :param requested_columns: The requested columns of the query.
+        :return: The extrema to request, or None if the query needs all
+            features.
+        """
+        if ast.args.get("distinct") or ast.args.get("group") or ast.args.get("having"):
+            return None
+        # the extrema are the first features sorted by the server
+        if not self.connection.implements_sorting:
+            return None
+        # the result columns must be distinguishable
+        if len(requested_columns) != len(ast.expressions):
+            return None
+        fiona_schema = get_feature_type_schema(self.connection, self.typename)
+        if fiona_schema is None:
+            return None
+        properties = fiona_schema.get("properties") or {}
+        where = ast.args.get("where")
+
+        extrema = []
+        for expression, column in zip(ast.expressions, requested_columns.values()):
+            aggregation = expression.unalias()
+            if not isinstance(
+                aggregation, (sqlglot.expressions.Min, sqlglot.expressions.Max)
+            ) or not isinstance(aggregation.this, sqlglot.expressions.Column):
+                return None
+            propertyname = aggregation.this.name
+            if propertyname not in properties:
+                return None
+
+            condition = sqlglot.expressions.not_(
+                sqlglot.expressions.Is(
+                    this=sqlglot.expressions.column(propertyname),
+                    expression=sqlglot.expressions.Null(),
+                )
+            )
+            if where:
+                condition = sqlglot.expressions.and_(where.this, condition)
+            descending = isinstance(aggregation, sqlglot.expressions.Max)
+            extrema.append(
+                {
+                    "column": column,
+                    "propertyname": propertyname,
+                    "sortby": f"{propertyname} {'DESC' if descending else 'ASC'}",
+                    "filter_xml": self._get_filter_xml(condition),
+                }
+            )
+        return extrema
+
+    def _extract_group_count(
+        self, ast: sqlglot.expressions.Select, requested_columns: Dict[str, str]
+    ) -> Optional[GroupCount]:
+        """
+        Plans a query that only counts the features per value of a property
+        and restricts the property to a few values, e.g. SELECT category,
+        COUNT(*) FROM layer WHERE category IN ('a', 'b') GROUP BY category.
+
+        :param ast: The SQL AST.
+        :param requested_columns: The requested columns of the query.
+        :return: The grouping, or None if the query needs all features.
+        """
+        group = ast.args.get("group")
+        if ast.args.get("distinct") or ast.args.get("having") or not group:
+            return None
+        if len(group.expressions) != 1 or not isinstance(
+            group.expressions[0], sqlglot.expressions.Column
+        ):
+            return None
+        if len(requested_columns) != len(ast.expressions):
+            return None
+        groupby = group.expressions[0].name
+        fiona_schema = get_feature_type_schema(self.connection, self.typename)
+        if fiona_schema is None or groupby not in (fiona_schema.get("properties") or {}):
+            return None
+
+        group_column = None
+        count_column = None
+        for expression, column in zip(ast.expressions, requested_columns.values()):
+            selected = expression.unalias()
+            if isinstance(selected, sqlglot.expressions.Column) and selected.name == groupby:
+                group_column = column
+            elif (
+                isinstance(selected, sqlglot.expressions.Count)
+                and isinstance(
+                    selected.this, (sqlglot.expressions.Star, sqlglot.expressions.Literal)
+                )
+                and count_column is None
+            ):
+                count_column = column
+            else:
+                return None
+        if count_column is None:
+            return None
+
+        where = ast.args.get("where")
+        condition = where.this if where else None
+        # without the values of the WHERE clause, the groups are only known
+        # after fetching the features
+        values = self._extract_group_values(condition, groupby)
+        if values is None:
+            return None
+        return {
+            "groupby": groupby,
+            "group_column": group_column,
+            "count_column": count_column,
+            "condition": condition,
+            "values": values,
+        }
+
+    def _extract_group_values(self, condition, groupby: str) -> Optional[List[Any]]:
+        """
+        Extracts the values of the group property from an IN or = condition
+        of the WHERE clause, e.g. category IN ('a', 'b').
+
+        :param condition: The WHERE clause.
+        :param groupby: The property to group by.
+        :return: The group values, or None if the WHERE clause does not
+            restrict the group property to literals.
+        """
+        if condition is None:
+            return None
+        conjuncts = (
+            condition.flatten()
+            if isinstance(condition, sqlglot.expressions.And)
+            else [condition]
+        )
+        for conjunct in conjuncts:
+            if not isinstance(conjunct.this, sqlglot.expressions.Column):
+                continue
+            if conjunct.this.name != groupby:
+                continue
+            if isinstance(conjunct, sqlglot.expressions.In):
+                literals = conjunct.args.get("expressions") or []
+            elif isinstance(conjunct, sqlglot.expressions.EQ):
+                literals = [conjunct.args["expression"]]
+            else:
+                continue
+            if literals and all(
+                isinstance(literal, sqlglot.expressions.Literal) for literal in literals
+            ):
+                return list(
+                    dict.fromkeys(self._literal_to_value(literal) for literal in literals)
+                )
+        return None
+
+    def _literal_to_value(self, literal: sqlglot.expressions.Literal) -> Any:
+        """
+        Converts a SQL literal into the value of a property, keeping its SQL
+        type: strings stay str, e.g. '1', numbers become int or float.
+
+        :param literal: The SQL literal.
+        :return: The value.
+        """
+        if literal.is_string:
+            return literal.this
+        if literal.is_int:
+            return int(literal.this)
+        return float(literal.this)
+
+    def _get_sortby(
+        self, typename: str, order: List[Tuple[str, bool]]
+    ) -> Optional[List[str]]:
+        """
+        Translates the order of a query into a WFS sortBy. The server can only
+        sort by properties of the feature type, not by the feature id or the
+        geometry. Where features without a value are sorted depends on the
+        server, so only non-nillable properties are sorted by the server and
+        NULL values are sorted by _sort_rows.
+
+        :param typename: The WFS typename (layer).
+        :param order: The (column, descending) tuples of the query.
+        :return: The sortBy, or None if the server cannot sort the features.
+        """
+        if not order or not self.connection.implements_sorting:
+            return None
+        fiona_schema = get_feature_type_schema(self.connection, typename)
+        if fiona_schema is None:
+            return None
+        properties = fiona_schema.get("properties") or {}
+        required = fiona_schema.get("required") or []
+        if any(col not in properties or col not in required for col, _ in order):
+            return None
+        return [f"{col} {'DESC' if desc else 'ASC'}" for col, desc in order]
+
     def _handle_dummy_query(self):
         self.data = [{"dummy": 1}]
         self.description = [("dummy", "int", None, None, None, None, True)]
@@ -365,6 +1493,40 @@ class Cursor:
 
         return propertynames
 
+    def _extract_projection(self, ast, propertynames) -> Optional[List[str]]:
+        """Determines the columns to request from the WFS. These are the
+        selected, grouped and ordered properties of the feature type. The
+        columns of the WHERE clause are evaluated by the server and are not
+        needed. The geometry is only requested if the query selects it.
+
+        :param ast: The SQL AST.
+        :param propertynames: The selected property names.
+        :return: The column names, or None to request all properties.
+        """
+        if any(isinstance(col, sqlglot.expressions.Star) for col in ast.expressions):
+            return None
+        fiona_schema = get_feature_type_schema(self.connection, self.typename)
+        if fiona_schema is None:
+            return None
+        properties = fiona_schema.get("properties") or {}
+
+        referenced = list(propertynames)
+        for clause in ("group", "order"):
+            if ast.args.get(clause):
+                referenced += [
+                    col.name
+                    for col in ast.args[clause].find_all(sqlglot.expressions.Column)
+                ]
+
+        projection = []
+        for name in referenced:
+            if name in projection:
+                continue
+            if name in properties or name == GEOMETRY_COLUMN_NAME:
+                projection.append(name)
+        # e.g. COUNT(*) does not refer to any property
+        return projection or None
+
     def _extract_requested_columns(self, ast):
         """Extracts requested columns from the SQL AST.
         Returns a dictionary of { 'property_name': 'alias' }.
@@ -412,12 +1574,21 @@ class Cursor:
         """
         where_expr = ast.find(sqlglot.expressions.Where)
         if where_expr:
-            filter = self._get_filter_from_expression(where_expr.this)
-            filterXml = ET.tostring(filter.toXML()).decode("utf-8")
-            logger.debug("### WFS Filter XML:\n%s", filterXml)
-            return filterXml
+            return self._get_filter_xml(where_expr.this)
         return None
 
+    def _get_filter_xml(self, expression) -> str:
+        """
+        Converts a condition into WFS Filter XML.
+
+        :param expression: The sqlglot expression of the condition.
+        :return: The WFS Filter XML as a string.
+        """
+        filter = self._get_filter_from_expression(expression)
+        filterXml = ET.tostring(filter.toXML()).decode("utf-8")
+        logger.debug("### WFS Filter XML:\n%s", filterXml)
+        return filterXml
+
     def _feature_to_row(self, feature: Feature) -> dict:
         """
         Converts a WFS feature to a dictionary row.
@@ -433,76 +1604,129 @@ class Cursor:
         row[GEOMETRY_COLUMN_NAME] = orjson.dumps(geom).decode() if geom else None
         return row
 
-    def _fetch_all_features(self, typename, filterXml) -> List[Feature]:
+    def _fetch_all_features(
+        self,
+        typename,
+        filterXml,
+        max_features: Optional[int] = None,
+        sortby: Optional[List[str]] = None,
+    ) -> List[Feature]:
+        """
+        Fetches the features of a query. If the connection enables the result
+        cache, identical queries within its TTL are answered from the cache.
+
+        :param typename: The WFS typename (layer) to fetch features from.
+        :param filterXml: The WFS Filter XML to apply to the request.
+        :param max_features: The maximum number of features to fetch.
+        :param sortby: The order of the features as WFS sortBy.
+        :return: A list of features.
+        """
+        ttl = self.connection.result_cache_ttl
+        if not ttl:
+            return self._request_all_features(
+                typename, filterXml, max_features, sortby
+            )
+
+        cache_key = get_result_cache_key(
+            self.connection.metadata_cache_key,
+            self._get_getfeature_params(typename, filterXml, sortby),
+            max_features,
+        )
+        features = result_cache.get(cache_key)
+        if features is not None:
+            logger.debug("Using cached features of %s", typename)
+            return list(features)
+
+        features = self._request_all_features(
+            typename, filterXml, max_features, sortby
+        )
+        size = estimate_size(features, limit=result_cache.maxbytes)
+        if not result_cache.set(cache_key, features, ttl=ttl, size=size):
+            logger.debug("Features of %s are too large for the result cache", typename)
+        return list(features)
+
+    def _request_all_features(
+        self,
+        typename,
+        filterXml,
+        max_features: Optional[int] = None,
+        sortby: Optional[List[str]] = None,
+    ) -> List[Feature]:
         """
         Fetches all features from the WFS server, handling pagination if necessary.
         Uses parallel requests to improve performance.
 
         :param typename: The WFS typename (layer) to fetch features from.
         :param filterXml: The WFS Filter XML to apply to the request.
+        :param max_features: The maximum number of features to fetch. Pages
+            are then fetched in order until enough features are available.
+        :param sortby: The order of the features as WFS sortBy.
         :return: A list of features.
         """
         # If we have an aggregation, we have to recursively call the WFS until all features are fetched
         # and then aggregate them in Python
-        limit = 10000
-
-        # Get the total number of features to calculate the number of requests needed
-        total_features = self._get_feature_count(typename=typename, filterXml=filterXml)
-        logger.debug("### Total features available: %s", total_features)
-
-        if total_features == 0:
-            return []
-
-        # fetch as many features as possible with one request
-        if self.connection.server_side_max_features is not None:
-            limit = self.connection.server_side_max_features
-        else:
-            if total_features / limit > 100:
-                # reduce requests if there are too many features to never reach 100 requests
-                limit = self._round_up_to_nearest_power(n=(total_features / 100))
+        request_params, limit, first_page, startindexes = self._plan_pages(
+            typename, filterXml, max_features, sortby
+        )
+        if not startindexes:
+            return first_page[:max_features]
 
-        # Calculate the number of requests needed
-        num_requests = math.ceil(total_features / limit) if limit > 0 else 1
-        logger.debug("### Will make %s requests with limit %s", num_requests, limit)
+        if max_features is not None:
+            pages, page_stream = self._stream_pages(
+                request_params, limit, first_page, startindexes
+            )
+            try:
+                return list(
+                    itertools.islice(itertools.chain.from_iterable(pages), max_features)
+                )
+            finally:
+                # cancel the pages that are no longer needed
+                page_stream.close()
 
         # If only one request is needed, fetch directly
-        if num_requests == 1:
+        if len(startindexes) == 1 and not first_page:
             logger.debug("Fetching all features in a single request")
             feature_collection = self._get_FeatureCollection(
-                typename=typename,
+                request_params,
                 limit=limit,
-                filterXml=filterXml,
-                startindex=0,
+                startindex=startindexes[0],
             )
             return feature_collection.get("features", []) if feature_collection else []
 
+        if self.connection.fetch_engine == FETCH_ENGINE_ASYNCIO:
+            feature_collections = self._get_FeatureCollections(
+                request_params, limit, startindexes
+            )
+            return first_page + [
+                feature
+                for feature_collection in feature_collections
+                for feature in feature_collection.get("features", [])
+            ]
+
         # Create a helper function for fetching a single page
+        # Errors are raised after the retries of the fetch policy, so that a
+        # failed page never results in partial data
         def fetch_page(start_idx):
             logger.info("Fetching features from %s to %s", start_idx, start_idx + limit)
-            try:
-                feature_collection = self._get_FeatureCollection(
-                    typename=typename,
-                    limit=limit,
-                    filterXml=filterXml,
-                    startindex=start_idx,
-                )
-                if feature_collection:
-                    return (start_idx, feature_collection.get("features", []))
-                return (start_idx, [])
-            except Exception as e:
-                logger.error("Error fetching features at index %s: %s", start_idx, e)
-                return (start_idx, [])
+            feature_collection = self._get_FeatureCollection(
+                request_params,
+                limit=limit,
+                startindex=start_idx,
+            )
+            if feature_collection:
+                return (start_idx, feature_collection.get("features", []))
+            return (start_idx, [])
 
         # Fetch all pages in parallel
         max_workers = self.connection.max_workers
         logger.debug("Using %s parallel workers for fetching features", max_workers)
         logger.debug("Fetching features for aggregation")
 
-        # Create all startindex values
-        startindexes = [i * limit for i in range(num_requests)]
+        results = []
+        if first_page:
+            results.append((0, first_page))
 
         # Fetch pages in parallel, limiting concurrent requests to max_workers
-        results = []
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Submit only max_workers requests at a time
             future_to_startindex = {}
@@ -543,6 +1767,122 @@ class Cursor:
         logger.debug("### Fetched %s features total", len(all_features))
         return all_features
 
+    def _plan_pages(
+        self,
+        typename,
+        filterXml,
+        max_features: Optional[int] = None,
+        sortby: Optional[List[str]] = None,
+    ) -> Tuple[dict, int, List[Feature], List[int]]:
+        """
+        Determines the pages to request for a query. Depending on the fetch
+        strategy of the connection, the first page is requested right away.
+
+        :param typename: The WFS typename (layer) to fetch features from.
+        :param filterXml: The WFS Filter XML to apply to the request.
+        :param max_features: The maximum number of features needed.
+        :param sortby: The order of the features as WFS sortBy.
+        :return: The GetFeature request parameters, the page size, the
+            features of the first page if it was already requested, and the
+            startindexes of the pages that still have to be requested.
+        """
+        # The request parameters are the same for every page
+        request_params = self._get_getfeature_params(typename, filterXml, sortby)
+        first_page: List[Feature] = []
+        if max_features == 0:
+            return request_params, 0, first_page, []
+
+        if self.connection.fetch_strategy == FETCH_STRATEGY_HITS:
+            # Get the total number of features to calculate the number of requests needed
+            total_features = self._get_feature_count(
+                typename=typename, filterXml=filterXml
+            )
+            logger.debug("### Total features available: %s", total_features)
+            if max_features is not None:
+                total_features = min(total_features, max_features)
+            if total_features == 0:
+                return request_params, 0, first_page, []
+            limit = self._get_page_size(total_features)
+            if max_features is not None:
+                limit = min(limit, max_features)
+        else:
+            # Request the first page right away, it tells the total number of features
+            limit = self._get_page_size()
+            if max_features is not None:
+                limit = min(limit, max_features)
+            feature_collection = self._get_FeatureCollection(
+                request_params, limit=limit, startindex=0
+            )
+            first_page = (
+                feature_collection.get("features", []) if feature_collection else []
+            )
+            limit, startindexes = self._plan_remaining_pages(
+                typename,
+                filterXml,
+                max_features,
+                limit,
+                len(first_page),
+                self._get_number_matched(feature_collection),
+            )
+            return request_params, limit, first_page, startindexes
+
+        # Calculate the number of requests needed
+        num_requests = math.ceil(total_features / limit) if limit > 0 else 1
+        logger.debug("### Will make %s requests with limit %s", num_requests, limit)
+
+        # Create all startindex values
+        startindexes = [i * limit for i in range(num_requests)]
+        return request_params, limit, first_page, startindexes
+
+    def _plan_remaining_pages(
+        self,
+        typename,
+        filterXml,
+        max_features: Optional[int],
+        limit: int,
+        first_page_size: int,
+        total_features: Optional[int],
+    ) -> Tuple[int, List[int]]:
+        """
+        Determines the pages to request after the first page of a query.
+
+        :param typename: The WFS typename (layer) to fetch features from.
+        :param filterXml: The WFS Filter XML to apply to the request.
+        :param max_features: The maximum number of features needed.
+        :param limit: The page size of the first page.
+        :param first_page_size: The number of features of the first page.
+        :param total_features: The number of features reported by the first
+            page, None if it is unknown.
+        :return: The page size of the remaining pages, which grows with the
+            total number of features, and their startindexes.
+        """
+        if total_features is None:
+            if first_page_size < limit:
+                # the first page is not full, so there are no more features
+                return limit, []
+            logger.debug("Number of features unknown, requesting hits")
+            total_features = self._get_feature_count(
+                typename=typename, filterXml=filterXml
+            )
+        logger.debug("### Total features available: %s", total_features)
+        if max_features is not None:
+            total_features = min(total_features, max_features)
+        if total_features <= first_page_size:
+            return limit, []
+        if 0 < first_page_size < limit:
+            # the server returns less features per request than requested
+            limit = first_page_size
+        else:
+            # the first page was requested before the total was known
+            limit = max(limit, self._get_page_size(total_features))
+
+        # the first page has already been requested, unless it was empty
+        startindexes = list(range(first_page_size, total_features, limit))
+        logger.debug(
+            "### Will make %s more requests with limit %s", len(startindexes), limit
+        )
+        return limit, startindexes
+
     def _aggregate_rows(
         self, all_rows, aggregation_info: List[AggregationInfo]
     ) -> List[dict]:
@@ -632,13 +1972,27 @@ class Cursor:
         :param aggregation_info: The aggregation information.
         :return: None
         """
+        self._sort_rows(data, self._extract_order(ast, aggregation_info))
+
+    def _extract_order(
+        self, ast, aggregation_info: List[AggregationInfo]
+    ) -> List[Tuple[str, bool]]:
+        """
+        Extracts the ordering from the SQL AST.
+
+        :param ast: The SQL AST.
+        :param aggregation_info: The aggregation information.
+        :return: A list of (column, descending) tuples.
+        """
         order_expr = ast.args.get("order")
         if not order_expr:
-            return
+            return []
+
+        order_by = []
         for order in order_expr.expressions:
             # default: sort by column name
             order_col = None
-            reverse = order.args.get("desc", False)
+            reverse = bool(order.args.get("desc", False))
 
             # metric or column
             if hasattr(order.this, "name"):
@@ -665,8 +2019,22 @@ class Cursor:
             else:
                 order_col = str(order.this)
 
+            order_by.append((order_col, reverse))
+        return order_by
+
+    def _sort_rows(self, data, order_by: List[Tuple[str, bool]]):
+        """
+        Sorts the data in place by the given columns.
+
+        :param data: The data to sort.
+        :param order_by: A list of (column, descending) tuples.
+        :return: None
+        """
+        # sort by the last column first, so that the stable sort keeps the
+        # order of the later columns among rows with equal values
+        for order_col, reverse in reversed(order_by):
             # None vlaues will be set to the end (ASC) or beginning (DESC)
-            def sort_key(row):
+            def sort_key(row, order_col=order_col):
                 val = row.get(order_col)
                 # None values always last (ASC) or first (DESC)
                 if val is None:
@@ -679,6 +2047,42 @@ class Cursor:
 
             data.sort(key=sort_key, reverse=reverse)
 
+    def _get_page_size(self, total_features: Optional[int] = None) -> int:
+        """
+        Returns the number of features to request per GetFeature request.
+
+        :param total_features: The total number of features, if known.
+        :return: The page size.
+        """
+        # fetch as many features as possible with one request, 0 means that
+        # the server does not announce a CountDefault
+        if self.connection.server_side_max_features:
+            return self.connection.server_side_max_features
+        limit = DEFAULT_PAGE_SIZE
+        if total_features is not None and total_features / limit > 100:
+            # reduce requests if there are too many features to never reach 100 requests
+            limit = self._round_up_to_nearest_power(n=(total_features / 100))
+        return limit
+
+    def _get_number_matched(self, feature_collection) -> Optional[int]:
+        """
+        Reads the total number of matching features from a GeoJSON
+        FeatureCollection. GeoServer reports it as numberMatched and/or
+        totalFeatures, other servers may omit it or report "unknown".
+
+        :param feature_collection: The GeoJSON FeatureCollection.
+        :return: The number of features, or None if it is unknown.
+        """
+        if not feature_collection:
+            return None
+        for key in ("numberMatched", "totalFeatures"):
+            value = feature_collection.get(key)
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                continue
+        return None
+
     def _round_up_to_nearest_power(self, n) -> int:
         """
         Rounds up n to the nearest power of 1, 2, 5, or 10.
@@ -707,73 +2111,240 @@ class Cursor:
         :param filterXml: Optional WFS Filter XML to apply to the request.
         :return: The number of features as an integer.
         """
-        response = self.connection.wfs.getfeature(
-            typename=typename, result_type="hits", filter=filterXml
-        )
-        response_text = response.read()
+        params = self._get_hits_params(typename, filterXml)
 
+        def request():
+            if self.connection.fetch_engine == FETCH_ENGINE_ASYNCIO:
+                return self.connection.async_client.get_feature(
+                    dict(params, method="POST" if filterXml else "GET"), owner=self
+                )
+            return self.connection.fetch_policy.call(
+                lambda: self.connection.wfs.getfeature(**params).read(),
+                f"GetFeature hits {typename}",
+                owner=self,
+                track_latency=False,
+            )
+
+        response_text = in_flight_requests.call(self._get_request_key(params), request)
+        return self._parse_feature_count(response_text)
+
+    def _get_feature_counts(
+        self, typename: str, filter_xmls: List[Optional[str]]
+    ) -> List[int]:
+        """
+        Gets the number of features for several filters with concurrent
+        resultType=hits requests.
+
+        :param typename: The WFS typename (layer).
+        :param filter_xmls: The WFS Filter XMLs, None for all features.
+        :return: The numbers of features in the order of filter_xmls.
+        """
+        if self.connection.fetch_engine == FETCH_ENGINE_ASYNCIO:
+            responses = self.connection.async_client.get_features(
+                [
+                    dict(
+                        self._get_hits_params(typename, filter_xml),
+                        method="POST" if filter_xml else "GET",
+                    )
+                    for filter_xml in filter_xmls
+                ],
+                owner=self,
+            )
+            return [self._parse_feature_count(response) for response in responses]
+
+        max_workers = min(self.connection.max_workers, len(filter_xmls))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(
+                executor.map(
+                    lambda filter_xml: self._get_feature_count(typename, filter_xml),
+                    filter_xmls,
+                )
+            )
+
+    def _get_hits_params(self, typename: str, filterXml: Optional[str] = None) -> dict:
+        """
+        Builds the getfeature parameters of a resultType=hits request.
+        """
+        return {"typename": typename, "result_type": "hits", "filter": filterXml}
+
+    def _parse_feature_count(self, response_text) -> int:
+        """
+        Reads numberMatched from the response of a resultType=hits request.
+
+        :param response_text: The response body.
+        :return: The number of features.
+        :raises ValueError: If the server does not report the number.
+        """
         try:
             count_ast = ET.fromstring(response_text)
         except ET.ParseError as e:
             logger.error("Error while parsing the WFS answer: %s", e)
             raise ValueError("Error while parsing the WFS answer")
 
-        count = int(count_ast.attrib["numberMatched"])
+        number_matched = count_ast.attrib.get("numberMatched")
+        try:
+            count = int(number_matched)
+        except (TypeError, ValueError):
+            raise ValueError(f"Number of features unknown: {number_matched}")
         logger.info("Number of features: %s", count)
         return count
 
-    def _get_FeatureCollection(
+    def _get_getfeature_params(
         self,
         typename: str,
-        limit: Optional[int] = None,
         filterXml: Optional[str] = None,
-        startindex: Optional[int] = None,
-    ) -> FeatureCollection:
+        sortby: Optional[List[str]] = None,
+    ) -> dict:
         """
-        Gets a FeatureCollection from the WFS server. Handles both GET and POST methods
-        depending on whether a filterXml is provided.
+        Builds the GetFeature request parameters that are shared by all pages
+        of a query. Uses POST if a filterXml is provided, GET otherwise.
 
         :param typename: The WFS typename (layer).
-        :param limit: The maximum number of features to fetch.
         :param filterXml: Optional WFS Filter XML to apply to the request.
-        :param startindex: The starting index for pagination.
-        :return: The FeatureCollection as a dictionary.
+        :param sortby: Optional order of the features, e.g. ["name DESC"].
+        :return: The request parameters without maxfeatures and startindex.
         """
-        wfs = self.connection.wfs
-
-        propertyname = (
-            None if filterXml and self.propertynames == ["*"] else self.propertynames
-        )
-
-        fiona_schema = wfs.get_schema(typename)
-        if fiona_schema is not None and propertyname is not None:
-            geometry_column = fiona_schema.get("geometry_column")
-            propertyname = [
-                geometry_column if x == GEOMETRY_COLUMN_NAME else x
-                for x in propertyname
-            ]
-
         params = {
             "typename": typename,
-            "maxfeatures": limit,
-            "startindex": startindex,
             "method": "POST" if filterXml else "GET",
             "srsname": "EPSG:4326",
             "outputFormat": (
                 self.connection.wfs_output_format or "application/json"
             ),
         }
+        if sortby:
+            params["sortby"] = sortby
         if filterXml:
             params["filter"] = filterXml
-        else:
-            # It is unclear, why the propertyname is not included in the request
-            # that contains a filter. This should be checked.
-            # TODO check, why propertyname is not included if filterXml is provided.
-            params["propertyname"] = propertyname
 
-        response = wfs.getfeature(**params)
-        featuresString = response.read().decode("utf-8")
-        return orjson.loads(featuresString)
+        propertyname = self.projection
+        if not propertyname:
+            return params
+        fiona_schema = get_feature_type_schema(self.connection, typename)
+        if fiona_schema is not None:
+            geometry_column = fiona_schema.get("geometry_column")
+            propertyname = [
+                geometry_column if x == GEOMETRY_COLUMN_NAME else x
+                for x in propertyname
+            ]
+        params["propertyname"] = propertyname
+        return params
+
+    def _get_FeatureCollection(
+        self,
+        request_params: dict,
+        limit: Optional[int] = None,
+        startindex: Optional[int] = None,
+    ) -> FeatureCollection:
+        """
+        Gets a FeatureCollection from the WFS server.
+
+        :param request_params: The GetFeature parameters of the query, see
+            _get_getfeature_params.
+        :param limit: The maximum number of features to fetch.
+        :param startindex: The starting index for pagination.
+        :return: The FeatureCollection as a dictionary.
+        """
+        params = dict(
+            request_params, maxfeatures=limit, startindex=startindex, stream=True
+        )
+
+        def request():
+            if self.connection.fetch_engine == FETCH_ENGINE_ASYNCIO:
+                return orjson.loads(
+                    self.connection.async_client.get_feature(params, owner=self)
+                )
+            return self.connection.fetch_policy.call(
+                lambda: self._request_FeatureCollection(params),
+                f"GetFeature {params['typename']} at index {startindex}",
+                owner=self,
+                track_latency=is_page_request(params),
+            )
+
+        # identical requests of concurrent queries share the FeatureCollection
+        return in_flight_requests.call(self._get_request_key(params), request)
+
+    def _get_request_key(self, params: dict) -> Tuple:
+        """
+        Identifies a GetFeature request for coalescing. Only requests of
+        connections with the same credentials are coalesced.
+
+        :param params: The getfeature parameters of the request.
+        :return: The key of the request.
+        """
+        return (self.connection.metadata_cache_key, freeze(params))
+
+    def _get_FeatureCollections(
+        self, request_params: dict, limit: int, startindexes: List[int]
+    ) -> List[FeatureCollection]:
+        """
+        Gets the pages of a query concurrently with the asyncio fetch engine.
+
+        :param request_params: The GetFeature parameters of the query, see
+            _get_getfeature_params.
+        :param limit: The number of features per page.
+        :param startindexes: The starting indexes of the pages.
+        :return: The FeatureCollections in the order of startindexes.
+        """
+        logger.debug(
+            "Fetching %s pages with the asyncio engine", len(startindexes)
+        )
+        responses = self.connection.async_client.get_features(
+            [
+                dict(request_params, maxfeatures=limit, startindex=startindex)
+                for startindex in startindexes
+            ],
+            owner=self,
+        )
+        return [orjson.loads(response) for response in responses]
+
+    def _open_FeatureCollectionStream(
+        self, request_params: dict, limit: int, startindex: int
+    ) -> FeatureCollectionStream:
+        """
+        Sends a GetFeature request and returns the decoder of its response.
+        The features are read from the connection while they are consumed.
+        Unlike _get_FeatureCollection, the request is not shared with
+        identical requests of other queries, and only failures before the
+        response is received are retried.
+
+        :param request_params: The GetFeature parameters of the query, see
+            _get_getfeature_params.
+        :param limit: The maximum number of features to fetch.
+        :param startindex: The starting index for pagination.
+        :return: The decoder, which has to be closed.
+        """
+        params = dict(
+            request_params, maxfeatures=limit, startindex=startindex, stream=True
+        )
+        response = self.connection.fetch_policy.call(
+            lambda: self.connection.wfs.getfeature(**params),
+            f"GetFeature {params['typename']} at index {startindex}",
+            owner=self,
+            # only the time until the response starts is measured
+            track_latency=False,
+        )
+        return FeatureCollectionStream(response)
+
+    def _request_FeatureCollection(self, params: dict) -> FeatureCollection:
+        """
+        Sends a GetFeature request and decodes the FeatureCollection.
+
+        :param params: The GetFeature parameters.
+        :return: The FeatureCollection as a dictionary.
+        """
+        response = self.connection.wfs.getfeature(**params)
+        if isinstance(response, BytesIO):
+            # small responses are already in memory
+            return orjson.loads(response.getvalue())
+
+        # large responses are read from the connection as bytes and parsed
+        # by orjson without decoding them to a str first
+        try:
+            return orjson.loads(response.read())
+        finally:
+            if hasattr(response, "close"):
+                response.close()
 
     def _get_aggregationinfo(
         self, ast: sqlglot.expressions.Select
@@ -991,15 +2562,17 @@ class Cursor:
         return SQL_GLOT_FES_MAP[operator_cls](propertyname=property_name, literal=literal)
 
 
-    def _generate_description(self):
+    def _generate_description(self, rows: Optional[List[dict]] = None):
         """
         Generates the column description in the correct order.
 
+        :param rows: The rows to describe, defaults to the cursor's data.
         :return: The column description as a list of tuples.
         """
         description = []
+        rows = self.data if rows is None else rows
 
-        if not self.data:
+        if not rows:
             description = []
             return
 
@@ -1007,7 +2580,7 @@ class Cursor:
             # For SELECT * all columns in the order in which they appear
             description = [
                 (col, self._get_column_type(col), None, None, None, None, True)
-                for col in self.data[0].keys()
+                for col in rows[0].keys()
             ]
         else:
             # Otherwise only the requested columns in the correct order
@@ -1051,6 +2624,8 @@ class Cursor:
 
         :return: A list of all rows.
         """
+        if self._rows is not None:
+            return [self._get_row_values(row) for row in self._rows]
         return [self._get_row_values(row) for row in self.data]
 
     def fetchone(self):
@@ -1059,26 +2634,34 @@ class Cursor:
 
         :return: The next row as a tuple, or None if no more rows are available.
         """
+        if self._rows is not None:
+            row = next(self._rows, None)
+            return None if row is None else self._get_row_values(row)
         if self._index >= len(self.data):
             return None
         row = self._get_row_values(self.data[self._index])
         self._index += 1
         return row
 
-    def fetchmany(self, size=1):
+    def fetchmany(self, size=None):
         """
         Fetches the next set of rows from the cursor's data.
 
-        :param size: The number of rows to fetch.
+        :param size: The number of rows to fetch, defaults to arraysize.
         :return: A list of rows.
         """
+        size = self.arraysize if size is None else size
+        if self._rows is not None:
+            return [
+                self._get_row_values(row) for row in itertools.islice(self._rows, size)
+            ]
         end = self._index + size
         rows = [self._get_row_values(row) for row in self.data[self._index : end]]
         self._index = min(end, len(self.data))
         return rows
 
     def close(self):
-        pass
+        self._close_stream()
 
 
 def connect(*args, **kwargs):
@@ -1086,17 +2669,33 @@ def connect(*args, **kwargs):
     username = kwargs.get("username")
     password = kwargs.get("password")
     oauth2_client = kwargs.get("oauth2_client")
-    return Connection(base_url=base_url, username=username, password=password, oauth2_client=oauth2_client)
-
-
-class FakeDbApi:
-    paramstyle = "pyformat"
-
-    def connect(self, *args, **kwargs):
-        return connect(*args, **kwargs)
-
-    class Error(Exception):
-        pass
-
-
-dbapi = FakeDbApi()
+    max_workers = kwargs.get("max_workers", 5)
+    lazy_schema_loading = kwargs.get("lazy_schema_loading", False)
+    metadata_cache_ttl = kwargs.get("metadata_cache_ttl", DEFAULT_METADATA_CACHE_TTL)
+    metadata_cache_dir = kwargs.get("metadata_cache_dir")
+    schema_chunk_size = kwargs.get("schema_chunk_size", DEFAULT_SCHEMA_CHUNK_SIZE)
+    fetch_strategy = kwargs.get("fetch_strategy", FETCH_STRATEGY_FIRST_PAGE)
+    page_retries = kwargs.get("page_retries", DEFAULT_RETRIES)
+    page_retry_backoff = kwargs.get("page_retry_backoff", DEFAULT_RETRY_BACKOFF)
+    page_hedging = kwargs.get("page_hedging", False)
+    fetch_engine = kwargs.get("fetch_engine", FETCH_ENGINE_THREADS)
+    host_max_requests = kwargs.get("host_max_requests")
+    result_cache_ttl = kwargs.get("result_cache_ttl", DEFAULT_RESULT_CACHE_TTL)
+    return Connection(
+        base_url=base_url,
+        username=username,
+        password=password,
+        oauth2_client=oauth2_client,
+        max_workers=max_workers,
+        lazy_schema_loading=lazy_schema_loading,
+        metadata_cache_ttl=metadata_cache_ttl,
+        metadata_cache_dir=metadata_cache_dir,
+        schema_chunk_size=schema_chunk_size,
+        fetch_strategy=fetch_strategy,
+        page_retries=page_retries,
+        page_retry_backoff=page_retry_backoff,
+        page_hedging=page_hedging,
+        fetch_engine=fetch_engine,
+        host_max_requests=host_max_requests,
+        result_cache_ttl=result_cache_ttl,
+    )
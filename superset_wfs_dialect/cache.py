@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a time to live.
+
+    When the cache holds more than maxsize entries, or the sizes of the
+    entries add up to more than maxbytes, the least recently used entries
+    are evicted.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: Optional[float] = None,
+        maxbytes: Optional[int] = None,
+    ):
+        """
+        :param maxsize: The maximum number of entries.
+        :param ttl: The default time to live in seconds, None for no expiry.
+        :param maxbytes: The maximum total size of the entries in bytes, None
+            for no limit. The sizes are given by the callers of set.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self._entries: OrderedDict = OrderedDict()
+        self._sizes: dict = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+    @property
+    def bytes(self) -> int:
+        """The total size of the entries in bytes."""
+        return self._bytes
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the value for key, or default if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(
+        self, key: Hashable, value: Any, ttl: Optional[float] = None, size: int = 0
+    ) -> bool:
+        """
+        Stores value for key.
+
+        :param ttl: Time to live in seconds for this entry. Defaults to the
+            ttl of the cache.
+        :param size: The size of value in bytes, counted against maxbytes.
+        :return: False if value is larger than maxbytes and was not stored.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._remove(key)
+            if self.maxbytes is not None and size > self.maxbytes:
+                return False
+            self._entries[key] = (value, expires_at)
+            self._sizes[key] = size
+            self._bytes += size
+            while len(self._entries) > self.maxsize or (
+                self.maxbytes is not None and self._bytes > self.maxbytes
+            ):
+                self._remove(next(iter(self._entries)))
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Removes key from the cache and returns its value.
+        """
+        with self._lock:
+            entry = self._remove(key)
+        return default if entry is None else entry[0]
+
+    def keys(self) -> list:
+        """
+        Returns a snapshot of the keys, including expired ones.
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= self._sizes.pop(key)
+        return entry
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_MISSING = object()
+
+
+def freeze(value: Any) -> Hashable:
+    """
+    Converts nested lists and dicts, e.g. request parameters, into tuples
+    that can be used in cache keys.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    return value
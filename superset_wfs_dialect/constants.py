@@ -0,0 +1,2 @@
+# Name of the column holding the feature geometry
+GEOMETRY_COLUMN_NAME = "geom"
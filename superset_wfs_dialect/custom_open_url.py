@@ -1,13 +1,126 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
 
 from owslib.etree import etree, ParseError
 from owslib.util import Authentication, ServiceException, ResponseWrapper
 
+DEFAULT_POOL_SIZE = 10
+
+_sessions = {}
+_pool_sizes = {}
+_sessions_lock = threading.Lock()
+
+
+def _get_session_key(url):
+    parts = urlsplit(url)
+    return parts.scheme.lower(), parts.netloc.lower()
+
+
+def _create_session(pool_size):
+    session = requests.Session()
+    # The session is shared by all connections to a host, regardless of their
+    # credentials. Cookies set by the server must therefore never be sent
+    # with subsequent requests.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def set_pool_size(url, pool_size):
+    """
+    Sets the minimum number of keep-alive connections to the host of url.
+    Should be at least the number of parallel requests to the host.
+
+    :param url: Any URL of the host.
+    :param pool_size: The number of connections to keep open.
+    """
+    key = _get_session_key(url)
+    with _sessions_lock:
+        if _pool_sizes.get(key, DEFAULT_POOL_SIZE) >= pool_size:
+            return
+        _pool_sizes[key] = pool_size
+        # New requests use a session with the larger pool. Closing the old
+        # session only closes its idle connections, requests in flight finish
+        # and their connections are closed when they are released.
+        session = _sessions.pop(key, None)
+    if session is not None:
+        session.close()
+
+
+def get_session(url):
+    """
+    Returns the keep-alive session for the host of url. All requests to a
+    host share the session, so that their TCP and TLS connections are reused.
+
+    :param url: The URL to request.
+    :return: The requests session.
+    """
+    key = _get_session_key(url)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _create_session(_pool_sizes.get(key, DEFAULT_POOL_SIZE))
+            _sessions[key] = session
+    return session
+
+
+class StreamingResponseWrapper(ResponseWrapper):
+    """
+    ResponseWrapper of a streamed response. The body is read from the
+    connection on demand instead of being loaded completely.
+    """
+
+    def read(self, size=None):
+        """
+        Reads up to size bytes of the decoded body, the remaining body if
+        size is not given.
+        """
+        return self._response.raw.read(size, decode_content=True)
+
+    def close(self):
+        self._response.close()
+
+
+SERVICE_EXCEPTION_CONTENT_TYPES = ['text/xml', 'application/xml', 'application/vnd.ogc.se_xml']
+
+
+def check_service_exception(content):
+    """
+    Raises a ServiceException if content is an OGC exception report.
+
+    :param content: The XML response body.
+    """
+    se_tree = etree.fromstring(content)
+
+    # to handle the variety of namespaces and terms across services
+    # and versions, especially for "legacy" responses like WMS 1.3.0
+    possible_errors = [
+        '{http://www.opengis.net/ows}Exception',
+        '{http://www.opengis.net/ows/1.1}Exception',
+        '{http://www.opengis.net/ogc}ServiceException',
+        'ServiceException'
+    ]
+
+    for possible_error in possible_errors:
+        serviceException = se_tree.find(possible_error)
+        if serviceException is not None:
+            # and we need to deal with some message nesting
+            raise ServiceException('\n'.join([t.strip() for t in serviceException.itertext() if t.strip()]))
+
+
 ### Custom patch for owslib.util.openURL to set the Content-Type header for WFS POST to
-### text/xml; charset=utf-8. As soon as this is fixed in owslib, this file can be removed and the
+### text/xml; charset=utf-8 and to send the requests via pooled keep-alive sessions.
+### With stream=True the body is not loaded on request, see StreamingResponseWrapper.
+### As soon as this is fixed in owslib, this file can be removed and the
 ### original openURL can be used instead.
 def openURL(url_base, data=None, method='Get', cookies=None, username=None, password=None, timeout=30, headers=None,
-            verify=True, cert=None, auth=None):
+            verify=True, cert=None, auth=None, stream=False):
     """
     Function to open URLs.
 
@@ -20,6 +133,7 @@ def openURL(url_base, data=None, method='Get', cookies=None, username=None, pass
     :param cert: (optional) A file with a client side certificate for SSL authentication
                  to send with the :class:`Request`.
     :param auth: Instance of owslib.util.Authentication
+    :param stream: (optional) whether to read the response body on demand.
     """
 
     headers = headers if headers is not None else {}
@@ -68,7 +182,7 @@ def openURL(url_base, data=None, method='Get', cookies=None, username=None, pass
     if cookies is not None:
         rkwargs['cookies'] = cookies
 
-    req = requests.request(method.upper(), url_base, headers=headers, **rkwargs)
+    req = get_session(url_base).request(method.upper(), url_base, headers=headers, stream=stream, **rkwargs)
 
     if req.status_code == 400:
         raise ServiceException(req.text)
@@ -78,23 +192,10 @@ def openURL(url_base, data=None, method='Get', cookies=None, username=None, pass
 
     # check for service exceptions without the http header set
     if 'Content-Type' in req.headers and \
-            req.headers['Content-Type'] in ['text/xml', 'application/xml', 'application/vnd.ogc.se_xml']:
+            req.headers['Content-Type'] in SERVICE_EXCEPTION_CONTENT_TYPES:
         # just in case 400 headers were not set, going to have to read the xml to see if it's an exception report.
-        se_tree = etree.fromstring(req.content)
-
-        # to handle the variety of namespaces and terms across services
-        # and versions, especially for "legacy" responses like WMS 1.3.0
-        possible_errors = [
-            '{http://www.opengis.net/ows}Exception',
-            '{http://www.opengis.net/ows/1.1}Exception',
-            '{http://www.opengis.net/ogc}ServiceException',
-            'ServiceException'
-        ]
-
-        for possible_error in possible_errors:
-            serviceException = se_tree.find(possible_error)
-            if serviceException is not None:
-                # and we need to deal with some message nesting
-                raise ServiceException('\n'.join([t.strip() for t in serviceException.itertext() if t.strip()]))
+        check_service_exception(req.content)
 
+    if stream:
+        return StreamingResponseWrapper(req)
     return ResponseWrapper(req)
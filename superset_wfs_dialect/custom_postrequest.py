@@ -1,4 +1,6 @@
+from owslib import util
 from owslib.etree import etree
+from owslib.feature.postrequest import FES_NAMESPACE
 from owslib.feature.postrequest import PostRequest_2_0_0 as PostRequest_2_0_0_owslib
 
 ### Custom patch for owslib.feature.postrequest to add support for
@@ -6,6 +8,8 @@ from owslib.feature.postrequest import PostRequest_2_0_0 as PostRequest_2_0_0_ow
 ### 2) namespace registration for typenames
 ### 3) srsName parameter
 ### 4) outputFormat query parameter in POST getfeature requests (is wrongly written in lower case in owslib)
+### 5) sort order of sortBy properties (owslib only supports ascending order)
+### 6) PropertyName elements in the wfs namespace in front of the filter
 ### As soon as this is fixed in owslib, this file can be removed and the original PostRequest can be used instead.
 class PostRequest_2_0_0(PostRequest_2_0_0_owslib):
 
@@ -40,3 +44,42 @@ class PostRequest_2_0_0(PostRequest_2_0_0_owslib):
         new_root[:] = self._root[:]
         new_root.attrib.update(self._root.attrib)
         self._root = new_root
+
+    def set_sortby(self, sortby):
+        """Set the properties by which the response will be sorted.
+
+        Every entry is a property name, optionally followed by ASC or DESC,
+        e.g. "name DESC".
+        """
+        sort_tree = etree.SubElement(self._query, util.nspath("SortBy", FES_NAMESPACE))
+        for s in sortby:
+            parts = s.split()
+            prop_elem = etree.SubElement(sort_tree, util.nspath("SortProperty", FES_NAMESPACE))
+            value = etree.SubElement(prop_elem, util.nspath("ValueReference", FES_NAMESPACE))
+            value.text = parts[0]
+            if len(parts) > 1:
+                order = etree.SubElement(prop_elem, util.nspath("SortOrder", FES_NAMESPACE))
+                order.text = parts[1].upper()
+
+    def set_propertyname(self, propertyname):
+        """Set which feature properties will be returned.
+
+        If not set, will return all properties. The WFS 2.0 schema requires
+        the wfs:PropertyName elements in front of the filter and sort order.
+        """
+        index = next(
+            (
+                i
+                for i, child in enumerate(self._query)
+                if child.tag
+                in (
+                    util.nspath("Filter", FES_NAMESPACE),
+                    util.nspath("SortBy", FES_NAMESPACE),
+                )
+            ),
+            len(self._query),
+        )
+        for offset, pn in enumerate(propertyname):
+            elem = etree.Element(util.nspath("PropertyName", self._wfsnamespace))
+            elem.text = pn
+            self._query.insert(index + offset, elem)
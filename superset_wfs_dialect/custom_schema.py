@@ -0,0 +1,141 @@
+### Extension of owslib.feature.schema to request the schemas of several
+### feature types with a single DescribeFeatureType request. WFS 2.0 allows a
+### comma separated list of typenames, the server answers with one XSD that
+### contains an element and a complexType for every requested feature type.
+
+import logging
+from typing import Dict, List, Optional
+
+from owslib.etree import etree
+from owslib.feature.schema import (
+    XS_NAMESPACE,
+    _construct_schema,
+    _get_describefeaturetype_url,
+    get_schema,
+)
+
+from .custom_open_url import openURL
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SCHEMA_CHUNK_SIZE = 50
+
+
+def get_schemas(
+    url,
+    typenames: List[str],
+    version="2.0.0",
+    chunk_size=DEFAULT_SCHEMA_CHUNK_SIZE,
+    timeout=30,
+    headers=None,
+    auth=None,
+) -> Dict[str, Optional[dict]]:
+    """Get the schemas of several feature types compatible with :class:`fiona`.
+
+    The typenames are requested in chunks of chunk_size per DescribeFeatureType
+    request. Only typenames of the same namespace prefix are combined, since
+    servers usually answer requests for several namespaces with xsd:import
+    references instead of the type definitions. Typenames that are missing in
+    a combined response, or whose chunk failed, are requested one by one.
+    A typename whose schema cannot be fetched at all is logged and omitted.
+
+    :param str url: url of the service
+    :param list typenames: names of the layers
+    :param str version: version of the service
+    :param int chunk_size: maximum number of typenames per request
+    :param int timeout: request timeout
+    :param dict headers: HTTP headers to send with the requests
+    :param Authentication auth: instance of owslib.util.Authentication
+    :return dict: schema by typename
+    """
+    schemas = {}
+    for chunk in get_chunks(typenames, chunk_size):
+        try:
+            schemas.update(
+                _get_chunk_schemas(url, chunk, version, timeout, headers, auth)
+            )
+        except Exception as e:
+            LOGGER.warning(
+                "Combined DescribeFeatureType request failed for %s: %s", chunk, e
+            )
+
+    return get_missing_schemas(
+        url, typenames, schemas, version, timeout=timeout, headers=headers, auth=auth
+    )
+
+
+def get_missing_schemas(
+    url, typenames, schemas, version="2.0.0", timeout=30, headers=None, auth=None
+) -> Dict[str, Optional[dict]]:
+    """Request the schemas that are missing after the combined requests one by one.
+
+    :param list typenames: names of the layers
+    :param dict schemas: the schemas of the combined requests by typename
+    :return dict: schema by typename in the order of typenames
+    """
+    for typename in typenames:
+        if typename in schemas:
+            continue
+        try:
+            schemas[typename] = get_schema(
+                url, typename, version, timeout=timeout, headers=headers, auth=auth
+            )
+        except Exception as e:
+            LOGGER.error("Error fetching schema for feature type %s: %s", typename, e)
+
+    return {typename: schemas[typename] for typename in typenames if typename in schemas}
+
+
+def get_chunks(typenames: List[str], chunk_size: int) -> List[List[str]]:
+    """Group the typenames by namespace prefix and split them in chunks."""
+    by_prefix: Dict[str, List[str]] = {}
+    for typename in typenames:
+        prefix = typename.split(":")[0] if ":" in typename else ""
+        by_prefix.setdefault(prefix, []).append(typename)
+
+    chunk_size = max(1, chunk_size)
+    chunks = []
+    for group in by_prefix.values():
+        for i in range(0, len(group), chunk_size):
+            chunks.append(group[i : i + chunk_size])
+    return chunks
+
+
+def _get_chunk_schemas(url, typenames, version, timeout, headers, auth):
+    """Request one combined XSD and split it into the schemas per typename."""
+    describe_url = _get_describefeaturetype_url(url, version, ",".join(typenames))
+    res = openURL(describe_url, timeout=timeout, headers=headers, auth=auth)
+    return parse_chunk_schemas(res.read(), typenames)
+
+
+def parse_chunk_schemas(content, typenames):
+    """Split a combined XSD into the schemas per typename."""
+    root = etree.fromstring(content)
+
+    nsmap = root.nsmap if hasattr(root, "nsmap") else None
+    schemas = {}
+    for typename in typenames:
+        elements = _get_typename_elements(typename, root)
+        if elements is None:
+            continue
+        schemas[typename] = _construct_schema(elements, nsmap)
+    return schemas
+
+
+def _get_typename_elements(typename, root):
+    """Get the attribute elements of the complexType of a typename.
+
+    :return list: the elements, or None if the typename is not described
+    """
+    name = typename.split(":")[-1]
+    type_element = root.find('./{%s}element[@name="%s"]' % (XS_NAMESPACE, name))
+    if type_element is None or "type" not in type_element.attrib:
+        return None
+
+    complex_type_name = type_element.attrib["type"].split(":")[-1]
+    complex_type = root.find(
+        './{%s}complexType[@name="%s"]' % (XS_NAMESPACE, complex_type_name)
+    )
+    if complex_type is None:
+        return None
+    return complex_type.findall(".//{%s}element" % XS_NAMESPACE)
@@ -4,6 +4,8 @@
 ### 2) fixing wrong parameter name "query" to "filter" for filter parameter in getfeature requests.
 ### 3) adding missing support for srsName parameter in getfeature requests.
 ### 4) adding support for outputFormat query parameter in POST getfeature requests
+### 5) adding get_schemas to fetch the schemas of several layers with combined
+###    DescribeFeatureType requests
 ###
 ### As soon as this is fixed in owslib, this file can be removed and the
 ### original openURL can be used instead.
@@ -22,6 +24,7 @@ from owslib.util import build_get_url, nspath
 
 from .custom_postrequest import PostRequest_2_0_0
 from .custom_open_url import openURL
+from .custom_schema import DEFAULT_SCHEMA_CHUNK_SIZE, get_schemas
 
 
 LOGGER = logging.getLogger(__name__)
@@ -46,8 +49,13 @@ class WebFeatureService_2_0_0(WebFeatureService_2_0_0_owslib):
         outputFormat=None,
         startindex=None,
         sortby=None,
+        stream=False,
     ):
-        """Override getfeature"""
+        """Override getfeature
+
+        :param stream: Read the response on demand. Large and chunked responses
+            are returned without loading them into memory.
+        """
         storedQueryParams = storedQueryParams or {}
         url = data = None
         if typename and type(typename) == type(""):  # noqa: E721
@@ -89,7 +97,9 @@ class WebFeatureService_2_0_0(WebFeatureService_2_0_0_owslib):
                 startindex,
                 sortby)
 
-        u = openURL(url, data, method, timeout=self.timeout, headers=self.headers, auth=self.auth)
+        u = openURL(
+            url, data, method, timeout=self.timeout, headers=self.headers, auth=self.auth, stream=stream
+        )
 
         # check for service exceptions, rewrap, and return
         # We're going to assume that anything with a content-length > 32k
@@ -97,6 +107,10 @@ class WebFeatureService_2_0_0(WebFeatureService_2_0_0_owslib):
         if "Content-Length" in u.info():
             length = int(u.info()["Content-Length"])
             have_read = False
+        elif stream:
+            # chunked response of unknown length, service exceptions are
+            # detected by openURL based on the Content-Type
+            return u
         else:
             data = u.read()
             have_read = True
@@ -303,3 +317,18 @@ class WebFeatureService_2_0_0(WebFeatureService_2_0_0_owslib):
 
     def create_post_request(self):
         return PostRequest_2_0_0()
+
+    def get_schemas(self, typenames, chunk_size=DEFAULT_SCHEMA_CHUNK_SIZE):
+        """
+        Get layer schemas compatible with :class:`fiona` schema object for
+        several layers, using one DescribeFeatureType request per chunk.
+        """
+        return get_schemas(
+            self.url,
+            typenames,
+            self.version,
+            chunk_size=chunk_size,
+            timeout=self.timeout,
+            headers=self.headers,
+            auth=self.auth,
+        )
@@ -0,0 +1,28 @@
+### DB-API entry point of the dialect. This module is imported when the
+### dialect is loaded, e.g. at the entry point discovery of every Superset
+### process. It must stay free of heavy imports: sqlglot, owslib, orjson and
+### authlib are only loaded with the base module on the first connect.
+
+paramstyle = "pyformat"
+
+
+def connect(*args, **kwargs):
+    """
+    Creates a connection to a WFS, see superset_wfs_dialect.base.connect.
+    """
+    from .base import connect as base_connect
+
+    return base_connect(*args, **kwargs)
+
+
+class FakeDbApi:
+    paramstyle = paramstyle
+
+    def connect(self, *args, **kwargs):
+        return connect(*args, **kwargs)
+
+    class Error(Exception):
+        pass
+
+
+dbapi = FakeDbApi()
@@ -1,7 +1,10 @@
-from sqlalchemy.engine.default import DefaultDialect
+from sqlalchemy.engine import reflection
+from sqlalchemy.engine.default import DefaultDialect, DefaultExecutionContext
 from sqlalchemy import types as sqltypes
 from sqlalchemy.dialects import registry
-from .base import GEOMETRY_COLUMN_NAME, dbapi as wfs_dbapi
+from .constants import GEOMETRY_COLUMN_NAME
+from .dbapi import dbapi as wfs_dbapi
+from .feature_type_schemas import get_feature_type_schema
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -24,12 +27,22 @@ type_map = {
 }
 
 
+class WfsExecutionContext(DefaultExecutionContext):
+    def create_server_side_cursor(self):
+        # used for the stream_results execution option
+        return self._dbapi_connection.cursor(stream=True)
+
+
 class WfsDialect(DefaultDialect):
     name = "wfs"
     driver = "wfs"
     supports_alter = False
     supports_unicode_statements = True
-    supports_statement_cache = False
+    # The dialect uses the default compiler and keeps no per-statement state,
+    # bound parameters are rendered into the SQL by the cursor.
+    supports_statement_cache = True
+    supports_server_side_cursors = True
+    execution_ctx_cls = WfsExecutionContext
     oauth2_client = None
 
     def __init__(self, oauth2_client=None, **kwargs):
@@ -76,6 +89,7 @@ class WfsDialect(DefaultDialect):
         logger.info("get_view_names() aufgerufen für schema=%s", schema)
         return []
 
+    @reflection.cache
     def get_table_names(self, connection, schema=None, **kw):
         logger.info("get_table_names() aufgerufen mit schema=%s", schema)
 
@@ -93,9 +107,13 @@ class WfsDialect(DefaultDialect):
     def get_indexes(self, connection, table_name, schema=None, **kw):
         return []
 
+    @reflection.cache
     def get_columns(self, connection, table_name, schema=None, **kw):
-        wfs = connection.connection.connection.wfs
-        fiona_schema = wfs.get_schema(table_name)
+        # The schemas are shared with the cursors of the connection and cached
+        # across connections, see metadata_cache.
+        fiona_schema = get_feature_type_schema(
+            connection.connection.connection, table_name
+        )
         columns = []
 
         for key, value in fiona_schema.get("properties").items():
@@ -0,0 +1,92 @@
+import logging
+import threading
+from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+
+class LazyFeatureTypeSchemas(Mapping):
+    """
+    Read-only mapping of typename to fiona schema. The schema of a feature
+    type is fetched via DescribeFeatureType the first time it is accessed and
+    kept for subsequent lookups. The available keys are the feature types of
+    the capabilities document.
+    """
+
+    def __init__(self, wfs, schemas=None):
+        """
+        :param wfs: The WFS instance.
+        :param schemas: Optional already known schemas by typename.
+        """
+        self._wfs = wfs
+        self._schemas = dict(schemas or {})
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, typename):
+        if typename in self._schemas:
+            return self._schemas[typename]
+        if typename not in self._wfs.contents:
+            raise KeyError(typename)
+
+        # one lock per typename, so that concurrent lookups of the same layer
+        # result in a single request without blocking other layers
+        with self._lock:
+            typename_lock = self._locks.setdefault(typename, threading.Lock())
+
+        with typename_lock:
+            if typename not in self._schemas:
+                try:
+                    schema = self._wfs.get_schema(typename=typename)
+                except Exception as e:
+                    logger.error(
+                        "Error fetching schema for feature type %s: %s", typename, e
+                    )
+                    raise KeyError(typename) from e
+                self._schemas[typename] = schema
+        return self._schemas[typename]
+
+    def __contains__(self, typename):
+        return typename in self._wfs.contents
+
+    def __iter__(self):
+        return iter(self._wfs.contents)
+
+    def __len__(self):
+        return len(self._wfs.contents)
+
+    def is_loaded(self, typename) -> bool:
+        """
+        Checks whether the schema of a feature type has already been fetched.
+
+        :param typename: The WFS typename (layer).
+        :return: True if the schema is available without a request.
+        """
+        return typename in self._schemas
+
+    def loaded_schemas(self) -> dict:
+        """
+        Returns the schemas that have been fetched so far.
+
+        :return: A dictionary of typename to fiona schema.
+        """
+        return dict(self._schemas)
+
+
+def get_feature_type_schema(connection, typename):
+    """
+    Returns the fiona schema of a feature type from the schemas cached by the
+    connection. DescribeFeatureType is only requested if the connection does
+    not know the feature type yet, the result is then added to the cache.
+
+    :param connection: The WFS DB-API connection.
+    :param typename: The WFS typename (layer).
+    :return: The fiona schema, or None if it is not available.
+    """
+    schemas = connection.feature_type_schemas
+    schema = schemas.get(typename)
+    if schema is None:
+        schema = connection.wfs.get_schema(typename)
+        if schema is not None and isinstance(schemas, dict):
+            schemas[typename] = schema
+    return schema
@@ -0,0 +1,328 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import requests
+from owslib.util import ServiceException
+
+from .host_limiter import HostLimiter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 0.5
+MAX_RETRY_BACKOFF = 10
+
+# Number of recent request durations used to estimate the hedging delay
+LATENCY_SAMPLES = 100
+# Minimum number of durations before requests are hedged
+MIN_LATENCY_SAMPLES = 10
+HEDGE_QUANTILE = 0.95
+
+
+class LatencyTracker:
+    """
+    Keeps the durations of the recent successful requests to a WFS.
+    """
+
+    def __init__(self, maxlen: int = LATENCY_SAMPLES):
+        self._durations = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, duration: float) -> None:
+        with self._lock:
+            self._durations.append(duration)
+
+    def quantile(self, q: float, min_samples: int = MIN_LATENCY_SAMPLES) -> Optional[float]:
+        """
+        Returns the q-quantile of the recent durations.
+
+        :param q: The quantile between 0 and 1.
+        :param min_samples: The number of durations needed for an estimate.
+        :return: The duration in seconds, or None if there are too few samples.
+        """
+        with self._lock:
+            durations = sorted(self._durations)
+        if not durations or len(durations) < min_samples:
+            return None
+        index = min(len(durations) - 1, math.ceil(q * len(durations)) - 1)
+        return durations[max(0, index)]
+
+
+_latency_trackers: Dict[str, LatencyTracker] = {}
+_latency_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(base_url: str) -> LatencyTracker:
+    """
+    Returns the process wide latency tracker of a WFS.
+
+    :param base_url: The WFS URL.
+    :return: The latency tracker.
+    """
+    with _latency_trackers_lock:
+        return _latency_trackers.setdefault(base_url, LatencyTracker())
+
+
+def is_page_request(params: dict) -> bool:
+    """
+    Checks whether the duration of a GetFeature request is representative
+    for the pages of a query. resultType=hits requests and requests of a
+    single feature, e.g. of MIN/MAX queries, are much faster than pages and
+    would lower the hedging delay of the pages.
+
+    :param params: The getfeature parameters of the request.
+    :return: True if the request fetches a page of features.
+    """
+    return params.get("result_type") != "hits" and params.get("maxfeatures") != 1
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Checks whether a failed request may succeed when it is sent again.
+    Service exceptions and client errors (except 429 Too Many Requests) are
+    caused by the request itself and are not retried.
+
+    :param error: The error of the request.
+    :return: True if the request should be retried.
+    """
+    if isinstance(error, ServiceException):
+        return False
+    status = None
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+    elif isinstance(getattr(error, "status", None), int):
+        # aiohttp.ClientResponseError of the asyncio engine
+        status = error.status
+    if status is not None:
+        return status >= 500 or status == 429
+    return True
+
+
+class FetchPolicy:
+    """
+    Policy for the GetFeature requests of a query. Failed requests are
+    retried with exponential backoff. With hedging, a request that takes
+    longer than the 95th percentile of the recent requests is sent a second
+    time and the first response is used.
+    """
+
+    def __init__(
+        self,
+        retries: int = DEFAULT_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        hedging: bool = False,
+        latency_tracker: Optional[LatencyTracker] = None,
+        host_limiter: Optional[HostLimiter] = None,
+    ):
+        """
+        :param retries: The number of retries after a failed request.
+        :param retry_backoff: The delay in seconds before the first retry. It
+            doubles with every further retry.
+        :param hedging: Whether to send slow requests a second time.
+        :param latency_tracker: The durations of the recent requests.
+        :param host_limiter: The limiter of the concurrent requests to the
+            WFS host.
+        """
+        self.retries = max(0, retries)
+        self.retry_backoff = retry_backoff
+        self.hedging = hedging
+        self.latency_tracker = latency_tracker or LatencyTracker()
+        self.host_limiter = host_limiter
+
+    def call(
+        self,
+        request: Callable[[], T],
+        description: str = "request",
+        owner: Any = None,
+        track_latency: bool = True,
+    ) -> T:
+        """
+        Runs request according to the policy.
+
+        :param request: The function sending the request.
+        :param description: Description of the request for the log.
+        :param owner: The owner the request is queued for by the host
+            limiter, e.g. the cursor of the query.
+        :param track_latency: Whether the duration of the request is added to
+            the latency tracker, see is_page_request.
+        :return: The result of request.
+        :raises Exception: The error of the last attempt.
+        """
+        attempt = 0
+        while True:
+            try:
+                if self.hedging:
+                    return self._call_hedged(request, owner, track_latency)
+                return self._timed(request, owner, track_latency)
+            except Exception as e:
+                if attempt >= self.retries or not is_retryable(e):
+                    logger.error("%s failed: %s", description, e)
+                    raise
+                delay = min(self.retry_backoff * 2**attempt, MAX_RETRY_BACKOFF)
+                attempt += 1
+                logger.warning(
+                    "%s failed, retry %s/%s in %.1fs: %s",
+                    description,
+                    attempt,
+                    self.retries,
+                    delay,
+                    e,
+                )
+                time.sleep(delay)
+
+    async def call_async(
+        self,
+        request: Callable[[], Awaitable[T]],
+        description: str = "request",
+        owner: Any = None,
+        track_latency: bool = True,
+    ) -> T:
+        """
+        Runs the coroutine returned by request according to the policy. Unlike
+        call, the slower of two hedged requests is cancelled.
+
+        :param request: The function returning a new request coroutine.
+        :param description: Description of the request for the log.
+        :param owner: The owner the request is queued for by the host limiter.
+        :param track_latency: Whether the duration of the request is added to
+            the latency tracker, see is_page_request.
+        :return: The result of the request.
+        :raises Exception: The error of the last attempt.
+        """
+        attempt = 0
+        while True:
+            try:
+                if self.hedging:
+                    return await self._call_hedged_async(request, owner, track_latency)
+                return await self._timed_async(request, owner, track_latency)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= self.retries or not is_retryable(e):
+                    logger.error("%s failed: %s", description, e)
+                    raise
+                delay = min(self.retry_backoff * 2**attempt, MAX_RETRY_BACKOFF)
+                attempt += 1
+                logger.warning(
+                    "%s failed, retry %s/%s in %.1fs: %s",
+                    description,
+                    attempt,
+                    self.retries,
+                    delay,
+                    e,
+                )
+                await asyncio.sleep(delay)
+
+    def _timed(
+        self, request: Callable[[], T], owner: Any = None, track_latency: bool = True
+    ) -> T:
+        if self.host_limiter is None:
+            return self._measure(request, track_latency)
+        with self.host_limiter.slot(owner):
+            return self._measure(request, track_latency)
+
+    def _measure(self, request: Callable[[], T], track_latency: bool = True) -> T:
+        # the time waiting for a slot is not part of the latency
+        start = time.monotonic()
+        result = request()
+        if track_latency:
+            self.latency_tracker.add(time.monotonic() - start)
+        return result
+
+    def _call_hedged(
+        self, request: Callable[[], T], owner: Any = None, track_latency: bool = True
+    ) -> T:
+        hedge_delay = self.latency_tracker.quantile(HEDGE_QUANTILE)
+        if hedge_delay is None:
+            return self._timed(request, owner, track_latency)
+
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="wfs-hedge")
+        try:
+            futures = [executor.submit(self._timed, request, owner, track_latency)]
+            done, _ = wait(futures, timeout=hedge_delay)
+            if not done:
+                logger.debug("Hedging request after %.2fs", hedge_delay)
+                futures.append(
+                    executor.submit(self._timed, request, owner, track_latency)
+                )
+
+            # use the first successful response
+            error = None
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = error or future.exception()
+            raise error
+        finally:
+            # the slower request is not waited for
+            executor.shutdown(wait=False)
+
+    async def _timed_async(
+        self,
+        request: Callable[[], Awaitable[T]],
+        owner: Any = None,
+        track_latency: bool = True,
+    ) -> T:
+        if self.host_limiter is None:
+            return await self._measure_async(request, track_latency)
+        async with self.host_limiter.slot_async(owner):
+            return await self._measure_async(request, track_latency)
+
+    async def _measure_async(
+        self, request: Callable[[], Awaitable[T]], track_latency: bool = True
+    ) -> T:
+        start = time.monotonic()
+        result = await request()
+        if track_latency:
+            self.latency_tracker.add(time.monotonic() - start)
+        return result
+
+    async def _call_hedged_async(
+        self,
+        request: Callable[[], Awaitable[T]],
+        owner: Any = None,
+        track_latency: bool = True,
+    ) -> T:
+        hedge_delay = self.latency_tracker.quantile(HEDGE_QUANTILE)
+        if hedge_delay is None:
+            return await self._timed_async(request, owner, track_latency)
+
+        tasks = [
+            asyncio.ensure_future(self._timed_async(request, owner, track_latency))
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                logger.debug("Hedging request after %.2fs", hedge_delay)
+                tasks.append(
+                    asyncio.ensure_future(
+                        self._timed_async(request, owner, track_latency)
+                    )
+                )
+
+            # use the first successful response
+            error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
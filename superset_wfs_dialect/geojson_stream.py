@@ -0,0 +1,158 @@
+import codecs
+import json
+from typing import Any, Dict, Iterator
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+# Characters that may follow a complete JSON value
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+class FeatureCollectionStream:
+    """
+    Incremental decoder of a GeoJSON FeatureCollection. Iterating over the
+    stream yields the features one at a time while the response is read in
+    chunks, so neither the raw response nor the decoded text of a page are
+    kept in memory as a whole.
+
+    The other members of the FeatureCollection, e.g. numberMatched, are
+    collected in members. Members that follow the features array are only
+    available once all features have been consumed. feature_count is the
+    number of features yielded so far.
+    """
+
+    def __init__(self, fp, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        :param fp: A binary file-like object providing read(size).
+        :param chunk_size: The number of bytes to read at once.
+        """
+        self.members: Dict[str, Any] = {}
+        self.feature_count = 0
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._consumed = False
+
+    def __iter__(self) -> Iterator[dict]:
+        if self._consumed:
+            raise ValueError("The FeatureCollection has already been consumed")
+        self._consumed = True
+        return self._iter_features()
+
+    def read_all(self) -> dict:
+        """
+        Decodes the whole FeatureCollection.
+
+        :return: The FeatureCollection as a dictionary.
+        """
+        features = list(self)
+        return dict(self.members, features=features)
+
+    def close(self) -> None:
+        """
+        Closes the response, e.g. if not all features are needed.
+        """
+        if hasattr(self._fp, "close"):
+            self._fp.close()
+
+    def _iter_features(self) -> Iterator[dict]:
+        self._expect("{")
+        if self._next_char() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._decode_value()
+            if not isinstance(key, str):
+                raise ValueError(
+                    f"Invalid GeoJSON FeatureCollection: expected a key at {self._pos}"
+                )
+            self._expect(":")
+            if key == "features":
+                yield from self._iter_array()
+            else:
+                self.members[key] = self._decode_value()
+            if self._next_char() == "}":
+                self._pos += 1
+                return
+            self._expect(",")
+
+    def _iter_array(self) -> Iterator[dict]:
+        self._expect("[")
+        if self._next_char() == "]":
+            self._pos += 1
+            return
+        while True:
+            feature = self._decode_value()
+            self.feature_count += 1
+            yield feature
+            if self._next_char() == "]":
+                self._pos += 1
+                return
+            self._expect(",")
+
+    def _expect(self, char: str) -> None:
+        if self._next_char() != char:
+            raise ValueError(
+                f"Invalid GeoJSON FeatureCollection: expected '{char}' at {self._pos}"
+            )
+        self._pos += 1
+
+    def _next_char(self) -> str:
+        """
+        Skips whitespace and returns the next character without consuming it.
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if self._eof:
+                raise ValueError("Unexpected end of GeoJSON FeatureCollection")
+            self._read()
+
+    def _decode_value(self) -> Any:
+        """
+        Decodes the JSON value at the current position. A value is only
+        accepted once a delimiter follows it, as a number at the end of the
+        buffer may be incomplete, e.g. 1 of 1.5 or 1.5 of 1.5e3.
+        """
+        self._next_char()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+                # at least double the buffer to not decode large values
+                # over and over again
+                self._read(len(self._buffer) - self._pos)
+                continue
+            if not self._eof and (
+                end == len(self._buffer) or self._buffer[end] not in _DELIMITERS
+            ):
+                self._read()
+                continue
+            self._pos = end
+            return value
+
+    def _read(self, min_size: int = 0) -> None:
+        # drop the consumed part of the buffer
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+
+        parts = [self._buffer]
+        read = 0
+        while read == 0 or read < min_size:
+            chunk = self._fp.read(self._chunk_size)
+            if not chunk:
+                self._eof = True
+                parts.append(self._decoder.decode(b"", final=True))
+                break
+            read += len(chunk)
+            parts.append(self._decoder.decode(chunk))
+        self._buffer = "".join(parts)
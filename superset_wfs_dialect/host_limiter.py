@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+# Maximum number of concurrent requests to a WFS host of all connections
+DEFAULT_HOST_MAX_REQUESTS = 20
+
+
+class HostLimiter:
+    """
+    Limits the number of concurrent requests to a WFS host across all
+    connections and cursors of the process. Waiting requests are queued per
+    owner (e.g. a query) and the free slots are handed to the owners in turn,
+    so a query with many pages does not hold back the queries that were
+    started after it.
+
+    A slot is granted through a Future, so that both threads and coroutines
+    can wait for it.
+    """
+
+    def __init__(self, max_requests: int):
+        """
+        :param max_requests: The maximum number of concurrent requests.
+        """
+        self.max_requests = max(1, max_requests)
+        self._active = 0
+        self._waiting: "OrderedDict[Any, Deque[Future]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> int:
+        """The number of granted slots."""
+        return self._active
+
+    def set_max_requests(self, max_requests: int) -> None:
+        """
+        Changes the maximum number of concurrent requests. Granted slots are
+        not revoked if the maximum is lowered.
+        """
+        with self._lock:
+            self.max_requests = max(1, max_requests)
+            self._grant()
+
+    def acquire(self, owner: Any = None) -> Future:
+        """
+        Requests a slot.
+
+        :param owner: The owner the request is queued for.
+        :return: A Future that is done when the slot is granted. Cancel it to
+            stop waiting.
+        """
+        future = Future()
+        with self._lock:
+            self._waiting.setdefault(owner, deque()).append(future)
+            self._grant()
+        return future
+
+    def release(self) -> None:
+        """
+        Releases a granted slot.
+        """
+        with self._lock:
+            self._active -= 1
+            self._grant()
+
+    @contextmanager
+    def slot(self, owner: Any = None):
+        """
+        Waits for a slot and releases it when the block is left.
+        """
+        self.acquire(owner).result()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self, owner: Any = None):
+        """
+        Waits for a slot without blocking the event loop and releases it when
+        the block is left.
+        """
+        future = self.acquire(owner)
+        try:
+            await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # the slot may have been granted in the meantime
+            if not future.cancel():
+                self.release()
+            raise
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _grant(self) -> None:
+        while self._active < self.max_requests and self._waiting:
+            # take the next request of the first owner in line and move the
+            # owner to the end of the line
+            owner, futures = self._waiting.popitem(last=False)
+            future = futures.popleft()
+            if futures:
+                self._waiting[owner] = futures
+            if future.set_running_or_notify_cancel():
+                self._active += 1
+                future.set_result(None)
+
+
+_host_limiters: Dict[str, HostLimiter] = {}
+_host_limiters_lock = threading.Lock()
+
+
+def get_host_limiter(
+    base_url: str, max_requests: Optional[int] = None
+) -> Optional[HostLimiter]:
+    """
+    Returns the process wide limiter of the host of a WFS. If connections to
+    the same host configure different maximums, the most recent one is used.
+
+    :param base_url: The WFS URL.
+    :param max_requests: The maximum number of concurrent requests to the
+        host. None keeps the current maximum, which is
+        DEFAULT_HOST_MAX_REQUESTS for a new limiter. 0 disables the limit for
+        the requests of the caller.
+    :return: The limiter, or None if the requests are not limited.
+    """
+    if max_requests == 0:
+        return None
+    host = urlsplit(base_url).netloc
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(host)
+        if limiter is None:
+            limiter = _host_limiters[host] = HostLimiter(
+                max_requests or DEFAULT_HOST_MAX_REQUESTS
+            )
+    if max_requests is not None and limiter.max_requests != max_requests:
+        limiter.set_max_requests(max_requests)
+    return limiter
@@ -0,0 +1,93 @@
+import hashlib
+from typing import Any, Mapping, Optional, Tuple, TypedDict
+
+from .cache import TTLCache
+from .metadata_file_cache import remove_metadata_files
+
+DEFAULT_METADATA_CACHE_TTL = 300
+METADATA_CACHE_MAXSIZE = 32
+
+
+class ConnectionMetadata(TypedDict):
+    """
+    Service metadata shared by all connections to the same WFS.
+
+    Attributes:
+    wfs: Any
+        The WFS instance holding the parsed capabilities.
+    server_side_max_features: int
+        The CountDefault of the server.
+    implements_sorting: bool
+        Whether the server sorts features by sortBy.
+    wfs_output_format: Optional[str]
+        The output format used for GetFeature requests.
+    feature_type_schemas: Mapping
+        The fiona schemas of the feature types by typename.
+    """
+
+    wfs: Any
+    server_side_max_features: int
+    implements_sorting: bool
+    wfs_output_format: Optional[str]
+    feature_type_schemas: Mapping
+
+
+metadata_cache = TTLCache(maxsize=METADATA_CACHE_MAXSIZE, ttl=DEFAULT_METADATA_CACHE_TTL)
+
+
+def _digest(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def get_metadata_cache_key(
+    base_url: str,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    oauth2_client: Optional[dict] = None,
+) -> Tuple:
+    """
+    Builds the cache key for the metadata of a WFS. Connections only share
+    metadata if they use the same credentials. Secrets are hashed, so that
+    they are not kept as plain text in the key.
+
+    :param base_url: The WFS URL.
+    :param username: The BasicAuth username.
+    :param password: The BasicAuth password.
+    :param oauth2_client: The OAuth2 client information.
+    :return: The cache key.
+    """
+    oauth2_identity = None
+    if oauth2_client is not None:
+        oauth2_identity = (
+            oauth2_client.get("id"),
+            _digest(oauth2_client.get("secret")),
+            oauth2_client.get("token_request_uri"),
+            str(oauth2_client.get("scope")),
+        )
+    return (base_url, username, _digest(password), oauth2_identity)
+
+
+def clear_metadata_cache(
+    base_url: Optional[str] = None, cache_dir: Optional[str] = None
+) -> None:
+    """
+    Removes cached metadata, so that the next connection fetches the
+    capabilities and feature type schemas again. Since the dialect reflects
+    tables from the cached schemas, this also invalidates the reflection.
+
+    :param base_url: Only remove the metadata of this WFS. Removes the
+        metadata of all WFS if not given.
+    :param cache_dir: The metadata_cache_dir of the connections. The cache
+        files in it are removed as well, otherwise restarted workers would
+        read the stale metadata again.
+    """
+    if cache_dir is not None:
+        remove_metadata_files(cache_dir, base_url)
+    if base_url is None:
+        metadata_cache.clear()
+        return
+    for key in metadata_cache.keys():
+        if key[0] == base_url:
+            metadata_cache.pop(key)
@@ -0,0 +1,183 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, TypedDict
+
+logger = logging.getLogger(__name__)
+
+# Increase when the structure of the cache file changes. Files of other
+# versions are ignored.
+METADATA_FILE_VERSION = 1
+
+
+class MetadataFile(TypedDict):
+    """
+    Content of a metadata cache file.
+
+    Attributes:
+    version: int
+        The version of the file structure.
+    base_url: str
+        The WFS URL.
+    created: float
+        The unix timestamp of the creation of the file.
+    capabilities: str
+        The GetCapabilities document.
+    server_side_max_features: int
+        The CountDefault of the server.
+    wfs_output_format: Optional[str]
+        The output format used for GetFeature requests.
+    feature_type_schemas: Dict[str, dict]
+        The fiona schemas of the feature types by typename.
+    """
+
+    version: int
+    base_url: str
+    created: float
+    capabilities: str
+    server_side_max_features: int
+    wfs_output_format: Optional[str]
+    feature_type_schemas: Dict[str, dict]
+
+
+_revalidating: List[Hashable] = []
+_revalidating_lock = threading.Lock()
+
+
+def get_metadata_file_path(cache_dir: str, cache_key: Hashable) -> str:
+    """
+    Returns the path of the cache file for a metadata cache key. The file
+    name is a hash of the key, so that no credentials end up in the file
+    system.
+
+    :param cache_dir: The cache directory.
+    :param cache_key: The metadata cache key.
+    :return: The path of the cache file.
+    """
+    digest = hashlib.sha256(repr(cache_key).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"wfs_metadata_{digest}.json")
+
+
+def read_metadata_file(cache_dir: str, cache_key: Hashable) -> Optional[MetadataFile]:
+    """
+    Reads the cached metadata of a WFS.
+
+    :param cache_dir: The cache directory.
+    :param cache_key: The metadata cache key.
+    :return: The cached metadata, or None if there is no usable cache file.
+    """
+    path = get_metadata_file_path(cache_dir, cache_key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read metadata cache file %s: %s", path, e)
+        return None
+
+    if not isinstance(metadata, dict) or metadata.get("version") != METADATA_FILE_VERSION:
+        logger.info("Ignoring metadata cache file %s of another version", path)
+        return None
+    return metadata
+
+
+def write_metadata_file(
+    cache_dir: str,
+    cache_key: Hashable,
+    base_url: str,
+    capabilities: str,
+    server_side_max_features: int,
+    wfs_output_format: Optional[str],
+    feature_type_schemas: Dict[str, dict],
+) -> None:
+    """
+    Writes the metadata of a WFS to the cache directory. The file is replaced
+    atomically, so that concurrently starting workers never read a partially
+    written file.
+    """
+    metadata: MetadataFile = {
+        "version": METADATA_FILE_VERSION,
+        "base_url": base_url,
+        "created": time.time(),
+        "capabilities": capabilities,
+        "server_side_max_features": server_side_max_features,
+        "wfs_output_format": wfs_output_format,
+        "feature_type_schemas": feature_type_schemas,
+    }
+    path = get_metadata_file_path(cache_dir, cache_key)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(metadata, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning("Could not write metadata cache file %s: %s", path, e)
+
+
+def remove_metadata_files(cache_dir: str, base_url: Optional[str] = None) -> None:
+    """
+    Removes cache files, so that restarted workers fetch the metadata again.
+    The file names are hashes of the cache keys, so the WFS URL is read from
+    the files.
+
+    :param cache_dir: The cache directory.
+    :param base_url: Only remove the files of this WFS. Removes the files of
+        all WFS if not given.
+    """
+    for path in glob.glob(os.path.join(cache_dir, "wfs_metadata_*.json")):
+        if base_url is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                metadata = None
+            # Unreadable files are never used, so they are removed as well.
+            if isinstance(metadata, dict) and metadata.get("base_url") != base_url:
+                continue
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Could not remove metadata cache file %s: %s", path, e)
+
+
+def revalidate_in_background(
+    cache_key: Hashable, revalidate: Callable[[], None]
+) -> Optional[threading.Thread]:
+    """
+    Runs revalidate in a daemon thread, unless a revalidation for the same
+    cache key is already running.
+
+    :param cache_key: The metadata cache key.
+    :param revalidate: The function fetching and storing the current metadata.
+    :return: The started thread, or None if no thread was started.
+    """
+    with _revalidating_lock:
+        if cache_key in _revalidating:
+            return None
+        _revalidating.append(cache_key)
+
+    def run():
+        try:
+            revalidate()
+        except Exception as e:
+            logger.error("Error revalidating the WFS metadata: %s", e)
+        finally:
+            with _revalidating_lock:
+                _revalidating.remove(cache_key)
+
+    thread = threading.Thread(target=run, name="wfs-metadata-revalidation", daemon=True)
+    thread.start()
+    return thread
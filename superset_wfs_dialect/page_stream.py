@@ -0,0 +1,144 @@
+import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds after which a blocked producer checks whether the stream was closed
+_PUT_TIMEOUT = 0.1
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class PageStream:
+    """
+    Fetches pages of features in a background thread and hands them out in
+    the order of their startindex. At most max_workers pages are requested
+    in parallel and at most max_queued_pages fetched pages wait for the
+    consumer, so memory use does not depend on the size of the layer.
+
+    Pages that are fetched but never handed out, because the stream was
+    closed, are passed to discard, e.g. to close their responses.
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[int], List[Any]],
+        startindexes: Iterable[int],
+        max_workers: int,
+        max_queued_pages: Optional[int] = None,
+        discard: Optional[Callable[[Any], None]] = None,
+    ):
+        """
+        :param fetch_page: Function returning the features of the page that
+            starts at the given index.
+        :param startindexes: The startindexes of the pages to fetch.
+        :param max_workers: The maximum number of parallel requests.
+        :param max_queued_pages: The maximum number of fetched pages that have
+            not been consumed yet. Defaults to max_workers.
+        :param discard: Function called with the pages that are not consumed.
+        """
+        self._fetch_page = fetch_page
+        self._discard = discard
+        self._startindexes = list(startindexes)
+        self._max_workers = max(1, max_workers)
+        self._queue = queue.Queue(maxsize=max_queued_pages or self._max_workers)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._produce, name="wfs-page-stream", daemon=True
+        )
+        self._thread.start()
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        """
+        Yields the pages in order. Errors of the page requests are raised.
+        """
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    def close(self) -> None:
+        """
+        Stops fetching pages. Requests that have not been started yet are
+        cancelled.
+        """
+        self._closed.set()
+        self._discard_queued()
+
+    def _produce(self) -> None:
+        try:
+            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                startindex_iter = iter(self._startindexes)
+                pending = deque(
+                    executor.submit(self._fetch_page, startindex)
+                    for _, startindex in zip(range(self._max_workers), startindex_iter)
+                )
+                while pending and not self._closed.is_set():
+                    future = pending.popleft()
+                    try:
+                        page = future.result()
+                    except Exception as e:
+                        self._put(_Failure(e))
+                        break
+
+                    # keep max_workers requests running
+                    next_startindex = next(startindex_iter, None)
+                    if next_startindex is not None:
+                        pending.append(executor.submit(self._fetch_page, next_startindex))
+
+                    if not self._put(page):
+                        break
+
+                for future in pending:
+                    if not future.cancel() and self._discard is not None:
+                        future.add_done_callback(self._discard_result)
+        finally:
+            self._put(_END)
+            if self._closed.is_set():
+                self._discard_queued()
+
+    def _put(self, item) -> bool:
+        """
+        Waits until the consumer has room for item.
+
+        :return: False if the stream was closed in the meantime.
+        """
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        self._discard_page(item)
+        return False
+
+    def _discard_queued(self) -> None:
+        while True:
+            try:
+                self._discard_page(self._queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _discard_result(self, future) -> None:
+        if future.exception() is None:
+            self._discard_page(future.result())
+
+    def _discard_page(self, item) -> None:
+        if self._discard is None or item is _END or isinstance(item, _Failure):
+            return
+        try:
+            self._discard(item)
+        except Exception as e:
+            logger.debug("Error discarding a page: %s", e)
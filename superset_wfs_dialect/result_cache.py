@@ -0,0 +1,66 @@
+from typing import List, Optional, Tuple
+
+import orjson
+
+from .cache import TTLCache, freeze
+
+# Time to live of cached query results, 0 disables the cache
+DEFAULT_RESULT_CACHE_TTL = 0
+RESULT_CACHE_MAXSIZE = 1024
+# Upper bound for the size of all cached results of the process
+RESULT_CACHE_MAXBYTES = 256 * 1024 * 1024
+
+result_cache = TTLCache(maxsize=RESULT_CACHE_MAXSIZE, maxbytes=RESULT_CACHE_MAXBYTES)
+
+
+def get_result_cache_key(
+    identity: Tuple, request_params: dict, max_features: Optional[int] = None
+) -> Tuple:
+    """
+    Builds the cache key for the features of a query.
+
+    :param identity: The WFS URL and credentials of the connection, see
+        get_metadata_cache_key. Results are only shared between connections
+        with the same credentials.
+    :param request_params: The GetFeature parameters of the query, i.e. the
+        typename, filter, projection and output format.
+    :param max_features: The maximum number of features of the query.
+    :return: The cache key.
+    """
+    return (identity, freeze(request_params), max_features)
+
+
+def estimate_size(features: List[dict], limit: Optional[int] = None) -> int:
+    """
+    Estimates the memory used by features with the size of their JSON
+    encoding. The features are encoded one by one, so that results larger
+    than limit are not encoded completely.
+
+    :param features: The features.
+    :param limit: Stop once the estimated size exceeds limit, e.g. the
+        maxbytes of the cache.
+    :return: The estimated size in bytes, a value larger than limit for
+        results exceeding it.
+    """
+    size = 1
+    for feature in features:
+        # the feature and the following comma or closing bracket
+        size += len(orjson.dumps(feature)) + 1
+        if limit is not None and size > limit:
+            break
+    return size
+
+
+def clear_result_cache(base_url: Optional[str] = None) -> None:
+    """
+    Removes cached query results.
+
+    :param base_url: Only remove the results of this WFS. Removes the
+        results of all WFS if not given.
+    """
+    if base_url is None:
+        result_cache.clear()
+        return
+    for key in result_cache.keys():
+        if key[0][0] == base_url:
+            result_cache.pop(key)
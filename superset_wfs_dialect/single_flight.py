@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical requests that run at the same time. The first caller
+    of a key sends the request, the callers that arrive while it is in
+    flight wait for it and share its result or error. Results are shared
+    between callers and must not be modified.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def call(self, key: Hashable, request: Callable[[], T]) -> T:
+        """
+        Runs request, unless a request with the same key is in flight.
+
+        :param key: The identity of the request, e.g. its URL and body.
+        :param request: The function sending the request.
+        :return: The result of request or of the request in flight.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            logger.debug("Waiting for identical request in flight")
+            return future.result()
+
+        try:
+            result = request()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    async def call_async(self, key: Hashable, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Awaits the coroutine returned by request, unless a request with the
+        same key is in flight. If the request in flight is cancelled, a
+        waiting caller sends the request itself.
+
+        :param key: The identity of the request, e.g. its URL and body.
+        :param request: The function returning the request coroutine.
+        :return: The result of the request.
+        """
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                try:
+                    result = await request()
+                except asyncio.CancelledError:
+                    self._finish(key, future, cancelled=True)
+                    raise
+                except Exception as e:
+                    self._finish(key, future, error=e)
+                    raise
+                self._finish(key, future, result=result)
+                return result
+
+            logger.debug("Waiting for identical request in flight")
+            try:
+                # waiting callers must not cancel the shared future
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future, False
+            future = self._in_flight[key] = Future()
+            return future, True
+
+    def _finish(self, key, future: Future, result=None, error=None, cancelled=False):
+        with self._lock:
+            del self._in_flight[key]
+        if cancelled:
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+# Process wide coalescing of the GetFeature requests
+in_flight_requests = SingleFlight()
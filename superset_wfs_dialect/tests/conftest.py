@@ -2,8 +2,17 @@
 Shared test configuration and utilities for superset_wfs_dialect tests.
 """
 
+from io import BytesIO
 from unittest.mock import MagicMock
 
+import orjson
+import pytest
+
+from superset_wfs_dialect.base import FETCH_STRATEGY_FIRST_PAGE, query_plan_cache
+from superset_wfs_dialect.fetch_policy import FetchPolicy
+from superset_wfs_dialect.metadata_cache import metadata_cache
+from superset_wfs_dialect.result_cache import result_cache
+
 
 def create_mock_wfs_instance(output_formats=None):
     """
@@ -21,3 +30,155 @@ def create_mock_wfs_instance(output_formats=None):
     mock_operation.parameters = {"outputFormat": {"values": output_formats}}
     mock_wfs_instance.operations = [mock_operation]
     return mock_wfs_instance
+
+
+def create_mock_connection(
+    features=None, server_side_max_features=10, properties=None, **attributes
+):
+    """
+    Create a mock connection to a WFS with a single layer "layer" that serves
+    the given features.
+
+    :param features: The features of the layer, see create_getfeature_mock.
+        None leaves wfs.getfeature unconfigured.
+    :param server_side_max_features: The CountDefault of the server.
+    :param properties: The properties of the layer schema. Defaults to
+        {"value": "int"}
+    :param attributes: Further connection attributes to set.
+    :return: A configured MagicMock connection
+    """
+    connection = MagicMock()
+    connection.base_url = "https://example.com/wfs"
+    connection.max_workers = 2
+    connection.server_side_max_features = server_side_max_features
+    connection.wfs_output_format = "application/json"
+    connection.fetch_policy = FetchPolicy(retries=0)
+    connection.result_cache_ttl = 0
+    connection.fetch_strategy = FETCH_STRATEGY_FIRST_PAGE
+    connection.feature_type_schemas = {
+        "layer": {
+            "properties": properties or {"value": "int"},
+            "geometry_column": "geom",
+        }
+    }
+    if features is not None:
+        connection.wfs.getfeature.side_effect = create_getfeature_mock(features)
+    for name, value in attributes.items():
+        setattr(connection, name, value)
+    return connection
+
+
+def create_capabilities(implements_sorting=True):
+    """
+    Create a WFS 2.0 capabilities document announcing whether the server
+    sorts features.
+
+    :param implements_sorting: The value of the ImplementsSorting constraint.
+    :return: The capabilities document as a string
+    """
+    return (
+        '<wfs:WFS_Capabilities xmlns:wfs="http://www.opengis.net/wfs/2.0" '
+        'xmlns:ows="http://www.opengis.net/ows/1.1" '
+        'xmlns:fes="http://www.opengis.net/fes/2.0">'
+        "<fes:Filter_Capabilities><fes:Conformance>"
+        '<fes:Constraint name="ImplementsSorting">'
+        "<ows:NoValues/>"
+        f"<ows:DefaultValue>{str(implements_sorting).upper()}</ows:DefaultValue>"
+        "</fes:Constraint>"
+        "</fes:Conformance></fes:Filter_Capabilities>"
+        "</wfs:WFS_Capabilities>"
+    )
+
+
+def create_features(count):
+    """
+    Create a list of GeoJSON point features with an increasing "value" property.
+
+    :param count: The number of features.
+    :return: The list of features
+    """
+    return [
+        {
+            "type": "Feature",
+            "id": f"layer.{i}",
+            "geometry": {"type": "Point", "coordinates": [i, i]},
+            "properties": {"value": i, "name": f"feature {i}"},
+        }
+        for i in range(count)
+    ]
+
+
+def create_getfeature_mock(features):
+    """
+    Create a side effect for wfs.getfeature that serves the given features
+    like a WFS: resultType=hits returns the number of features, otherwise a
+    GeoJSON page selected by startindex and maxfeatures is returned. The
+    features are sorted by sortby, e.g. ["value DESC"].
+
+    :param features: The features of the layer.
+    :return: The side effect function
+    """
+
+    def getfeature(**kwargs):
+        if kwargs.get("result_type") == "hits":
+            return BytesIO(
+                (
+                    '<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0" '
+                    f'numberMatched="{len(features)}" numberReturned="0"/>'
+                ).encode("utf-8")
+            )
+        sorted_features = list(features)
+        for sort in reversed(kwargs.get("sortby") or []):
+            name, _, order = sort.partition(" ")
+            sorted_features.sort(
+                key=lambda f: f["properties"][name], reverse=order == "DESC"
+            )
+        start = kwargs.get("startindex") or 0
+        count = kwargs.get("maxfeatures")
+        page = (
+            sorted_features[start : start + count]
+            if count
+            else sorted_features[start:]
+        )
+        return BytesIO(
+            orjson.dumps(
+                {
+                    "type": "FeatureCollection",
+                    "features": page,
+                    "numberMatched": len(features),
+                    "numberReturned": len(page),
+                }
+            )
+        )
+
+    return getfeature
+
+
+@pytest.fixture(autouse=True)
+def clear_metadata_cache():
+    """
+    Make sure that no test uses the cached metadata of another test.
+    """
+    metadata_cache.clear()
+    yield
+    metadata_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_query_plan_cache():
+    """
+    Make sure that no test uses the cached query plans of another test.
+    """
+    query_plan_cache.clear()
+    yield
+    query_plan_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    """
+    Make sure that no test uses the cached results of another test.
+    """
+    result_cache.clear()
+    yield
+    result_cache.clear()
@@ -0,0 +1,205 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import pytest
+from owslib.util import Authentication, ServiceException
+
+pytest.importorskip("aiohttp")
+
+from superset_wfs_dialect.async_engine import AsyncWfsClient, close_sessions  # noqa: E402
+from superset_wfs_dialect.base import FETCH_ENGINE_ASYNCIO, Cursor  # noqa: E402
+from superset_wfs_dialect.fetch_policy import FetchPolicy  # noqa: E402
+from superset_wfs_dialect.tests.test_custom_schema import COMBINED_XSD  # noqa: E402
+
+
+class FakeWfs:
+    """
+    Local WFS serving GeoJSON pages of a layer with number_matched features.
+    """
+
+    def __init__(self, number_matched=25, delay=0.0):
+        self.number_matched = number_matched
+        self.delay = delay
+        self.failures = 0
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake.handle(self, parse_qs(urlparse(self.path).query))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                fake.handle(self, {"body": [body.decode()]})
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/wfs"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, handler, query):
+        with self.lock:
+            self.requests.append(query)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            fail = self.failures > 0
+            if fail:
+                self.failures -= 1
+        try:
+            time.sleep(self.delay)
+            if fail:
+                self.respond(handler, 503, b"unavailable", "text/plain")
+            elif "body" in query:
+                self.respond(handler, 400, b"invalid filter", "text/plain")
+            elif query.get("request") == ["DescribeFeatureType"]:
+                self.respond(handler, 200, COMBINED_XSD, "application/xml")
+            else:
+                self.respond_features(handler, query)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def respond_features(self, handler, query):
+        start = int(query.get("startindex", ["0"])[0])
+        count = int(query.get("count", [str(self.number_matched)])[0])
+        features = [
+            {"type": "Feature", "id": f"layer.{i}", "properties": {"value": i}, "geometry": None}
+            for i in range(start, min(start + count, self.number_matched))
+        ]
+        body = json.dumps(
+            {
+                "type": "FeatureCollection",
+                "numberMatched": self.number_matched,
+                "features": features,
+            }
+        ).encode()
+        self.respond(handler, 200, body, "application/json")
+
+    def respond(self, handler, status, body, content_type):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def create_wfs(self):
+        wfs = MagicMock(spec=["getGETGetFeatureRequest", "getPOSTGetFeatureRequest"])
+        wfs.url = self.url
+        wfs.version = "2.0.0"
+        wfs.timeout = 10
+        wfs.headers = {}
+        wfs.auth = Authentication()
+
+        def get_request(startindex=None, maxfeatures=None, **kwargs):
+            params = {"startindex": startindex or 0}
+            if maxfeatures:
+                params["count"] = maxfeatures
+            return f"{self.url}?{urlencode(params)}"
+
+        wfs.getGETGetFeatureRequest.side_effect = get_request
+        wfs.getPOSTGetFeatureRequest.side_effect = lambda **kwargs: (
+            self.url,
+            kwargs["filter"],
+        )
+        return wfs
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_wfs():
+    fake = FakeWfs()
+    yield fake
+    close_sessions()
+    fake.close()
+
+
+def create_client(fake, max_connections=5, retries=0):
+    return AsyncWfsClient(
+        fake.create_wfs(), max_connections, FetchPolicy(retries=retries, retry_backoff=0)
+    )
+
+
+class TestAsyncWfsClient:
+    def test_get_features_keeps_order(self, fake_wfs):
+        fake_wfs.delay = 0.01
+        client = create_client(fake_wfs)
+
+        responses = client.get_features(
+            [{"typename": "layer", "maxfeatures": 5, "startindex": i} for i in range(0, 25, 5)]
+        )
+
+        ids = [f["id"] for r in responses for f in json.loads(r)["features"]]
+        assert ids == [f"layer.{i}" for i in range(25)]
+
+    def test_concurrency_is_limited(self, fake_wfs):
+        fake_wfs.delay = 0.05
+        client = create_client(fake_wfs, max_connections=3)
+
+        client.get_features(
+            [{"typename": "layer", "maxfeatures": 1, "startindex": i} for i in range(12)]
+        )
+
+        assert len(fake_wfs.requests) == 12
+        assert 1 < fake_wfs.max_active <= 3
+
+    def test_retries_server_errors(self, fake_wfs):
+        fake_wfs.failures = 2
+        client = create_client(fake_wfs, retries=2)
+
+        response = client.get_feature({"typename": "layer", "maxfeatures": 5})
+
+        assert len(json.loads(response)["features"]) == 5
+        assert len(fake_wfs.requests) == 3
+
+    def test_raises_service_exception(self, fake_wfs):
+        client = create_client(fake_wfs, retries=2)
+
+        with pytest.raises(ServiceException, match="invalid filter"):
+            client.get_feature(
+                {"typename": "layer", "method": "POST", "filter": "<fes:Filter/>"}
+            )
+        # client errors are not retried
+        assert len(fake_wfs.requests) == 1
+
+    @patch("superset_wfs_dialect.custom_schema.get_schema")
+    def test_get_schemas(self, mock_get_schema, fake_wfs):
+        client = create_client(fake_wfs)
+
+        schemas = client.get_schemas(["ns:trees", "ns:parks"], chunk_size=1)
+
+        assert len(fake_wfs.requests) == 2
+        mock_get_schema.assert_not_called()
+        assert list(schemas) == ["ns:trees", "ns:parks"]
+        assert schemas["ns:trees"]["geometry_column"] == "the_geom"
+
+
+class TestCursorWithAsyncEngine:
+    def test_fetch_all_features(self, fake_wfs):
+        connection = MagicMock()
+        connection.max_workers = 4
+        connection.server_side_max_features = 4
+        connection.wfs_output_format = "application/json"
+        connection.fetch_engine = FETCH_ENGINE_ASYNCIO
+        connection.result_cache_ttl = 0
+        connection.feature_type_schemas = {}
+        connection.async_client = create_client(fake_wfs)
+        cursor = Cursor(connection)
+
+        features = cursor._fetch_all_features("layer", None)
+
+        assert [f["id"] for f in features] == [f"layer.{i}" for i in range(25)]
+        # the first page and 6 further pages
+        assert len(fake_wfs.requests) == 7
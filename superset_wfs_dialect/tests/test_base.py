@@ -1,7 +1,30 @@
+import re
+import tempfile
+import time
+from io import BytesIO
 import unittest
 from unittest.mock import patch, MagicMock, ANY
-from superset_wfs_dialect.base import Connection, Cursor, AggregationInfo
-from .conftest import create_mock_wfs_instance
+from owslib.etree import etree
+from superset_wfs_dialect.base import (
+    FETCH_ENGINE_ASYNCIO,
+    FETCH_STRATEGY_HITS,
+    Connection,
+    Cursor,
+    AggregationInfo,
+    normalize_sql,
+    query_plan_cache,
+)
+from superset_wfs_dialect.feature_type_schemas import LazyFeatureTypeSchemas
+from superset_wfs_dialect.fetch_policy import FetchPolicy
+from superset_wfs_dialect.result_cache import estimate_size, result_cache
+from .conftest import (
+    create_capabilities,
+    create_features,
+    create_getfeature_mock,
+    create_mock_connection,
+    create_mock_wfs_instance,
+)
+import orjson
 import sqlglot
 import sqlglot.expressions
 
@@ -30,6 +53,27 @@ class TestConnection(unittest.TestCase):
             auth=ANY,
         )
 
+    @patch("superset_wfs_dialect.base.set_pool_size")
+    @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
+    def test_pool_size_covers_host_limit(self, mock_wfs, mock_set_pool_size):
+        mock_wfs.return_value = create_mock_wfs_instance()
+
+        Connection(
+            base_url="https://pool.example.com/ows",
+            max_workers=5,
+            host_max_requests=12,
+            metadata_cache_ttl=0,
+        )
+        mock_set_pool_size.assert_called_with("https://pool.example.com/ows", 12)
+
+        Connection(
+            base_url="https://pool.example.com/ows",
+            max_workers=5,
+            host_max_requests=0,
+            metadata_cache_ttl=0,
+        )
+        mock_set_pool_size.assert_called_with("https://pool.example.com/ows", 5)
+
     @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
     def test_cursor(self, mock_wfs):
         mock_wfs.return_value = create_mock_wfs_instance()
@@ -38,6 +82,198 @@ class TestConnection(unittest.TestCase):
         cursor = conn.cursor()
         self.assertIsInstance(cursor, Cursor)
 
+    @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
+    def test_cache_feature_type_schemas_in_chunks(self, mock_wfs):
+        wfs_instance = create_mock_wfs_instance()
+        wfs_instance.contents = {
+            "a:layer1": None,
+            "b:layer1": None,
+            "a:broken": None,
+            "a:layer2": None,
+        }
+
+        def get_schemas(typenames, chunk_size):
+            if "a:broken" in typenames:
+                raise RuntimeError("DescribeFeatureType failed")
+            return {
+                typename: {"properties": {}, "geometry_column": f"{typename}_geom"}
+                for typename in typenames
+            }
+
+        wfs_instance.get_schemas.side_effect = get_schemas
+        mock_wfs.return_value = wfs_instance
+
+        conn = Connection(max_workers=2, schema_chunk_size=2)
+
+        requested_chunks = sorted(
+            call.args[0] for call in wfs_instance.get_schemas.call_args_list
+        )
+        self.assertEqual(
+            requested_chunks, [["a:layer1", "a:broken"], ["a:layer2", "b:layer1"]]
+        )
+        # the failed chunk is skipped, the other one is cached
+        self.assertEqual(list(conn.feature_type_schemas), ["b:layer1", "a:layer2"])
+        self.assertEqual(
+            conn.feature_type_schemas["b:layer1"]["geometry_column"], "b:layer1_geom"
+        )
+        wfs_instance.get_schema.assert_not_called()
+
+    def test_unsupported_fetch_strategy(self):
+        with self.assertRaises(ValueError):
+            Connection(fetch_strategy="all_at_once")
+
+    @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
+    def test_lazy_schema_loading(self, mock_wfs):
+        wfs_instance = create_mock_wfs_instance()
+        wfs_instance.contents = {"layer1": None, "layer2": None}
+        wfs_instance.get_schema.return_value = {"properties": {}}
+        mock_wfs.return_value = wfs_instance
+
+        conn = Connection(lazy_schema_loading=True)
+        wfs_instance.get_schema.assert_not_called()
+
+        self.assertEqual(conn.feature_type_schemas.get("layer2"), {"properties": {}})
+        wfs_instance.get_schema.assert_called_once_with(typename="layer2")
+
+    @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
+    def test_metadata_is_shared_between_connections(self, mock_wfs):
+        wfs_instance = create_mock_wfs_instance()
+        wfs_instance.contents = {"layer1": None}
+        wfs_instance.get_schemas.return_value = {"layer1": {"properties": {}}}
+        mock_wfs.return_value = wfs_instance
+
+        conn1 = Connection(username="user", password="pass")
+        conn2 = Connection(username="user", password="pass")
+
+        mock_wfs.assert_called_once()
+        wfs_instance.get_schemas.assert_called_once()
+        self.assertIs(conn2.wfs, conn1.wfs)
+        self.assertIs(conn2.feature_type_schemas, conn1.feature_type_schemas)
+        self.assertEqual(conn2.wfs_output_format, "application/json")
+
+        # other credentials must not share the metadata
+        Connection(username="user", password="other")
+        self.assertEqual(mock_wfs.call_count, 2)
+
+    @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
+    def test_eager_and_lazy_connections_do_not_share_schemas(self, mock_wfs):
+        wfs_instance = create_mock_wfs_instance()
+        wfs_instance.contents = {"layer1": None}
+        wfs_instance.get_schemas.return_value = {"layer1": {"properties": {}}}
+        mock_wfs.return_value = wfs_instance
+
+        eager = Connection()
+        lazy = Connection(lazy_schema_loading=True)
+
+        self.assertEqual(mock_wfs.call_count, 2)
+        self.assertNotIsInstance(eager.feature_type_schemas, LazyFeatureTypeSchemas)
+        self.assertIsInstance(lazy.feature_type_schemas, LazyFeatureTypeSchemas)
+        self.assertIs(
+            Connection(lazy_schema_loading=True).feature_type_schemas,
+            lazy.feature_type_schemas,
+        )
+
+    @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
+    def test_metadata_cache_disabled(self, mock_wfs):
+        mock_wfs.return_value = create_mock_wfs_instance()
+
+        Connection(metadata_cache_ttl=0)
+        Connection(metadata_cache_ttl=0)
+
+        self.assertEqual(mock_wfs.call_count, 2)
+
+    @patch("superset_wfs_dialect.base.revalidate_in_background")
+    @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
+    def test_metadata_cache_dir(self, mock_wfs, mock_revalidate):
+        wfs_instance = create_mock_wfs_instance()
+        wfs_instance._capabilities = etree.fromstring("<WFS_Capabilities/>")
+        wfs_instance.contents = {"layer1": None}
+        wfs_instance.get_schemas.return_value = {
+            "layer1": {"properties": {"name": "string"}}
+        }
+        mock_wfs.return_value = wfs_instance
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # cold start: request the metadata and write the cache file
+            Connection(metadata_cache_ttl=0, metadata_cache_dir=cache_dir)
+            mock_revalidate.assert_not_called()
+
+            # restarted worker: use the cache file
+            conn = Connection(metadata_cache_ttl=0, metadata_cache_dir=cache_dir)
+            # the file is younger than the default TTL
+            mock_revalidate.assert_not_called()
+
+            # once the file is older than the TTL, it is revalidated in background
+            with patch(
+                "superset_wfs_dialect.base.time.time", return_value=time.time() + 60
+            ):
+                conn = Connection(metadata_cache_ttl=30, metadata_cache_dir=cache_dir)
+
+        self.assertEqual(
+            mock_wfs.call_args.kwargs["xml"], "<WFS_Capabilities/>"
+        )
+        self.assertEqual(
+            conn.feature_type_schemas["layer1"], {"properties": {"name": "string"}}
+        )
+        self.assertEqual(conn.wfs_output_format, "application/json")
+        wfs_instance.get_schemas.assert_called_once()
+        wfs_instance.get_schema.assert_not_called()
+        mock_revalidate.assert_called_once_with(
+            conn._metadata_key, conn._revalidate_metadata_file
+        )
+
+    @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
+    def test_revalidation_keeps_lazy_schema_loading(self, mock_wfs):
+        wfs_instance = create_mock_wfs_instance()
+        wfs_instance._capabilities = etree.fromstring("<WFS_Capabilities/>")
+        wfs_instance.contents = {"layer1": None}
+        mock_wfs.return_value = wfs_instance
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            conn = Connection(
+                max_workers=3,
+                lazy_schema_loading=True,
+                metadata_cache_ttl=0,
+                metadata_cache_dir=cache_dir,
+            )
+            with patch("superset_wfs_dialect.base.Connection") as mock_connection:
+                conn._revalidate_metadata_file()
+
+        self.assertTrue(mock_connection.call_args.kwargs["lazy_schema_loading"])
+        self.assertEqual(mock_connection.call_args.kwargs["max_workers"], 3)
+        wfs_instance.get_schemas.assert_not_called()
+
+    @patch("superset_wfs_dialect.base.revalidate_in_background")
+    @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
+    def test_implements_sorting(self, mock_wfs, mock_revalidate):
+        wfs_instance = create_mock_wfs_instance()
+        wfs_instance._capabilities = etree.fromstring(create_capabilities())
+        wfs_instance.contents = {}
+        mock_wfs.return_value = wfs_instance
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            conn = Connection(metadata_cache_ttl=0, metadata_cache_dir=cache_dir)
+            self.assertTrue(conn.implements_sorting)
+
+            # the constraint is read from the capabilities of the cache file
+            cached_wfs_instance = create_mock_wfs_instance()
+
+            def create_wfs(**kwargs):
+                cached_wfs_instance._capabilities = etree.fromstring(kwargs["xml"])
+                return cached_wfs_instance
+
+            mock_wfs.side_effect = create_wfs
+            conn = Connection(metadata_cache_ttl=0, metadata_cache_dir=cache_dir)
+            self.assertTrue(conn.implements_sorting)
+
+        mock_wfs.side_effect = None
+        wfs_instance._capabilities = etree.fromstring(
+            create_capabilities(implements_sorting=False)
+        )
+        self.assertFalse(Connection(metadata_cache_ttl=0).implements_sorting)
+        wfs_instance._capabilities = etree.fromstring("<WFS_Capabilities/>")
+        self.assertFalse(Connection(metadata_cache_ttl=0).implements_sorting)
+
 
 class TestCursor(unittest.TestCase):
     @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
@@ -69,6 +305,858 @@ class TestCursor(unittest.TestCase):
         self.assertIn("Invalid SQL query", str(context.exception))
 
 
+class TestRenderParameters(unittest.TestCase):
+    def setUp(self):
+        self.cursor = Cursor(MagicMock())
+
+    def test_render_parameters(self):
+        sql = self.cursor._render_parameters(
+            "SELECT name FROM layer WHERE value > %(value_1)s AND name = %(name_1)s "
+            "AND flag = %(flag_1)s AND id IN (%(id_1)s)",
+            {"value_1": 2, "name_1": "O'Brien", "flag_1": True, "id_1": [1, 2]},
+        )
+
+        self.assertEqual(
+            sql,
+            "SELECT name FROM layer WHERE value > 2 AND name = 'O''Brien' "
+            "AND flag = TRUE AND id IN (1, 2)",
+        )
+
+    def test_like_with_parameters(self):
+        # SQL compiled by SQLAlchemy escapes literal percent signs as %%
+        sql = self.cursor._render_parameters(
+            "SELECT name FROM layer WHERE name LIKE %(name_1)s AND name LIKE 'x%%'",
+            {"name_1": "%ab%"},
+        )
+
+        self.assertEqual(
+            sql, "SELECT name FROM layer WHERE name LIKE '%ab%' AND name LIKE 'x%'"
+        )
+        # unescaped percent signs of hand-written SQL are kept
+        sql = self.cursor._render_parameters(
+            "SELECT name FROM layer WHERE name LIKE '%ab%' AND value > %(value_1)s",
+            {"value_1": 1},
+        )
+        self.assertEqual(
+            sql, "SELECT name FROM layer WHERE name LIKE '%ab%' AND value > 1"
+        )
+
+    def test_like_without_parameters(self):
+        self.cursor._get_query_plan = MagicMock(side_effect=ValueError("stop"))
+
+        # SQLAlchemy passes empty parameters, raw DB-API calls pass none
+        for operation, parameters in [
+            ("SELECT name FROM layer WHERE name LIKE '%%ab%%'", {}),
+            ("SELECT name FROM layer WHERE name LIKE '%ab%'", None),
+        ]:
+            with self.assertRaises(ValueError):
+                self.cursor.execute(operation, parameters)
+
+            self.cursor._get_query_plan.assert_called_with(
+                "SELECT name FROM layer WHERE name LIKE '%ab%'"
+            )
+
+    def test_execute_with_parameters(self):
+        self.cursor._get_query_plan = MagicMock(side_effect=ValueError("stop"))
+
+        with self.assertRaises(ValueError):
+            self.cursor.execute(
+                "SELECT value FROM layer WHERE value > %(value_1)s", {"value_1": 3}
+            )
+
+        self.cursor._get_query_plan.assert_called_once_with(
+            "SELECT value FROM layer WHERE value > 3"
+        )
+
+
+class TestFetchAllFeatures(unittest.TestCase):
+    def setUp(self):
+        self.features = create_features(5)
+        self.connection = create_mock_connection(
+            self.features, server_side_max_features=2
+        )
+        self.cursor = Cursor(self.connection)
+
+    def test_fetch_pages_in_order(self):
+        features = self.cursor._fetch_all_features("layer", None)
+
+        self.assertEqual(features, self.features)
+
+    def get_hits_calls(self):
+        return [
+            call
+            for call in self.connection.wfs.getfeature.call_args_list
+            if call.kwargs.get("result_type") == "hits"
+        ]
+
+    def test_first_page_strategy_skips_hits_request(self):
+        features = self.cursor._fetch_all_features("layer", None)
+
+        self.assertEqual(features, self.features)
+        self.assertEqual(self.get_hits_calls(), [])
+        self.assertEqual(self.connection.wfs.getfeature.call_count, 3)
+
+    def test_single_page_needs_one_request(self):
+        self.connection.server_side_max_features = 10
+
+        features = self.cursor._fetch_all_features("layer", None)
+
+        self.assertEqual(features, self.features)
+        self.connection.wfs.getfeature.assert_called_once()
+
+    def test_hits_fallback_without_number_matched(self):
+        getfeature = create_getfeature_mock(self.features)
+
+        def getfeature_without_count(**kwargs):
+            response = getfeature(**kwargs)
+            if kwargs.get("result_type") == "hits":
+                return response
+            feature_collection = orjson.loads(response.read())
+            del feature_collection["numberMatched"]
+            return BytesIO(orjson.dumps(feature_collection))
+
+        self.connection.wfs.getfeature.side_effect = getfeature_without_count
+
+        features = self.cursor._fetch_all_features("layer", None)
+
+        self.assertEqual(features, self.features)
+        self.assertEqual(len(self.get_hits_calls()), 1)
+
+    def test_first_page_limit_of_server(self):
+        self.connection.server_side_max_features = None
+        getfeature = create_getfeature_mock(self.features)
+        # the server returns at most 2 features per request
+        self.connection.wfs.getfeature.side_effect = lambda **kwargs: getfeature(
+            **dict(kwargs, maxfeatures=min(kwargs.get("maxfeatures") or 2, 2))
+        )
+
+        features = self.cursor._fetch_all_features("layer", None)
+
+        self.assertEqual(features, self.features)
+        self.assertEqual(
+            [
+                call.kwargs["startindex"]
+                for call in self.connection.wfs.getfeature.call_args_list
+            ],
+            [0, 2, 4],
+        )
+
+    def test_page_size_grows_with_number_matched(self):
+        # the server announces no CountDefault, the first page has the
+        # default size
+        self.connection.server_side_max_features = 0
+        first_page = {"features": [{}] * 10000, "numberMatched": 5000000}
+
+        with patch.object(
+            self.cursor, "_get_FeatureCollection", return_value=first_page
+        ) as mock_get:
+            _, limit, features, startindexes = self.cursor._plan_pages("layer", None)
+
+        self.assertEqual(mock_get.call_args.kwargs["limit"], 10000)
+        self.assertEqual(len(features), 10000)
+        self.assertEqual(limit, 50000)
+        self.assertEqual(startindexes[:3], [10000, 60000, 110000])
+        self.assertEqual(len(startindexes), 100)
+
+    def test_streamed_response(self):
+        getfeature = create_getfeature_mock(self.features)
+        streamed_responses = []
+
+        def getfeature_streamed(**kwargs):
+            self.assertTrue(kwargs["stream"])
+            # responses that are not in memory yet are read on demand
+            streamed_response = MagicMock()
+            streamed_response.read.side_effect = getfeature(**kwargs).read
+            streamed_responses.append(streamed_response)
+            return streamed_response
+
+        self.connection.wfs.getfeature.side_effect = getfeature_streamed
+
+        features = self.cursor._fetch_all_features("layer", None)
+
+        self.assertEqual(features, self.features)
+        self.assertEqual(len(streamed_responses), 3)
+        for streamed_response in streamed_responses:
+            streamed_response.close.assert_called_once()
+
+    def test_max_features(self):
+        features = self.cursor._fetch_all_features("layer", None, max_features=3)
+
+        self.assertEqual(features, self.features[:3])
+        self.assertEqual(
+            [
+                (call.kwargs["startindex"], call.kwargs["maxfeatures"])
+                for call in self.connection.wfs.getfeature.call_args_list
+            ],
+            [(0, 2), (2, 2)],
+        )
+
+    def test_max_features_within_first_page(self):
+        features = self.cursor._fetch_all_features("layer", None, max_features=1)
+
+        self.assertEqual(features, self.features[:1])
+        self.connection.wfs.getfeature.assert_called_once()
+        self.assertEqual(
+            self.connection.wfs.getfeature.call_args.kwargs["maxfeatures"], 1
+        )
+
+    def test_max_features_with_hits_strategy(self):
+        self.connection.fetch_strategy = FETCH_STRATEGY_HITS
+
+        features = self.cursor._fetch_all_features("layer", None, max_features=4)
+
+        self.assertEqual(features, self.features[:4])
+        self.assertEqual(self.connection.wfs.getfeature.call_count, 3)
+
+    def test_failed_page_is_raised(self):
+        getfeature = create_getfeature_mock(self.features)
+
+        def getfeature_failing(**kwargs):
+            if kwargs.get("startindex") == 2:
+                raise ConnectionError("connection reset")
+            return getfeature(**kwargs)
+
+        self.connection.wfs.getfeature.side_effect = getfeature_failing
+
+        with self.assertRaises(ConnectionError):
+            self.cursor._fetch_all_features("layer", None)
+
+    @patch("superset_wfs_dialect.fetch_policy.time.sleep")
+    def test_failed_page_is_retried(self, mock_sleep):
+        self.connection.fetch_policy = FetchPolicy(retries=1, retry_backoff=0.5)
+        getfeature = create_getfeature_mock(self.features)
+        failed = []
+
+        def getfeature_failing_once(**kwargs):
+            if kwargs.get("startindex") == 2 and not failed:
+                failed.append(True)
+                raise ConnectionError("connection reset")
+            return getfeature(**kwargs)
+
+        self.connection.wfs.getfeature.side_effect = getfeature_failing_once
+
+        features = self.cursor._fetch_all_features("layer", None)
+
+        self.assertEqual(features, self.features)
+        mock_sleep.assert_called_once_with(0.5)
+
+    def test_hits_strategy(self):
+        self.connection.fetch_strategy = FETCH_STRATEGY_HITS
+
+        features = self.cursor._fetch_all_features("layer", None)
+
+        self.assertEqual(features, self.features)
+        self.assertEqual(len(self.get_hits_calls()), 1)
+        self.assertEqual(self.connection.wfs.getfeature.call_count, 4)
+
+    def test_schema_is_resolved_once_per_query(self):
+        self.cursor.projection = ["value", "geom"]
+
+        self.cursor._fetch_all_features("layer", None)
+
+        self.connection.wfs.get_schema.assert_not_called()
+        page_calls = [
+            call
+            for call in self.connection.wfs.getfeature.call_args_list
+            if call.kwargs.get("result_type") != "hits"
+        ]
+        self.assertEqual(len(page_calls), 3)
+        for call in page_calls:
+            self.assertEqual(call.kwargs["propertyname"], ["value", "geom"])
+            self.assertEqual(call.kwargs["typename"], "layer")
+            self.assertEqual(call.kwargs["maxfeatures"], 2)
+
+
+class TestStreamingCursor(unittest.TestCase):
+    def setUp(self):
+        self.features = create_features(7)
+        self.connection = create_mock_connection(
+            self.features, server_side_max_features=2
+        )
+        self.cursor = Cursor(self.connection, stream=True)
+
+    def test_fetchmany(self):
+        self.cursor.arraysize = 3
+        self.cursor.execute("SELECT value, name FROM layer")
+
+        self.assertEqual(self.cursor.rowcount, -1)
+        self.assertEqual(
+            [d[0] for d in self.cursor.description], ["value", "name"]
+        )
+        self.assertEqual(self.cursor.data, [])
+        self.assertEqual(
+            self.cursor.fetchmany(), [(0, "feature 0"), (1, "feature 1"), (2, "feature 2")]
+        )
+        self.assertEqual(self.cursor.fetchone(), (3, "feature 3"))
+        self.assertEqual(len(self.cursor.fetchall()), 3)
+        self.assertIsNone(self.cursor.fetchone())
+        self.assertEqual(self.cursor.fetchmany(2), [])
+
+    def test_limit_stops_fetching(self):
+        self.connection.max_workers = 1
+        self.connection.wfs.getfeature.side_effect = create_getfeature_mock(
+            create_features(40)
+        )
+        self.cursor.execute("SELECT value FROM layer LIMIT 3")
+
+        self.assertEqual(self.cursor.fetchall(), [(0,), (1,), (2,)])
+        self.cursor._page_stream._thread.join(1)
+        startindexes = [
+            call.kwargs["startindex"]
+            for call in self.connection.wfs.getfeature.call_args_list
+        ]
+        self.assertNotIn(38, startindexes)
+
+    def test_aggregation_is_not_streamed(self):
+        self.cursor.execute("SELECT name, COUNT(value) FROM layer GROUP BY name")
+
+        self.assertIsNone(self.cursor._rows)
+        self.assertEqual(self.cursor.rowcount, 7)
+        self.assertEqual(len(self.cursor.fetchall()), 7)
+
+    def test_close_stops_stream(self):
+        self.cursor.execute("SELECT value FROM layer")
+        # the remaining pages are requested once the first page is consumed
+        self.cursor.fetchmany(3)
+        page_stream = self.cursor._page_stream
+
+        self.cursor.close()
+
+        self.assertTrue(page_stream._closed.is_set())
+        self.assertEqual(self.cursor.fetchall(), [])
+
+    def test_hits_strategy(self):
+        self.connection.fetch_strategy = FETCH_STRATEGY_HITS
+
+        self.cursor.execute("SELECT value FROM layer")
+
+        self.assertEqual(self.cursor.fetchall(), [(i,) for i in range(7)])
+
+    def record_responses(self, features):
+        responses = []
+        getfeature = create_getfeature_mock(features)
+
+        def record(**kwargs):
+            response = getfeature(**kwargs)
+            responses.append(response)
+            return response
+
+        self.connection.wfs.getfeature.side_effect = record
+        return responses
+
+    def test_features_are_decoded_while_consumed(self):
+        self.connection.server_side_max_features = 2000
+        responses = self.record_responses(create_features(2000))
+
+        self.cursor.execute("SELECT value FROM layer")
+
+        self.assertEqual(self.cursor.fetchone(), (0,))
+        response = responses[0]
+        self.assertLess(response.tell(), len(response.getvalue()))
+        self.assertEqual(len(self.cursor.fetchall()), 1999)
+        self.assertTrue(response.closed)
+
+    def test_close_closes_responses(self):
+        responses = self.record_responses(self.features)
+
+        self.cursor.execute("SELECT value FROM layer")
+        self.cursor.fetchmany(3)
+        page_stream = self.cursor._page_stream
+        self.cursor.close()
+        page_stream._thread.join(1)
+
+        self.assertGreater(len(responses), 2)
+        self.assertTrue(all(response.closed for response in responses))
+
+
+class TestLimit(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_mock_connection(
+            create_features(100), implements_sorting=True
+        )
+        self.connection.feature_type_schemas["layer"]["required"] = ["value"]
+        self.cursor = Cursor(self.connection)
+
+    def test_limit_fetches_only_needed_features(self):
+        self.cursor.execute("SELECT value FROM layer LIMIT 15")
+
+        self.assertEqual(self.cursor.fetchall(), [(i,) for i in range(15)])
+        self.assertEqual(
+            [
+                (call.kwargs["startindex"], call.kwargs["maxfeatures"])
+                for call in self.connection.wfs.getfeature.call_args_list
+            ],
+            [(0, 10), (10, 10)],
+        )
+
+    def create_connection_without_count_default(self, mock_wfs):
+        wfs_instance = create_mock_wfs_instance()
+        wfs_instance._capabilities = etree.fromstring(create_capabilities())
+        wfs_instance.contents = {"layer": None}
+        wfs_instance.get_schemas.return_value = {
+            "layer": {
+                "properties": {"value": "int"},
+                "required": ["value"],
+                "geometry_column": "geom",
+            }
+        }
+        wfs_instance.getfeature.side_effect = create_getfeature_mock(
+            create_features(100)
+        )
+        mock_wfs.return_value = wfs_instance
+        conn = Connection(metadata_cache_ttl=0)
+        self.assertEqual(conn.server_side_max_features, 0)
+        return conn, wfs_instance
+
+    @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
+    def test_limit_without_count_default(self, mock_wfs):
+        conn, wfs_instance = self.create_connection_without_count_default(mock_wfs)
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM layer LIMIT 10")
+
+        self.assertEqual(len(cursor.fetchall()), 10)
+        wfs_instance.getfeature.assert_called_once()
+        self.assertEqual(wfs_instance.getfeature.call_args.kwargs["maxfeatures"], 10)
+
+    @patch("superset_wfs_dialect.base.WebFeatureService_2_0_0")
+    def test_order_and_limit_without_count_default(self, mock_wfs):
+        conn, wfs_instance = self.create_connection_without_count_default(mock_wfs)
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM layer ORDER BY value DESC LIMIT 3")
+
+        self.assertEqual(cursor.fetchall(), [(99,), (98,), (97,)])
+        wfs_instance.getfeature.assert_called_once()
+        call = wfs_instance.getfeature.call_args
+        self.assertEqual(call.kwargs["sortby"], ["value DESC"])
+        self.assertEqual(call.kwargs["maxfeatures"], 3)
+
+    def test_limit_with_aggregation_fetches_all_features(self):
+        self.cursor.execute("SELECT name, COUNT(value) FROM layer GROUP BY name LIMIT 5")
+
+        self.assertEqual(self.cursor.rowcount, 5)
+        self.assertEqual(self.connection.wfs.getfeature.call_count, 10)
+
+    def test_projection_with_filter(self):
+        self.connection.feature_type_schemas["layer"]["properties"]["name"] = "str"
+
+        self.cursor.execute(
+            "SELECT name FROM layer WHERE value > 10 ORDER BY value LIMIT 3"
+        )
+
+        call = self.connection.wfs.getfeature.call_args
+        self.assertEqual(call.kwargs["method"], "POST")
+        # the geometry is not selected and not requested
+        self.assertEqual(call.kwargs["propertyname"], ["name", "value"])
+
+    def test_projection_of_geometry_and_all_columns(self):
+        self.cursor.execute("SELECT geom FROM layer LIMIT 1")
+        self.assertEqual(
+            self.connection.wfs.getfeature.call_args.kwargs["propertyname"], ["geom"]
+        )
+
+        self.cursor.execute("SELECT * FROM layer LIMIT 1")
+        self.assertNotIn(
+            "propertyname", self.connection.wfs.getfeature.call_args.kwargs
+        )
+
+    def test_order_and_limit_are_pushed_down(self):
+        self.cursor.execute("SELECT value FROM layer ORDER BY value DESC LIMIT 3")
+
+        self.assertEqual(self.cursor.fetchall(), [(99,), (98,), (97,)])
+        call = self.connection.wfs.getfeature.call_args
+        self.connection.wfs.getfeature.assert_called_once()
+        self.assertEqual(call.kwargs["sortby"], ["value DESC"])
+        self.assertEqual(call.kwargs["maxfeatures"], 3)
+
+    def test_server_without_sorting_sorts_after_fetching(self):
+        self.connection.implements_sorting = False
+
+        self.cursor.execute("SELECT value FROM layer ORDER BY value DESC LIMIT 3")
+
+        self.assertEqual(self.cursor.fetchall(), [(99,), (98,), (97,)])
+        self.assertEqual(self.connection.wfs.getfeature.call_count, 10)
+        self.assertNotIn("sortby", self.connection.wfs.getfeature.call_args.kwargs)
+
+    def test_nillable_property_is_sorted_after_fetching(self):
+        features = create_features(5)
+        features[2]["properties"]["value"] = None
+        self.connection.wfs.getfeature.side_effect = create_getfeature_mock(features)
+        self.connection.feature_type_schemas["layer"]["required"] = []
+
+        self.cursor.execute("SELECT value FROM layer ORDER BY value LIMIT 5")
+
+        # NULL values are sorted last, regardless of the server
+        self.assertEqual(self.cursor.fetchall(), [(0,), (1,), (3,), (4,), (None,)])
+        self.assertNotIn("sortby", self.connection.wfs.getfeature.call_args.kwargs)
+
+    def test_order_by_unknown_property_is_sorted_after_fetching(self):
+        self.cursor.execute("SELECT value FROM layer ORDER BY id DESC LIMIT 3")
+
+        self.assertEqual(self.cursor.fetchall(), [(99,), (98,), (97,)])
+        self.assertEqual(self.connection.wfs.getfeature.call_count, 10)
+        self.assertNotIn("sortby", self.connection.wfs.getfeature.call_args.kwargs)
+
+    def test_aggregation_is_sorted_before_limit(self):
+        self.cursor.execute(
+            "SELECT name, COUNT(value) FROM layer GROUP BY name ORDER BY name DESC LIMIT 2"
+        )
+
+        self.assertEqual(
+            [row["name"] for row in self.cursor.data], ["feature 99", "feature 98"]
+        )
+
+
+class TestCount(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_mock_connection(create_features(25))
+        self.cursor = Cursor(self.connection)
+
+    def test_count_is_answered_by_hits_request(self):
+        self.cursor.execute(
+            "SELECT COUNT(*) AS count FROM layer WHERE value > 3 LIMIT 10000"
+        )
+
+        self.assertEqual(self.cursor.fetchall(), [(25,)])
+        self.assertEqual([d[0] for d in self.cursor.description], ["count"])
+        call = self.connection.wfs.getfeature.call_args
+        self.connection.wfs.getfeature.assert_called_once()
+        self.assertEqual(call.kwargs["result_type"], "hits")
+        self.assertIn("PropertyIsGreaterThan", call.kwargs["filter"])
+
+    def test_count_without_alias(self):
+        self.cursor.execute("SELECT COUNT(*) FROM layer")
+
+        self.assertEqual(self.cursor.fetchall(), [(25,)])
+        self.connection.wfs.getfeature.assert_called_once()
+
+    def test_count_of_column_fetches_features(self):
+        self.cursor.execute("SELECT COUNT(value) AS count FROM layer")
+
+        self.assertEqual(self.cursor.fetchall(), [(25,)])
+        self.assertEqual(self.connection.wfs.getfeature.call_count, 3)
+
+    def test_unknown_count_falls_back_to_fetching_features(self):
+        getfeature = create_getfeature_mock(create_features(25))
+
+        def getfeature_without_hits(**kwargs):
+            if kwargs.get("result_type") == "hits":
+                return BytesIO(
+                    b'<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0" '
+                    b'numberMatched="unknown" numberReturned="0"/>'
+                )
+            return getfeature(**kwargs)
+
+        self.connection.wfs.getfeature.side_effect = getfeature_without_hits
+
+        self.cursor.execute("SELECT COUNT(*) AS count FROM layer")
+
+        self.assertEqual(self.cursor.fetchall(), [(25,)])
+        self.assertEqual(self.connection.wfs.getfeature.call_count, 4)
+
+
+class TestExtrema(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_mock_connection(
+            create_features(25), properties={"value": "int", "name": "str"}
+        )
+        self.cursor = Cursor(self.connection)
+
+    def test_min_and_max_request_first_sorted_feature(self):
+        self.cursor.execute(
+            "SELECT MIN(value) AS lo, MAX(name) AS hi FROM layer WHERE value > 3"
+        )
+
+        self.assertEqual(self.cursor.fetchall(), [(0, "feature 9")])
+        self.assertEqual([d[0] for d in self.cursor.description], ["lo", "hi"])
+        calls = sorted(
+            self.connection.wfs.getfeature.call_args_list,
+            key=lambda call: call.kwargs["sortby"],
+        )
+        self.assertEqual(
+            [
+                (call.kwargs["sortby"], call.kwargs["propertyname"], call.kwargs["maxfeatures"])
+                for call in calls
+            ],
+            [(["name DESC"], ["name"], 1), (["value ASC"], ["value"], 1)],
+        )
+        # features without a value are excluded from the WHERE clause
+        filter_xml = calls[1].kwargs["filter"]
+        self.assertIn("PropertyIsGreaterThan", filter_xml)
+        self.assertRegex(filter_xml, r":Not><\w+:PropertyIsNull>")
+
+    def test_empty_result_is_null(self):
+        self.connection.wfs.getfeature.side_effect = create_getfeature_mock([])
+
+        self.cursor.execute("SELECT MAX(value) FROM layer")
+
+        self.assertEqual(self.cursor.fetchall(), [(None,)])
+
+    def test_server_without_sorting_fetches_features(self):
+        self.connection.implements_sorting = False
+
+        self.cursor.execute("SELECT MIN(value) AS lo, MAX(value) AS hi FROM layer")
+
+        self.assertEqual(self.cursor.fetchall(), [(0, 24)])
+        for call in self.connection.wfs.getfeature.call_args_list:
+            self.assertNotIn("sortby", call.kwargs)
+
+    def test_other_aggregations_fetch_features(self):
+        self.cursor.execute("SELECT MIN(value), COUNT(*) AS count FROM layer")
+        self.assertEqual(self.connection.wfs.getfeature.call_count, 3)
+
+        self.connection.wfs.getfeature.reset_mock()
+        self.cursor.execute("SELECT MAX(id) AS id FROM layer")
+        self.assertEqual(self.connection.wfs.getfeature.call_count, 3)
+
+
+class TestGroupCount(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_mock_connection(
+            properties={"value": "int", "category": "str"}
+        )
+        self.set_categories(["a", "b", "b", "c"] * 6)
+        self.cursor = Cursor(self.connection)
+
+    def set_categories(self, categories):
+        features = create_features(len(categories))
+        for feature, category in zip(features, categories):
+            feature["properties"]["category"] = category
+        getfeature = create_getfeature_mock(features)
+
+        def getfeature_with_category_filter(**kwargs):
+            # hits requests count the features of the categories of the
+            # filter, a group filter ANDs its category to the end
+            filter_xml = kwargs.get("filter") or ""
+            categories = re.findall(
+                r"category</\w+:ValueReference><\w+:Literal>(\w+)<", filter_xml
+            )
+            if ":And>" in filter_xml:
+                categories = categories[-1:]
+            if kwargs.get("result_type") == "hits" and categories:
+                return create_getfeature_mock(
+                    [f for f in features if f["properties"]["category"] in categories]
+                )(**kwargs)
+            return getfeature(**kwargs)
+
+        self.connection.wfs.getfeature.side_effect = getfeature_with_category_filter
+
+    def get_calls(self, result_type=None):
+        return [
+            call
+            for call in self.connection.wfs.getfeature.call_args_list
+            if call.kwargs.get("result_type") == result_type
+        ]
+
+    def test_groups_without_values_in_where_fetch_features(self):
+        self.cursor.execute(
+            "SELECT category, COUNT(*) AS count FROM layer GROUP BY category "
+            "ORDER BY count DESC"
+        )
+
+        self.assertEqual(self.cursor.fetchall(), [("b", 12), ("a", 6), ("c", 6)])
+        # the pages of the features, no sample and no hits requests
+        self.assertEqual(len(self.get_calls()), 3)
+        self.assertEqual(self.get_calls("hits"), [])
+
+    def test_takes_groups_from_in_filter(self):
+        self.cursor.execute(
+            "SELECT category AS cat, COUNT(*) AS count FROM layer "
+            "WHERE category IN ('a', 'c', 'd') GROUP BY category"
+        )
+
+        self.assertEqual(self.cursor.fetchall(), [("a", 6), ("c", 6)])
+        self.assertEqual(self.get_calls(), [])
+        self.assertEqual(len(self.get_calls("hits")), 4)
+
+    def test_single_page_is_counted_after_fetching(self):
+        self.set_categories(["a", "b", "b", None])
+
+        self.cursor.execute(
+            "SELECT category, COUNT(*) AS count FROM layer GROUP BY category"
+        )
+
+        self.assertEqual(self.cursor.fetchall(), [("a", 1), ("b", 2), (None, 1)])
+        self.connection.wfs.getfeature.assert_called_once()
+
+    def test_full_page_with_all_features_is_counted_after_fetching(self):
+        # the page size is 10 and the server matches exactly 10 features
+        self.set_categories(["a", "b"] * 5)
+
+        self.cursor.execute(
+            "SELECT category, COUNT(*) AS count FROM layer GROUP BY category"
+        )
+
+        self.assertEqual(self.cursor.fetchall(), [("a", 5), ("b", 5)])
+        self.connection.wfs.getfeature.assert_called_once()
+
+    def test_group_values_keep_literal_types(self):
+        condition = sqlglot.parse_one(
+            "SELECT * FROM layer WHERE category IN ('1', 2, 2.5, '1')"
+        ).args["where"].this
+
+        values = self.cursor._extract_group_values(condition, "category")
+
+        self.assertEqual(values, ["1", 2, 2.5])
+        self.assertEqual([type(v) for v in values], [str, int, float])
+
+    def test_clustered_groups_need_no_additional_requests(self):
+        # the first page only contains the categories a and b
+        self.set_categories(["a", "b"] * 5 + ["c"] * 5)
+
+        self.cursor.execute(
+            "SELECT category, COUNT(*) AS count FROM layer GROUP BY category"
+        )
+
+        self.assertEqual(
+            sorted(self.cursor.fetchall()), [("a", 5), ("b", 5), ("c", 5)]
+        )
+        self.assertEqual(len(self.get_calls()), 2)
+        self.assertEqual(self.get_calls("hits"), [])
+
+    def test_many_groups_fall_back_to_fetching_features(self):
+        with patch("superset_wfs_dialect.base.GROUP_COUNT_MAX_VALUES", 2):
+            self.cursor.execute(
+                "SELECT category, COUNT(*) AS count FROM layer "
+                "WHERE category IN ('a', 'b', 'c') GROUP BY category"
+            )
+
+        self.assertEqual(len(self.cursor.fetchall()), 3)
+        self.assertEqual(self.get_calls("hits"), [])
+
+    def test_hits_requests_use_the_asyncio_engine(self):
+        self.connection.fetch_engine = FETCH_ENGINE_ASYNCIO
+
+        def get_features(params_list, owner=None):
+            return [
+                self.connection.wfs.getfeature(
+                    **{k: v for k, v in params.items() if k != "method"}
+                ).read()
+                for params in params_list
+            ]
+
+        self.connection.async_client.get_features.side_effect = get_features
+
+        self.cursor.execute(
+            "SELECT category, COUNT(*) AS count FROM layer "
+            "WHERE category IN ('a', 'c') GROUP BY category"
+        )
+
+        self.assertEqual(self.cursor.fetchall(), [("a", 6), ("c", 6)])
+        self.connection.async_client.get_features.assert_called_once()
+        params_list = self.connection.async_client.get_features.call_args.args[0]
+        self.assertEqual(
+            [(p["result_type"], p["method"]) for p in params_list],
+            [("hits", "POST")] * 3,
+        )
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.features = create_features(5)
+        self.connection = create_mock_connection(
+            self.features,
+            server_side_max_features=2,
+            result_cache_ttl=60,
+            metadata_cache_key=("https://example.com/wfs", "user", None, None),
+            feature_type_schemas={},
+        )
+
+    def test_identical_queries_are_cached(self):
+        first = Cursor(self.connection)._fetch_all_features("layer", None)
+        request_count = self.connection.wfs.getfeature.call_count
+
+        second = Cursor(self.connection)._fetch_all_features("layer", None)
+
+        self.assertEqual(second, first)
+        self.assertEqual(self.connection.wfs.getfeature.call_count, request_count)
+
+    def test_key_contains_filter_limit_and_credentials(self):
+        Cursor(self.connection)._fetch_all_features("layer", None)
+        Cursor(self.connection)._fetch_all_features("layer", "<fes:Filter/>")
+        Cursor(self.connection)._fetch_all_features("layer", None, max_features=2)
+        self.connection.metadata_cache_key = ("https://example.com/wfs", "other", None, None)
+        Cursor(self.connection)._fetch_all_features("layer", None)
+
+        self.assertEqual(len(result_cache), 4)
+
+    def test_disabled(self):
+        self.connection.result_cache_ttl = 0
+
+        Cursor(self.connection)._fetch_all_features("layer", None)
+        Cursor(self.connection)._fetch_all_features("layer", None)
+
+        self.assertEqual(len(result_cache), 0)
+
+    def test_estimate_size(self):
+        self.assertEqual(
+            estimate_size(self.features), len(orjson.dumps(self.features))
+        )
+
+    def test_estimate_size_stops_above_limit(self):
+        with patch(
+            "superset_wfs_dialect.result_cache.orjson.dumps", wraps=orjson.dumps
+        ) as mock_dumps:
+            size = estimate_size(self.features, limit=1)
+
+        self.assertGreater(size, 1)
+        self.assertEqual(mock_dumps.call_count, 1)
+
+    def test_too_large_results_are_not_cached(self):
+        with patch.object(result_cache, "maxbytes", 10):
+            features = Cursor(self.connection)._fetch_all_features("layer", None)
+
+        self.assertEqual(len(features), 5)
+        self.assertEqual(len(result_cache), 0)
+
+
+class TestQueryPlanCache(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_mock_connection(create_features(5))
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("  SELECT value\n  FROM  layer\tWHERE name = 'a  b' "),
+            "SELECT value FROM layer WHERE name = 'a  b'",
+        )
+
+    def test_repeated_query_is_not_parsed_again(self):
+        sql = "SELECT value FROM layer WHERE value > 1 ORDER BY value DESC"
+
+        with patch(
+            "superset_wfs_dialect.base.sqlglot.parse_one",
+            wraps=sqlglot.parse_one,
+        ) as mock_parse_one, patch.object(
+            Cursor, "_extract_filter", autospec=True, side_effect=Cursor._extract_filter
+        ) as mock_extract_filter:
+            first = Cursor(self.connection)
+            first.execute(sql)
+            second = Cursor(self.connection)
+            second.execute(sql.replace(" ", "  "))
+
+        self.assertEqual(mock_parse_one.call_count, 1)
+        self.assertEqual(mock_extract_filter.call_count, 1)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual([row["value"] for row in second.data], [4, 3, 2, 1, 0])
+
+    def test_plan_is_invalidated_by_new_schema(self):
+        sql = "SELECT value FROM layer"
+        Cursor(self.connection).execute(sql)
+
+        self.connection.feature_type_schemas = {
+            "layer": {"properties": {"value": "int"}, "geometry_column": "geom"}
+        }
+        with patch(
+            "superset_wfs_dialect.base.sqlglot.parse_one",
+            wraps=sqlglot.parse_one,
+        ) as mock_parse_one:
+            Cursor(self.connection).execute(sql)
+
+        mock_parse_one.assert_called_once()
+        self.assertEqual(len(query_plan_cache), 1)
+
+
 class TestApplyOrder(unittest.TestCase):
     def setUp(self):
         self.cursor = Cursor(MagicMock())
@@ -0,0 +1,72 @@
+from unittest.mock import patch
+
+from superset_wfs_dialect.cache import TTLCache
+
+
+class TestTTLCache:
+    """Tests for the TTLCache class."""
+
+    def test_get_and_set(self):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("b", "default") == "default"
+        assert "a" in cache
+        assert len(cache) == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # mark "a" as recently used
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    @patch("superset_wfs_dialect.cache.time.monotonic")
+    def test_entries_expire(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=30)
+
+        mock_monotonic.return_value = 111
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert len(cache) == 1
+
+    def test_pop_and_clear(self):
+        cache = TTLCache()
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        assert cache.pop("a") == 1
+        assert cache.pop("a") is None
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_evicts_by_size(self):
+        cache = TTLCache(maxsize=10, maxbytes=100)
+        cache.set("a", 1, size=40)
+        cache.set("b", 2, size=40)
+        cache.get("a")
+        cache.set("c", 3, size=40)
+
+        # b is the least recently used entry
+        assert cache.keys() == ["a", "c"]
+        assert cache.bytes == 80
+
+    def test_does_not_store_oversized_entries(self):
+        cache = TTLCache(maxsize=10, maxbytes=100)
+        cache.set("a", 1, size=40)
+
+        assert cache.set("b", 2, size=101) is False
+        assert cache.keys() == ["a"]
+
+        cache.pop("a")
+        assert cache.bytes == 0
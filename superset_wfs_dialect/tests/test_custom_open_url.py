@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from superset_wfs_dialect import custom_open_url
+from superset_wfs_dialect.custom_open_url import get_session, openURL, set_pool_size
+
+
+class TestSessions:
+    """Tests for the pooled sessions used by openURL."""
+
+    @pytest.fixture(autouse=True)
+    def reset_sessions(self):
+        custom_open_url._sessions.clear()
+        custom_open_url._pool_sizes.clear()
+        yield
+        custom_open_url._sessions.clear()
+        custom_open_url._pool_sizes.clear()
+
+    def test_one_session_per_host(self):
+        session = get_session("https://example.com/geoserver/ows?service=WFS")
+
+        assert isinstance(session, requests.Session)
+        assert get_session("https://EXAMPLE.com/geoserver/wfs") is session
+        assert get_session("https://other.example.com/geoserver/ows") is not session
+        assert get_session("http://example.com/geoserver/ows") is not session
+
+    def test_set_pool_size(self):
+        session = get_session("https://example.com/wfs")
+        adapter = session.get_adapter("https://example.com/wfs")
+        assert adapter._pool_maxsize == custom_open_url.DEFAULT_POOL_SIZE
+
+        # smaller pools keep the existing session
+        set_pool_size("https://example.com/wfs", 2)
+        assert get_session("https://example.com/wfs") is session
+
+        set_pool_size("https://example.com/wfs", 20)
+        new_session = get_session("https://example.com/wfs")
+        assert new_session is not session
+        assert new_session.get_adapter("https://example.com/wfs")._pool_maxsize == 20
+
+    def test_set_pool_size_closes_replaced_session(self):
+        session = get_session("https://example.com/wfs")
+
+        with patch.object(session, "close") as close:
+            set_pool_size("https://example.com/wfs", 2)
+            close.assert_not_called()
+
+            set_pool_size("https://example.com/wfs", 20)
+            close.assert_called_once_with()
+
+    def test_cookies_are_not_stored(self):
+        session = get_session("https://example.com/wfs")
+        cookie = requests.cookies.create_cookie(
+            "JSESSIONID", "abc", domain="example.com"
+        )
+        request = requests.cookies.MockRequest(
+            requests.Request("GET", "https://example.com/wfs").prepare()
+        )
+
+        assert not session.cookies.get_policy().set_ok(cookie, request)
+
+    @patch("superset_wfs_dialect.custom_open_url.get_session")
+    def test_open_url_uses_session(self, mock_get_session):
+        response = MagicMock(status_code=200, headers={"Content-Type": "application/json"})
+        mock_get_session.return_value.request.return_value = response
+
+        result = openURL("https://example.com/wfs", data={"request": "GetFeature"})
+
+        mock_get_session.assert_called_once_with("https://example.com/wfs")
+        mock_get_session.return_value.request.assert_called_once()
+        assert mock_get_session.return_value.request.call_args.args == (
+            "GET",
+            "https://example.com/wfs",
+        )
+        assert result.read() is response.content
+
+    @patch("superset_wfs_dialect.custom_open_url.get_session")
+    def test_open_url_stream(self, mock_get_session):
+        response = MagicMock(status_code=200, headers={"Content-Type": "application/json"})
+        response.raw.read.return_value = b'{"type": '
+        mock_get_session.return_value.request.return_value = response
+
+        result = openURL("https://example.com/wfs", stream=True)
+
+        assert mock_get_session.return_value.request.call_args.kwargs["stream"] is True
+        assert result.read(9) == b'{"type": '
+        response.raw.read.assert_called_once_with(9, decode_content=True)
+        result.close()
+        response.close.assert_called_once()
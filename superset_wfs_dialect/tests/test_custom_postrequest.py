@@ -258,3 +258,37 @@ class TestCustomPostRequest:
         # Verify Element was still called (though no namespaces added)
         assert mock_element_class.called
         assert mock_post_request._root == mock_new_root
+
+    def test_set_sortby_with_sort_order(self):
+        """Test that the sort order of every property is set."""
+        request = PostRequest_2_0_0()
+        request.create_query("layer")
+
+        request.set_sortby(["value DESC", "name"])
+
+        fes = "{http://www.opengis.net/fes/2.0}"
+        properties = request._query.find(f"{fes}SortBy").findall(f"{fes}SortProperty")
+        assert [p.find(f"{fes}ValueReference").text for p in properties] == ["value", "name"]
+        assert properties[0].find(f"{fes}SortOrder").text == "DESC"
+        assert properties[1].find(f"{fes}SortOrder") is None
+
+    def test_set_propertyname_in_front_of_filter(self):
+        """Test that the property names precede the filter and the sort order."""
+        request = PostRequest_2_0_0()
+        request.create_query("layer")
+        request.set_filter(
+            '<fes:Filter xmlns:fes="http://www.opengis.net/fes/2.0">'
+            "<fes:PropertyIsEqualTo><fes:ValueReference>name</fes:ValueReference>"
+            "<fes:Literal>a</fes:Literal></fes:PropertyIsEqualTo></fes:Filter>"
+        )
+
+        request.set_propertyname(["name", "value"])
+        request.set_sortby(["value DESC"])
+
+        assert [child.tag for child in request._query] == [
+            "{http://www.opengis.net/wfs/2.0}PropertyName",
+            "{http://www.opengis.net/wfs/2.0}PropertyName",
+            "{http://www.opengis.net/fes/2.0}Filter",
+            "{http://www.opengis.net/fes/2.0}SortBy",
+        ]
+        assert [child.text for child in request._query[:2]] == ["name", "value"]
@@ -0,0 +1,108 @@
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs, urlparse
+
+from superset_wfs_dialect.custom_schema import get_schemas
+
+COMBINED_XSD = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema"
+    xmlns:gml="http://www.opengis.net/gml/3.2"
+    xmlns:ns="http://example.com/ns"
+    targetNamespace="http://example.com/ns">
+  <xsd:complexType name="treesType">
+    <xsd:complexContent>
+      <xsd:extension base="gml:AbstractFeatureType">
+        <xsd:sequence>
+          <xsd:element name="height" nillable="true" type="xsd:double"/>
+          <xsd:element name="species" nillable="false" type="xsd:string"/>
+          <xsd:element name="the_geom" nillable="true" type="gml:PointPropertyType"/>
+        </xsd:sequence>
+      </xsd:extension>
+    </xsd:complexContent>
+  </xsd:complexType>
+  <xsd:element name="trees" substitutionGroup="gml:AbstractFeature" type="ns:treesType"/>
+  <xsd:complexType name="parksType">
+    <xsd:complexContent>
+      <xsd:extension base="gml:AbstractFeatureType">
+        <xsd:sequence>
+          <xsd:element name="name" nillable="true" type="xsd:string"/>
+          <xsd:element name="area" nillable="true" type="gml:MultiSurfacePropertyType"/>
+        </xsd:sequence>
+      </xsd:extension>
+    </xsd:complexContent>
+  </xsd:complexType>
+  <xsd:element name="parks" substitutionGroup="gml:AbstractFeature" type="ns:parksType"/>
+</xsd:schema>"""
+
+
+def mock_response(content):
+    response = MagicMock()
+    response.read.return_value = content
+    return response
+
+
+class TestGetSchemas:
+    """Tests for the combined DescribeFeatureType requests."""
+
+    @patch("superset_wfs_dialect.custom_schema.get_schema")
+    @patch("superset_wfs_dialect.custom_schema.openURL")
+    def test_split_combined_schema(self, mock_openurl, mock_get_schema):
+        mock_openurl.return_value = mock_response(COMBINED_XSD)
+
+        schemas = get_schemas("https://example.com/wfs", ["ns:trees", "ns:parks"])
+
+        mock_openurl.assert_called_once()
+        query = parse_qs(urlparse(mock_openurl.call_args.args[0]).query)
+        assert query["typeName"] == ["ns:trees,ns:parks"]
+        assert query["request"] == ["DescribeFeatureType"]
+        mock_get_schema.assert_not_called()
+
+        assert list(schemas) == ["ns:trees", "ns:parks"]
+        assert schemas["ns:trees"]["properties"] == {
+            "height": "double",
+            "species": "string",
+        }
+        assert schemas["ns:trees"]["required"] == ["species"]
+        assert schemas["ns:trees"]["geometry_column"] == "the_geom"
+        assert schemas["ns:trees"]["geometry"] == "Point"
+        assert schemas["ns:parks"]["properties"] == {"name": "string"}
+        assert schemas["ns:parks"]["geometry_column"] == "area"
+
+    @patch("superset_wfs_dialect.custom_schema.get_schema")
+    @patch("superset_wfs_dialect.custom_schema.openURL")
+    def test_chunks_by_size_and_namespace(self, mock_openurl, mock_get_schema):
+        mock_openurl.return_value = mock_response(COMBINED_XSD)
+        mock_get_schema.return_value = {"properties": {}}
+
+        get_schemas(
+            "https://example.com/wfs",
+            ["ns:trees", "other:roads", "ns:parks", "ns:lakes"],
+            chunk_size=2,
+        )
+
+        requested = [
+            parse_qs(urlparse(call.args[0]).query)["typeName"][0]
+            for call in mock_openurl.call_args_list
+        ]
+        assert requested == ["ns:trees,ns:parks", "ns:lakes", "other:roads"]
+
+    @patch("superset_wfs_dialect.custom_schema.get_schema")
+    @patch("superset_wfs_dialect.custom_schema.openURL")
+    def test_fallback_to_single_requests(self, mock_openurl, mock_get_schema):
+        mock_openurl.side_effect = RuntimeError("combined request not supported")
+
+        def get_schema(url, typename, version, timeout, headers, auth):
+            if typename == "ns:broken":
+                raise RuntimeError("DescribeFeatureType failed")
+            return {"properties": {}, "geometry_column": typename}
+
+        mock_get_schema.side_effect = get_schema
+
+        schemas = get_schemas(
+            "https://example.com/wfs", ["ns:trees", "ns:broken", "ns:parks"]
+        )
+
+        assert schemas == {
+            "ns:trees": {"properties": {}, "geometry_column": "ns:trees"},
+            "ns:parks": {"properties": {}, "geometry_column": "ns:parks"},
+        }
+        assert mock_get_schema.call_count == 3
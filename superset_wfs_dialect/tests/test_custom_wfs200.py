@@ -180,6 +180,22 @@ class TestCustomWFS200:
         assert "resultType" in query_params
         assert query_params["resultType"][0] == "results"
 
+    @patch('superset_wfs_dialect.custom_wfs200.openURL')
+    def test_getfeature_stream_without_content_length(self, mock_openurl, mock_wfs_instance):
+        """Test that chunked responses are not read when streaming."""
+        mock_response = MagicMock()
+        mock_response.info.return_value = {"Transfer-Encoding": "chunked"}
+        mock_openurl.return_value = mock_response
+        mock_wfs_instance.getGETGetFeatureRequest.return_value = "https://example.com/wfs"
+
+        result = WebFeatureService_2_0_0.getfeature(
+            mock_wfs_instance, typename="test:layer", stream=True
+        )
+
+        assert result is mock_response
+        assert mock_openurl.call_args.kwargs["stream"] is True
+        mock_response.read.assert_not_called()
+
     @patch('superset_wfs_dialect.custom_wfs200.PostRequest_2_0_0')
     def test_filter_parameter_in_post_request(self, mock_post_request_class, mock_wfs_instance_post):
         """Test that filter parameter is used in POST requests."""
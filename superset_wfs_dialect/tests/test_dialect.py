@@ -1,6 +1,10 @@
+import os
+import subprocess
+import sys
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from superset_wfs_dialect.dialect import WfsDialect
+from sqlalchemy import column, create_engine, func, select, table, text
 from sqlalchemy.types import Integer, String
 
 
@@ -57,6 +61,7 @@ class TestWfsDialect(unittest.TestCase):
             "geometry_column": "geom",
         }
         connection.connection.connection.wfs = wfs_mock
+        connection.connection.connection.feature_type_schemas = {}
 
         expected_columns = [
             {"name": "id", "type": Integer, "nullable": False, "default": None},
@@ -72,6 +77,143 @@ class TestWfsDialect(unittest.TestCase):
             self.assertEqual(expected["default"], actual["default"])
             self.assertEqual(expected["type"], type(actual["type"]))
 
+    def test_get_columns_from_connection_schemas(self):
+        connection = MagicMock()
+        wfs_connection = connection.connection.connection
+        wfs_connection.feature_type_schemas = {
+            "test_table": {
+                "properties": {"name": "string"},
+                "required": [],
+                "geometry_column": "the_geom",
+            }
+        }
+
+        result = self.dialect.get_columns(connection, "test_table")
+
+        self.assertEqual([col["name"] for col in result], ["name", "geom"])
+        wfs_connection.wfs.get_schema.assert_not_called()
+
+    def test_get_columns_fetches_and_caches_missing_schema(self):
+        connection = MagicMock()
+        wfs_connection = connection.connection.connection
+        wfs_connection.feature_type_schemas = {}
+        wfs_connection.wfs.get_schema.return_value = {
+            "properties": {"name": "string"},
+            "required": [],
+        }
+
+        self.dialect.get_columns(connection, "test_table")
+        self.dialect.get_columns(connection, "test_table")
+
+        wfs_connection.wfs.get_schema.assert_called_once_with("test_table")
+        self.assertIn("test_table", wfs_connection.feature_type_schemas)
+
+    def test_reflection_info_cache(self):
+        connection = MagicMock()
+        wfs_connection = connection.connection.connection
+        wfs_connection.feature_type_schemas = MagicMock()
+        wfs_connection.feature_type_schemas.get.return_value = {
+            "properties": {"name": "string"},
+            "required": [],
+        }
+        wfs_connection.wfs.contents = {"layer1": None}
+        info_cache = {}
+
+        columns1 = self.dialect.get_columns(
+            connection, "test_table", info_cache=info_cache
+        )
+        columns2 = self.dialect.get_columns(
+            connection, "test_table", info_cache=info_cache
+        )
+        tables = self.dialect.get_table_names(connection, info_cache=info_cache)
+        wfs_connection.wfs.contents = {}
+        self.assertEqual(
+            self.dialect.get_table_names(connection, info_cache=info_cache), tables
+        )
+
+        self.assertIs(columns1, columns2)
+        wfs_connection.feature_type_schemas.get.assert_called_once_with("test_table")
+        self.assertEqual(tables, ["layer1"])
+
+    def test_statement_cache(self):
+        self.assertTrue(self.dialect.supports_statement_cache)
+
+        def compile_chart_query(value):
+            layer = table("layer", column("name"), column("value"))
+            stmt = (
+                select(layer.c.name, func.count(layer.c.value))
+                .where(layer.c.value > value)
+                .group_by(layer.c.name)
+            )
+            return stmt._compile_w_cache(
+                self.dialect, compiled_cache=compiled_cache, column_keys=[]
+            )
+
+        compiled_cache = {}
+        compiled1, _, cache_hit1 = compile_chart_query(1)
+        compiled2, extracted_params, cache_hit2 = compile_chart_query(2)
+
+        self.assertIs(compiled1, compiled2)
+        self.assertEqual(cache_hit1, self.dialect.CACHE_MISS)
+        self.assertEqual(cache_hit2, self.dialect.CACHE_HIT)
+        self.assertEqual(
+            compiled2.construct_params(extracted_parameters=extracted_params),
+            {"value_1": 2},
+        )
+
+    def test_stream_results(self):
+        dbapi_connection = MagicMock()
+        engine = create_engine(
+            "wfs://example.com/geoserver/ows", creator=lambda: dbapi_connection
+        )
+
+        with engine.connect() as connection:
+            connection.execution_options(stream_results=True).execute(
+                text("SELECT name FROM layer")
+            )
+            connection.execute(text("SELECT name FROM layer"))
+
+        self.assertEqual(
+            [call.kwargs for call in dbapi_connection.cursor.call_args_list],
+            [{"stream": True}, {}],
+        )
+
+
+class TestDialectImport(unittest.TestCase):
+    def test_import_does_not_load_heavy_dependencies(self):
+        heavy_modules = [
+            "superset_wfs_dialect.base",
+            "sqlglot",
+            "owslib",
+            "orjson",
+            "authlib",
+            "pyproj",
+        ]
+        code = (
+            "import sys, superset_wfs_dialect, superset_wfs_dialect.dialect\n"
+            "print(','.join(m for m in %r if m in sys.modules))" % heavy_modules
+        )
+
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+        )
+
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_dbapi_connect_loads_base(self):
+        from superset_wfs_dialect import dbapi
+
+        with patch("superset_wfs_dialect.base.connect") as mock_connect:
+            connection = WfsDialect.import_dbapi().connect(base_url="https://example.com")
+
+        mock_connect.assert_called_once_with(base_url="https://example.com")
+        self.assertIs(connection, mock_connect.return_value)
+        self.assertEqual(dbapi.paramstyle, "pyformat")
+
 
 if __name__ == "__main__":
     unittest.main()
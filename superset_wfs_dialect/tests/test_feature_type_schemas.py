@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from superset_wfs_dialect.feature_type_schemas import LazyFeatureTypeSchemas
+
+
+class TestLazyFeatureTypeSchemas:
+    """Tests for the LazyFeatureTypeSchemas mapping."""
+
+    @pytest.fixture
+    def wfs(self):
+        """Fixture providing a mock WFS with two feature types."""
+        wfs = MagicMock()
+        wfs.contents = {"ns:layer1": None, "ns:layer2": None}
+        wfs.get_schema.side_effect = lambda typename: {
+            "properties": {"name": "string"},
+            "geometry_column": f"{typename}_geom",
+        }
+        return wfs
+
+    def test_no_request_on_creation(self, wfs):
+        schemas = LazyFeatureTypeSchemas(wfs)
+
+        assert len(schemas) == 2
+        assert list(schemas) == ["ns:layer1", "ns:layer2"]
+        assert "ns:layer1" in schemas
+        wfs.get_schema.assert_not_called()
+
+    def test_fetches_schema_once_on_first_access(self, wfs):
+        schemas = LazyFeatureTypeSchemas(wfs)
+
+        assert schemas["ns:layer1"]["geometry_column"] == "ns:layer1_geom"
+        assert schemas.get("ns:layer1")["geometry_column"] == "ns:layer1_geom"
+
+        wfs.get_schema.assert_called_once_with(typename="ns:layer1")
+        assert schemas.is_loaded("ns:layer1")
+        assert not schemas.is_loaded("ns:layer2")
+
+    def test_unknown_typename(self, wfs):
+        schemas = LazyFeatureTypeSchemas(wfs)
+
+        assert schemas.get("ns:unknown") is None
+        assert "ns:unknown" not in schemas
+        wfs.get_schema.assert_not_called()
+
+    def test_failed_request_is_not_cached(self, wfs):
+        wfs.get_schema.side_effect = [RuntimeError("boom"), {"properties": {}}]
+        schemas = LazyFeatureTypeSchemas(wfs)
+
+        assert schemas.get("ns:layer1") is None
+        assert schemas.get("ns:layer1") == {"properties": {}}
+        assert wfs.get_schema.call_count == 2
+
+    def test_concurrent_access_fetches_once(self, wfs):
+        schemas = LazyFeatureTypeSchemas(wfs)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: schemas["ns:layer2"], range(16)))
+
+        assert all(result is results[0] for result in results)
+        wfs.get_schema.assert_called_once_with(typename="ns:layer2")
@@ -0,0 +1,199 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+from owslib.util import ServiceException
+
+from superset_wfs_dialect.fetch_policy import (
+    FetchPolicy,
+    LatencyTracker,
+    get_latency_tracker,
+    is_page_request,
+    is_retryable,
+)
+
+
+def create_http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(response=response)
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_quantile(self):
+        tracker = LatencyTracker()
+        for i in range(1, 101):
+            tracker.add(i / 100)
+
+        self.assertEqual(tracker.quantile(0.95), 0.95)
+        self.assertEqual(tracker.quantile(0.5), 0.5)
+
+    def test_quantile_needs_samples(self):
+        tracker = LatencyTracker()
+        tracker.add(1)
+
+        self.assertIsNone(tracker.quantile(0.95))
+        self.assertEqual(tracker.quantile(0.95, min_samples=1), 1)
+
+    def test_tracker_per_wfs(self):
+        tracker = get_latency_tracker("https://example.com/wfs")
+
+        self.assertIs(get_latency_tracker("https://example.com/wfs"), tracker)
+        self.assertIsNot(get_latency_tracker("https://other.example.com/wfs"), tracker)
+
+
+    def test_only_pages_are_tracked(self):
+        tracker = LatencyTracker()
+        policy = FetchPolicy(latency_tracker=tracker)
+
+        policy.call(lambda: "hits", track_latency=False)
+        asyncio.run(policy.call_async(self.request_async, track_latency=False))
+        self.assertIsNone(tracker.quantile(0.5, min_samples=1))
+
+        policy.call(lambda: "page")
+        self.assertIsNotNone(tracker.quantile(0.5, min_samples=1))
+
+    async def request_async(self):
+        return "hits"
+
+    def test_is_page_request(self):
+        self.assertTrue(is_page_request({"typename": "layer", "maxfeatures": 1000}))
+        self.assertTrue(is_page_request({"typename": "layer"}))
+        self.assertFalse(is_page_request({"typename": "layer", "result_type": "hits"}))
+        self.assertFalse(is_page_request({"typename": "layer", "maxfeatures": 1}))
+
+
+class TestIsRetryable(unittest.TestCase):
+    def test_is_retryable(self):
+        self.assertTrue(is_retryable(requests.ConnectionError()))
+        self.assertTrue(is_retryable(requests.Timeout()))
+        self.assertTrue(is_retryable(create_http_error(503)))
+        self.assertTrue(is_retryable(create_http_error(429)))
+        self.assertFalse(is_retryable(create_http_error(404)))
+        self.assertFalse(is_retryable(ServiceException("invalid filter")))
+
+    def test_is_retryable_with_status(self):
+        # errors of the asyncio engine carry the HTTP status
+        error = Exception()
+        error.status = 502
+        self.assertTrue(is_retryable(error))
+        error.status = 403
+        self.assertFalse(is_retryable(error))
+
+
+@patch("superset_wfs_dialect.fetch_policy.time.sleep")
+class TestFetchPolicy(unittest.TestCase):
+    def test_success(self, mock_sleep):
+        policy = FetchPolicy()
+
+        self.assertEqual(policy.call(lambda: "page"), "page")
+        mock_sleep.assert_not_called()
+
+    def test_retries_with_backoff(self, mock_sleep):
+        request = MagicMock(
+            side_effect=[requests.ConnectionError(), requests.Timeout(), "page"]
+        )
+        policy = FetchPolicy(retries=2, retry_backoff=0.5)
+
+        self.assertEqual(policy.call(request), "page")
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual([c.args[0] for c in mock_sleep.call_args_list], [0.5, 1.0])
+
+    def test_error_after_retries(self, mock_sleep):
+        request = MagicMock(side_effect=requests.ConnectionError("reset"))
+        policy = FetchPolicy(retries=2)
+
+        with self.assertRaises(requests.ConnectionError):
+            policy.call(request)
+        self.assertEqual(request.call_count, 3)
+
+    def test_no_retry_of_service_exception(self, mock_sleep):
+        request = MagicMock(side_effect=ServiceException("invalid filter"))
+        policy = FetchPolicy(retries=2)
+
+        with self.assertRaises(ServiceException):
+            policy.call(request)
+        request.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_hedging(self, mock_sleep):
+        tracker = LatencyTracker()
+        for _ in range(20):
+            tracker.add(0.01)
+        policy = FetchPolicy(hedging=True, latency_tracker=tracker)
+        release_slow_request = threading.Event()
+        calls = []
+
+        def request():
+            calls.append(True)
+            if len(calls) == 1:
+                # the first request hangs
+                release_slow_request.wait(5)
+                return "slow"
+            return "fast"
+
+        start = time.monotonic()
+        result = policy.call(request)
+        release_slow_request.set()
+
+        self.assertEqual(result, "fast")
+        self.assertEqual(len(calls), 2)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_no_hedging_without_latencies(self, mock_sleep):
+        policy = FetchPolicy(hedging=True)
+        request = MagicMock(return_value="page")
+
+        self.assertEqual(policy.call(request), "page")
+        request.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+class TestFetchPolicyAsync(unittest.TestCase):
+    def test_retries(self):
+        responses = [requests.ConnectionError(), "page"]
+
+        async def request():
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        policy = FetchPolicy(retries=1, retry_backoff=0)
+
+        self.assertEqual(asyncio.run(policy.call_async(request)), "page")
+        self.assertEqual(responses, [])
+
+    def test_hedging_cancels_slow_request(self):
+        tracker = LatencyTracker()
+        for _ in range(20):
+            tracker.add(0.01)
+        policy = FetchPolicy(hedging=True, latency_tracker=tracker)
+        calls = []
+        cancelled = []
+
+        async def request():
+            calls.append(True)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(True)
+                    raise
+                return "slow"
+            return "fast"
+
+        async def call():
+            result = await policy.call_async(request)
+            # let the cancellation of the slow request run
+            await asyncio.sleep(0)
+            return result
+
+        self.assertEqual(asyncio.run(call()), "fast")
+        self.assertEqual(cancelled, [True])
@@ -0,0 +1,93 @@
+import json
+from io import BytesIO
+
+import pytest
+
+from superset_wfs_dialect.geojson_stream import FeatureCollectionStream
+
+from .conftest import create_features
+
+
+def create_feature_collection(features, **members):
+    return json.dumps(
+        dict({"type": "FeatureCollection", "features": features}, **members),
+        indent=2,
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+class TestFeatureCollectionStream:
+    """Tests for the incremental GeoJSON decoder."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 64 * 1024])
+    def test_read_all(self, chunk_size):
+        features = create_features(20)
+        features[3]["properties"]["name"] = "Grünstraße ✓"
+        data = create_feature_collection(
+            features, numberMatched=12345, numberReturned=20
+        )
+
+        feature_collection = FeatureCollectionStream(
+            BytesIO(data), chunk_size=chunk_size
+        ).read_all()
+
+        assert feature_collection == json.loads(data)
+
+    def test_yields_features_before_reading_the_whole_response(self):
+        data = create_feature_collection(create_features(1000))
+        fp = BytesIO(data)
+        stream = FeatureCollectionStream(fp, chunk_size=1024)
+
+        first = next(iter(stream))
+
+        assert first["id"] == "layer.0"
+        assert fp.tell() < len(data) / 10
+
+    def test_members_before_and_after_features(self):
+        data = (
+            b'{"type": "FeatureCollection", "totalFeatures": "unknown", '
+            b'"features": [], "numberMatched": 10, "crs": null}'
+        )
+        stream = FeatureCollectionStream(BytesIO(data), chunk_size=4)
+
+        assert list(stream) == []
+        assert stream.members == {
+            "type": "FeatureCollection",
+            "totalFeatures": "unknown",
+            "numberMatched": 10,
+            "crs": None,
+        }
+
+    def test_can_only_be_consumed_once(self):
+        stream = FeatureCollectionStream(BytesIO(create_feature_collection([])))
+        list(stream)
+
+        with pytest.raises(ValueError):
+            iter(stream)
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"",
+            b"[]",
+            b'{"type": "FeatureCollection", "features": [{"id": 1}',
+            b'{"features": [{"id": 1} {"id": 2}]}',
+        ],
+    )
+    def test_invalid_feature_collection(self, data):
+        with pytest.raises(ValueError):
+            FeatureCollectionStream(BytesIO(data), chunk_size=5).read_all()
+
+    def test_number_split_at_chunk_boundary(self):
+        data = (
+            b'{"type": "FeatureCollection", "numberMatched": 1.5e3, '
+            b'"numberReturned": -12, "features": []}'
+        )
+
+        # every chunk size splits the numbers at another position
+        for chunk_size in range(1, len(data) + 1):
+            feature_collection = FeatureCollectionStream(
+                BytesIO(data), chunk_size=chunk_size
+            ).read_all()
+
+            assert feature_collection == json.loads(data)
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from superset_wfs_dialect.fetch_policy import FetchPolicy
+from superset_wfs_dialect.host_limiter import (
+    DEFAULT_HOST_MAX_REQUESTS,
+    HostLimiter,
+    get_host_limiter,
+)
+
+
+class TestHostLimiter(unittest.TestCase):
+    def test_limits_concurrent_requests(self):
+        limiter = HostLimiter(2)
+        lock = threading.Lock()
+        active = []
+        max_active = []
+
+        def request():
+            with limiter.slot():
+                with lock:
+                    active.append(True)
+                    max_active.append(len(active))
+                time.sleep(0.02)
+                with lock:
+                    active.pop()
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(max(max_active), 2)
+        self.assertEqual(limiter.active, 0)
+
+    def test_owners_take_turns(self):
+        limiter = HostLimiter(1)
+        first = limiter.acquire("query-a")
+        waiting_a = [limiter.acquire("query-a") for _ in range(3)]
+        waiting_b = limiter.acquire("query-b")
+
+        self.assertTrue(first.done())
+        limiter.release()
+        self.assertTrue(waiting_a[0].done())
+        limiter.release()
+        # query-b is served before the remaining pages of query-a
+        self.assertTrue(waiting_b.done())
+        self.assertFalse(waiting_a[1].done())
+
+    def test_cancelled_request_is_skipped(self):
+        limiter = HostLimiter(1)
+        limiter.acquire()
+        cancelled = limiter.acquire("query-a")
+        waiting = limiter.acquire("query-b")
+
+        cancelled.cancel()
+        limiter.release()
+
+        self.assertTrue(waiting.done())
+        self.assertEqual(limiter.active, 1)
+
+    def test_slot_async(self):
+        limiter = HostLimiter(1)
+        order = []
+
+        async def request(name):
+            async with limiter.slot_async(name):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(request("a"), request("b"))
+
+        asyncio.run(run())
+
+        self.assertEqual(order, ["a", "b"])
+        self.assertEqual(limiter.active, 0)
+
+    def test_fetch_policy_uses_limiter(self):
+        limiter = HostLimiter(1)
+        policy = FetchPolicy(host_limiter=limiter)
+
+        self.assertEqual(policy.call(lambda: limiter.active, owner="query"), 1)
+        self.assertEqual(limiter.active, 0)
+
+
+class TestGetHostLimiter(unittest.TestCase):
+    def test_shared_per_host(self):
+        limiter = get_host_limiter("https://wfs-1.example.com/geoserver/ows", 4)
+
+        self.assertIs(
+            get_host_limiter("https://wfs-1.example.com/geoserver/other/ows"), limiter
+        )
+        self.assertIsNot(get_host_limiter("https://wfs-2.example.com/ows"), limiter)
+        # connections without a configured maximum keep the current one
+        self.assertEqual(limiter.max_requests, 4)
+
+    def test_default_and_disabled(self):
+        limiter = get_host_limiter("https://wfs-3.example.com/ows")
+
+        self.assertEqual(limiter.max_requests, DEFAULT_HOST_MAX_REQUESTS)
+        self.assertIsNone(get_host_limiter("https://wfs-3.example.com/ows", 0))
+        get_host_limiter("https://wfs-3.example.com/ows", 8)
+        self.assertEqual(limiter.max_requests, 8)
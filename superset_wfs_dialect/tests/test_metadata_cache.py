@@ -0,0 +1,86 @@
+from superset_wfs_dialect.metadata_cache import (
+    clear_metadata_cache,
+    get_metadata_cache_key,
+    metadata_cache,
+)
+from superset_wfs_dialect.metadata_file_cache import (
+    read_metadata_file,
+    write_metadata_file,
+)
+
+
+class TestMetadataCacheKey:
+    """Tests for get_metadata_cache_key."""
+
+    def test_same_credentials_same_key(self):
+        key1 = get_metadata_cache_key("https://example.com/wfs", "user", "pass")
+        key2 = get_metadata_cache_key("https://example.com/wfs", "user", "pass")
+        assert key1 == key2
+
+    def test_different_credentials_different_key(self):
+        key1 = get_metadata_cache_key("https://example.com/wfs", "user", "pass")
+        key2 = get_metadata_cache_key("https://example.com/wfs", "user", "other")
+        key3 = get_metadata_cache_key("https://example.com/wfs")
+        assert len({key1, key2, key3}) == 3
+
+    def test_secrets_are_not_part_of_key(self):
+        oauth2_client = {
+            "id": "client",
+            "secret": "client-secret",
+            "token_request_uri": "https://example.com/token",
+        }
+        key = get_metadata_cache_key(
+            "https://example.com/wfs", "user", "pass", oauth2_client
+        )
+        assert "pass" not in repr(key)
+        assert "client-secret" not in repr(key)
+        assert key != get_metadata_cache_key(
+            "https://example.com/wfs", "user", "pass", {**oauth2_client, "id": "x"}
+        )
+
+
+class TestClearMetadataCache:
+    """Tests for clear_metadata_cache."""
+
+    def test_clear_single_wfs(self):
+        key1 = get_metadata_cache_key("https://example.com/wfs", "user", "pass")
+        key2 = get_metadata_cache_key("https://example.com/wfs")
+        key3 = get_metadata_cache_key("https://other.example.com/wfs")
+        for key in (key1, key2, key3):
+            metadata_cache.set(key, {})
+
+        clear_metadata_cache("https://example.com/wfs")
+
+        assert key1 not in metadata_cache
+        assert key2 not in metadata_cache
+        assert key3 in metadata_cache
+
+    def test_clear_all(self):
+        metadata_cache.set(get_metadata_cache_key("https://example.com/wfs"), {})
+
+        clear_metadata_cache()
+
+        assert len(metadata_cache) == 0
+
+    def test_clear_cache_files(self, tmp_path):
+        keys = {
+            url: get_metadata_cache_key(url)
+            for url in ("https://example.com/wfs", "https://other.example.com/wfs")
+        }
+        for url, key in keys.items():
+            metadata_cache.set(key, {})
+            write_metadata_file(
+                str(tmp_path), key, url, "<WFS_Capabilities/>", 10, None, {}
+            )
+
+        clear_metadata_cache("https://example.com/wfs", str(tmp_path))
+
+        cleared, kept = keys.values()
+        assert read_metadata_file(str(tmp_path), cleared) is None
+        assert read_metadata_file(str(tmp_path), kept) is not None
+        assert kept in metadata_cache
+
+        clear_metadata_cache(cache_dir=str(tmp_path))
+
+        assert read_metadata_file(str(tmp_path), kept) is None
+        assert len(metadata_cache) == 0
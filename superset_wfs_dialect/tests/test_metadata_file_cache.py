@@ -0,0 +1,84 @@
+import json
+import threading
+
+from superset_wfs_dialect.metadata_file_cache import (
+    METADATA_FILE_VERSION,
+    get_metadata_file_path,
+    read_metadata_file,
+    revalidate_in_background,
+    write_metadata_file,
+)
+
+CACHE_KEY = ("https://example.com/wfs", "user", "hashed-password", None)
+
+
+class TestMetadataFileCache:
+    """Tests for the metadata cache files."""
+
+    def write(self, cache_dir):
+        write_metadata_file(
+            str(cache_dir),
+            CACHE_KEY,
+            base_url="https://example.com/wfs",
+            capabilities="<WFS_Capabilities/>",
+            server_side_max_features=1000,
+            wfs_output_format="application/json",
+            feature_type_schemas={"ns:layer": {"properties": {"name": "string"}}},
+        )
+
+    def test_roundtrip(self, tmp_path):
+        self.write(tmp_path)
+
+        metadata = read_metadata_file(str(tmp_path), CACHE_KEY)
+
+        assert metadata["version"] == METADATA_FILE_VERSION
+        assert metadata["capabilities"] == "<WFS_Capabilities/>"
+        assert metadata["server_side_max_features"] == 1000
+        assert metadata["wfs_output_format"] == "application/json"
+        assert metadata["feature_type_schemas"] == {
+            "ns:layer": {"properties": {"name": "string"}}
+        }
+
+    def test_file_name_does_not_contain_credentials(self, tmp_path):
+        path = get_metadata_file_path(str(tmp_path), CACHE_KEY)
+        assert "user" not in path.rsplit("/", 1)[-1]
+
+    def test_missing_file(self, tmp_path):
+        assert read_metadata_file(str(tmp_path), CACHE_KEY) is None
+
+    def test_other_version_is_ignored(self, tmp_path):
+        self.write(tmp_path)
+        path = get_metadata_file_path(str(tmp_path), CACHE_KEY)
+        with open(path) as f:
+            metadata = json.load(f)
+        metadata["version"] = METADATA_FILE_VERSION + 1
+        with open(path, "w") as f:
+            json.dump(metadata, f)
+
+        assert read_metadata_file(str(tmp_path), CACHE_KEY) is None
+
+    def test_invalid_file_is_ignored(self, tmp_path):
+        path = get_metadata_file_path(str(tmp_path), CACHE_KEY)
+        with open(path, "w") as f:
+            f.write("{not json")
+
+        assert read_metadata_file(str(tmp_path), CACHE_KEY) is None
+
+    def test_revalidation_runs_once_per_key(self):
+        release = threading.Event()
+        calls = []
+
+        def revalidate():
+            calls.append(1)
+            release.wait(5)
+
+        thread = revalidate_in_background(CACHE_KEY, revalidate)
+        assert revalidate_in_background(CACHE_KEY, revalidate) is None
+        release.set()
+        thread.join(5)
+
+        assert calls == [1]
+        # a new revalidation can be started once the previous one finished
+        thread = revalidate_in_background(CACHE_KEY, lambda: calls.append(2))
+        thread.join(5)
+        assert calls == [1, 2]
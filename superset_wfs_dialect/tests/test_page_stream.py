@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from superset_wfs_dialect.page_stream import PageStream
+
+
+class TestPageStream:
+    """Tests for the background page fetching of streaming cursors."""
+
+    def test_pages_in_order(self):
+        def fetch_page(startindex):
+            # later pages complete first
+            time.sleep((10 - startindex) / 1000)
+            return [startindex]
+
+        stream = PageStream(fetch_page, range(10), max_workers=4)
+
+        assert list(stream) == [[i] for i in range(10)]
+
+    def test_fetching_is_bounded(self):
+        fetched = []
+
+        def fetch_page(startindex):
+            fetched.append(startindex)
+            return [startindex]
+
+        stream = PageStream(fetch_page, range(100), max_workers=2, max_queued_pages=2)
+        pages = iter(stream)
+        assert next(pages) == [0]
+        time.sleep(0.05)
+
+        # consumed + queued + in flight
+        assert len(fetched) <= 1 + 2 + 2 + 1
+        stream.close()
+
+    def test_close_cancels_remaining_pages(self):
+        fetched = []
+        started = threading.Event()
+
+        def fetch_page(startindex):
+            fetched.append(startindex)
+            started.set()
+            return [startindex]
+
+        stream = PageStream(fetch_page, range(100), max_workers=1, max_queued_pages=1)
+        started.wait(1)
+        stream.close()
+        stream._thread.join(1)
+
+        assert not stream._thread.is_alive()
+        assert len(fetched) < 100
+
+    def test_errors_are_raised(self):
+        def fetch_page(startindex):
+            if startindex == 2:
+                raise ValueError("page failed")
+            return [startindex]
+
+        pages = []
+        with pytest.raises(ValueError, match="page failed"):
+            for page in PageStream(fetch_page, range(5), max_workers=2):
+                pages.append(page)
+
+        assert pages == [[0], [1]]
+
+    def test_close_discards_unconsumed_pages(self):
+        fetched = []
+        discarded = []
+
+        def fetch_page(startindex):
+            fetched.append(startindex)
+            return [startindex]
+
+        stream = PageStream(
+            fetch_page,
+            range(10),
+            max_workers=2,
+            max_queued_pages=2,
+            discard=discarded.append,
+        )
+        pages = iter(stream)
+        assert next(pages) == [0]
+        time.sleep(0.05)
+        stream.close()
+        stream._thread.join(1)
+
+        assert sorted(discarded) == [[i] for i in fetched[1:]]
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from superset_wfs_dialect.base import FETCH_STRATEGY_FIRST_PAGE, Cursor
+from superset_wfs_dialect.fetch_policy import FetchPolicy
+from superset_wfs_dialect.single_flight import SingleFlight
+
+from .conftest import create_features, create_getfeature_mock
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_request(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        def request():
+            calls.append(True)
+            time.sleep(0.05)
+            return {"features": []}
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(
+                executor.map(lambda _: single_flight.call("key", request), range(5))
+            )
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_error_is_shared(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+
+        def request():
+            started.set()
+            time.sleep(0.05)
+            raise ValueError("failed")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(single_flight.call, "key", request)
+            started.wait()
+            follower = executor.submit(single_flight.call, "key", MagicMock())
+
+        self.assertRaises(ValueError, leader.result)
+        self.assertRaises(ValueError, follower.result)
+
+    def test_later_calls_send_new_request(self):
+        single_flight = SingleFlight()
+        request = MagicMock(side_effect=[1, 2])
+
+        self.assertEqual(single_flight.call("key", request), 1)
+        self.assertEqual(single_flight.call("key", request), 2)
+
+    def test_call_async(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def request():
+            calls.append(True)
+            await asyncio.sleep(0.01)
+            return "page"
+
+        async def run():
+            return await asyncio.gather(
+                *(single_flight.call_async("key", request) for _ in range(3))
+            )
+
+        self.assertEqual(asyncio.run(run()), ["page"] * 3)
+        self.assertEqual(len(calls), 1)
+
+    def test_call_async_after_cancelled_leader(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def request():
+            calls.append(True)
+            await asyncio.sleep(0.05)
+            return "page"
+
+        async def run():
+            leader = asyncio.ensure_future(single_flight.call_async("key", request))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(single_flight.call_async("key", request))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(run()), "page")
+        self.assertEqual(len(calls), 2)
+
+
+class TestCoalescedGetFeature(unittest.TestCase):
+    def test_concurrent_cursors_share_page(self):
+        features = create_features(3)
+        getfeature = create_getfeature_mock(features)
+
+        def slow_getfeature(**kwargs):
+            time.sleep(0.05)
+            return getfeature(**kwargs)
+
+        connection = MagicMock()
+        connection.fetch_policy = FetchPolicy(retries=0)
+        connection.fetch_strategy = FETCH_STRATEGY_FIRST_PAGE
+        connection.metadata_cache_key = ("https://example.com/wfs", None, None, None)
+        connection.wfs.getfeature.side_effect = slow_getfeature
+        params = {"typename": "layer", "method": "GET"}
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = list(
+                executor.map(
+                    lambda _: Cursor(connection)._get_FeatureCollection(params, limit=10),
+                    range(3),
+                )
+            )
+
+        connection.wfs.getfeature.assert_called_once()
+        self.assertEqual([r["features"] for r in results], [features] * 3)
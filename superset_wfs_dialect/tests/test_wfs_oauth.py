@@ -1,3 +1,5 @@
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -174,6 +176,44 @@ class TestWfsOauth:
         )
         assert result == mock_schema
 
+    @patch('superset_wfs_dialect.custom_wfs200.get_schemas')
+    @patch('superset_wfs_dialect.wfs_oauth.WFSCapabilitiesReader')
+    @patch('superset_wfs_dialect.wfs_oauth.OIDC')
+    def test_get_schemas(self, mock_oidc_class, mock_reader_class, mock_get_schemas):
+        """Test get_schemas method."""
+        mock_oidc_instance = MagicMock()
+        mock_oidc_instance.expires_soon.side_effect = [False, False]
+        mock_oidc_instance.get_access_token.return_value = "test-token"
+        mock_oidc_class.return_value = mock_oidc_instance
+
+        mock_reader_instance = MagicMock()
+        mock_reader_instance.read.return_value = MagicMock()
+        mock_reader_class.return_value = mock_reader_instance
+
+        mock_schemas = {"test:layer": {"properties": {"name": "string"}}}
+        mock_get_schemas.return_value = mock_schemas
+
+        wfs = WfsOauth(
+            url="https://example.com/wfs",
+            version="2.0.0"
+        )
+
+        result = wfs.get_schemas(["test:layer"], chunk_size=10)
+
+        # Verify inject_access_token was called (init + get_schemas)
+        assert mock_oidc_instance.expires_soon.call_count == 2
+
+        mock_get_schemas.assert_called_once_with(
+            "https://example.com/wfs",
+            ["test:layer"],
+            "2.0.0",
+            chunk_size=10,
+            timeout=30,
+            headers=wfs.headers,
+            auth=wfs.auth
+        )
+        assert result == mock_schemas
+
     @patch('superset_wfs_dialect.wfs_oauth.WFSCapabilitiesReader')
     @patch('superset_wfs_dialect.wfs_oauth.OIDC')
     def test_getfeature(self, mock_oidc_class, mock_reader_class):
@@ -202,3 +242,48 @@ class TestWfsOauth:
             # Verify parent getfeature was called with correct parameters
             mock_parent_getfeature.assert_called_once_with(typename="test:layer", maxfeatures=10)
             assert result == "feature_response"
+
+    @patch('superset_wfs_dialect.wfs_oauth.WFSCapabilitiesReader')
+    @patch('superset_wfs_dialect.wfs_oauth.OIDC')
+    def test_inject_access_token_replaces_headers(self, mock_oidc_class, mock_reader_class):
+        """Test that a refreshed token does not change headers in use."""
+        mock_oidc_instance = MagicMock()
+        mock_oidc_instance.expires_soon.return_value = False
+        mock_oidc_instance.get_access_token.side_effect = ["old-token", "new-token"]
+        mock_oidc_class.return_value = mock_oidc_instance
+        mock_reader_class.return_value = MagicMock()
+
+        wfs = WfsOauth(url="https://example.com/wfs", version="2.0.0")
+        headers_in_use = wfs.headers
+
+        wfs.inject_access_token()
+
+        assert headers_in_use["Authorization"] == "Bearer old-token"
+        assert wfs.headers["Authorization"] == "Bearer new-token"
+
+    @patch('superset_wfs_dialect.wfs_oauth.WFSCapabilitiesReader')
+    @patch('superset_wfs_dialect.wfs_oauth.OIDC')
+    def test_inject_access_token_refreshes_once(self, mock_oidc_class, mock_reader_class):
+        """Test that concurrent callers refresh an expiring token once."""
+        mock_oidc_instance = MagicMock()
+        expired = [False]
+
+        def request_access_token():
+            time.sleep(0.01)
+            expired[0] = False
+
+        mock_oidc_instance.expires_soon.side_effect = lambda: expired[0]
+        mock_oidc_instance.request_access_token.side_effect = request_access_token
+        mock_oidc_instance.get_access_token.return_value = "token"
+        mock_oidc_class.return_value = mock_oidc_instance
+        mock_reader_class.return_value = MagicMock()
+        wfs = WfsOauth(url="https://example.com/wfs", version="2.0.0")
+
+        expired[0] = True
+        threads = [threading.Thread(target=wfs.inject_access_token) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        mock_oidc_instance.request_access_token.assert_called_once()
@@ -1,4 +1,5 @@
 import logging
+import threading
 
 from owslib.feature import WebFeatureService_
 from owslib.feature.common import WFSCapabilitiesReader
@@ -6,6 +7,7 @@ from owslib.feature.schema import get_schema
 from owslib.util import Authentication
 
 
+from .custom_schema import DEFAULT_SCHEMA_CHUNK_SIZE
 from .custom_wfs200 import WebFeatureService_2_0_0
 from .oidc import OIDC
 
@@ -38,6 +40,8 @@ class WfsOauth(WebFeatureService_2_0_0):
         self._capabilities = None
 
         self.oidc = OIDC(oauth2_client_info=oauth_info)
+        # the instance is shared by the connections and threads of a WFS
+        self._token_lock = threading.Lock()
 
         self.inject_access_token()
         reader = WFSCapabilitiesReader(self.version, headers=self.headers, auth=self.auth)
@@ -49,12 +53,17 @@ class WfsOauth(WebFeatureService_2_0_0):
 
 
     def inject_access_token(self):
-        if self.oidc.expires_soon():
-            LOGGER.debug("Access token is expiring soon, refreshing...")
-            self.oidc.request_access_token()
-        access_token = self.oidc.get_access_token()
-        if access_token:
-            self.headers["Authorization"] = f"Bearer {access_token}"
+        with self._token_lock:
+            if self.oidc.expires_soon():
+                LOGGER.debug("Access token is expiring soon, refreshing...")
+                self.oidc.request_access_token()
+            access_token = self.oidc.get_access_token()
+            if access_token:
+                # replace the headers instead of changing them, as requests
+                # in flight may still use the previous headers
+                self.headers = dict(
+                    self.headers, Authorization=f"Bearer {access_token}"
+                )
 
     def get_schema(self, typename):
         """
@@ -63,6 +72,13 @@ class WfsOauth(WebFeatureService_2_0_0):
         self.inject_access_token()
         return get_schema(self.url, typename, self.version, headers=self.headers, auth=self.auth)
 
+    def get_schemas(self, typenames, chunk_size=DEFAULT_SCHEMA_CHUNK_SIZE):
+        """
+        Get layer schemas for several layers with combined DescribeFeatureType requests
+        """
+        self.inject_access_token()
+        return super().get_schemas(typenames, chunk_size=chunk_size)
+
     def getfeature(self, *args, **kwargs):
         self.inject_access_token()
         return super().getfeature(*args, **kwargs)